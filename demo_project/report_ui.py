@@ -1,14 +1,27 @@
 from __future__ import annotations
 
 import json
+import mimetypes
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse
+from fastapi.responses import (
+    FileResponse,
+    HTMLResponse,
+    PlainTextResponse,
+    RedirectResponse,
+    Response,
+)
 from fastapi.templating import Jinja2Templates
 
+from orch.artifacts import read_artifact
+from orch.catalog import Catalog
+from orch.config import OrchSettings
+from orch.ledger import LedgerView
+from orch.metrics import MetricsCollector
+
 
 @dataclass(frozen=True)
 class RunSummary:
@@ -44,28 +57,28 @@ def _safe_join(base: Path, rel: str) -> Path:
     raise ValueError("Path traversal blocked")
 
 
-def _summarize_run(run_dir: Path) -> RunSummary:
-    ledger = _parse_ledger(run_dir / "ledger.jsonl")
+def _load_view(run_dir: Path) -> LedgerView:
+    # Unparseable lines stay in view.records (for the raw ledger) but are not indexed.
+    return LedgerView(_parse_ledger(run_dir / "ledger.jsonl"))
+
+
+def _summarize_run(run_dir: Path, view: LedgerView | None = None) -> RunSummary:
+    view = view or _load_view(run_dir)
+    ledger = view.records
 
-    run_id = run_dir.name
-    feature_id = None
     started_ts = ledger[0].get("ts") if ledger else None
     ended_ts = ledger[-1].get("ts") if ledger else None
+    feature_id = next(
+        (r["feature_id"] for r in reversed(view.by_step("INTAKE")) if r.get("feature_id")), None
+    )
 
-    gate_ok = None
-    verify_ok = None
-    for rec in ledger:
-        if rec.get("step") == "INTAKE" and rec.get("feature_id"):
-            feature_id = rec.get("feature_id")
-        if rec.get("step") == "VERIFY" and rec.get("ok") is True:
-            verify_ok = True
-        if rec.get("step") == "VERIFY" and rec.get("ok") is False and verify_ok is None:
-            verify_ok = False
-        if rec.get("step") == "GATE":
-            gate_ok = rec.get("ok")
+    verify = [r.get("ok") for r in view.by_step("VERIFY")]
+    verify_ok = True if True in verify else False if False in verify else None
+    gate = view.latest("GATE")
+    gate_ok = gate.get("ok") if gate is not None else None
 
     return RunSummary(
-        run_id=run_id,
+        run_id=run_dir.name,
         feature_id=feature_id,
         started_ts=started_ts,
         ended_ts=ended_ts,
@@ -75,7 +88,9 @@ def _summarize_run(run_dir: Path) -> RunSummary:
 
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
-RUNS_DIR = REPO_ROOT / "runs"
+_SETTINGS = OrchSettings(repo_root=REPO_ROOT)
+RUNS_DIR = REPO_ROOT / _SETTINGS.runs_dir
+CATALOG_PATH = REPO_ROOT / _SETTINGS.catalog_path
 TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
 
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
@@ -83,6 +98,35 @@ templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 app = FastAPI(title="orch reports")
 
 
+_metrics: MetricsCollector | None = None
+_catalog: Catalog | None = None
+
+
+def _get_catalog() -> Catalog:
+    """The runs catalog the runner maintains (settings.catalog_path)."""
+    global _catalog
+    if _catalog is None or (_catalog.path, _catalog.runs_dir) != (CATALOG_PATH, RUNS_DIR):
+        fresh = not CATALOG_PATH.exists()
+        _catalog = Catalog(CATALOG_PATH, RUNS_DIR)
+        if fresh:
+            # First use: index whatever runs already exist.
+            _catalog.sync()
+    return _catalog
+
+
+def _flag(value: int | None) -> bool | None:
+    return None if value is None else bool(value)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """Prometheus scrape endpoint; aggregates are updated incrementally between scrapes."""
+    global _metrics
+    if _metrics is None or _metrics.runs_dir != RUNS_DIR:
+        _metrics = MetricsCollector(RUNS_DIR)
+    return PlainTextResponse(_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/", response_class=HTMLResponse)
 def home() -> RedirectResponse:
     return RedirectResponse(url="/runs")
@@ -90,17 +134,21 @@ def home() -> RedirectResponse:
 
 @app.get("/runs", response_class=HTMLResponse)
 def runs_index(request: Request) -> HTMLResponse:
+    # Newest first by run_id (timestamp suffix). Served from the catalog: no ledger is
+    # read here (run `orch index rebuild` if it looks stale).
     runs: list[RunSummary] = []
     if RUNS_DIR.exists():
-        for p in RUNS_DIR.iterdir():
-            if not p.is_dir():
-                continue
-            if not (p / "ledger.jsonl").exists():
-                continue
-            runs.append(_summarize_run(p))
-
-    # newest first by run_id (timestamp suffix) or by mtime
-    runs.sort(key=lambda r: r.run_id, reverse=True)
+        runs = [
+            RunSummary(
+                run_id=row["run_id"],
+                feature_id=row["feature_id"],
+                started_ts=row["started_ts"],
+                ended_ts=row["ended_ts"],
+                gate_ok=_flag(row["gate_ok"]),
+                verify_ok=_flag(row["verify_ok"]),
+            )
+            for row in _get_catalog().runs()
+        ]
 
     return templates.TemplateResponse(
         request,
@@ -115,35 +163,21 @@ def run_detail(run_id: str, request: Request) -> HTMLResponse:
     if not run_dir.exists():
         raise HTTPException(status_code=404, detail="run not found")
 
-    ledger = _parse_ledger(run_dir / "ledger.jsonl")
-
-    # Extract codex status parsed blocks
-    codex_status = [
-        rec
-        for rec in ledger
-        if rec.get("step") == "CODEX_STATUS" and isinstance(rec.get("parsed"), dict)
-    ]
-
-    # Build a list of artifact links (best-effort)
-    artifacts: list[dict[str, str]] = []
-    for rec in ledger:
-        for key in ("stdout_path", "raw_path", "artifact", "report_path"):
-            p = rec.get(key)
-            if isinstance(p, str) and p.startswith(str(run_dir)):
-                rel = str(Path(p).relative_to(run_dir))
-                artifacts.append({"label": key, "rel": rel})
-
-    # Dedupe
-    seen = set()
-    uniq_artifacts = []
-    for a in artifacts:
-        k = (a["label"], a["rel"])
-        if k in seen:
-            continue
-        seen.add(k)
-        uniq_artifacts.append(a)
+    view = _load_view(run_dir)
+    ledger = view.records
+
+    # Codex usage and artifact links come from the catalog. Index anything the runner
+    # has not (a busy catalog, or a run from before it existed) first; only new ledger
+    # lines are read.
+    catalog = _get_catalog()
+    catalog.update(run_id)
+    usage = catalog.usage(run_id)
+    artifacts = catalog.artifacts(run_id)
 
-    summary = _summarize_run(run_dir)
+    # Child-process resource usage of tool and test runs (records with "resources")
+    resources = [rec for rec in ledger if isinstance(rec.get("resources"), dict)]
+
+    summary = _summarize_run(run_dir, view)
 
     return templates.TemplateResponse(
         request,
@@ -151,14 +185,15 @@ def run_detail(run_id: str, request: Request) -> HTMLResponse:
         {
             "summary": summary,
             "ledger": ledger,
-            "codex_status": codex_status,
-            "artifacts": uniq_artifacts,
+            "usage": usage,
+            "resources": resources,
+            "artifacts": artifacts,
         },
     )
 
 
 @app.get("/runs/{run_id}/artifact/{rel_path:path}")
-def artifact(run_id: str, rel_path: str) -> FileResponse:
+def artifact(run_id: str, rel_path: str) -> Response:
     run_dir = RUNS_DIR / run_id
     if not run_dir.exists():
         raise HTTPException(status_code=404, detail="run not found")
@@ -168,7 +203,12 @@ def artifact(run_id: str, rel_path: str) -> FileResponse:
     except ValueError:
         raise HTTPException(status_code=400, detail="invalid path")
 
-    if not p.exists() or not p.is_file():
-        raise HTTPException(status_code=404, detail="artifact not found")
+    if p.is_file():
+        return FileResponse(p)
 
-    return FileResponse(p)
+    # Compressed (<name>.gz / .zst) or packed into the run's artifacts.zip.
+    try:
+        data = read_artifact(p)
+    except OSError:
+        raise HTTPException(status_code=404, detail="artifact not found")
+    return Response(data, media_type=mimetypes.guess_type(p.name)[0] or "text/plain")
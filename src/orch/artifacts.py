@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import time
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Literal
+
+from .ledger import read_ledger
+
+Compression = Literal["none", "gzip", "zstd"]
+
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+ARCHIVE_NAME = "artifacts.zip"
+# Hardlinks to one object per distinct content, so objects can be shared across runs.
+OBJECTS_DIR = ".objects"
+# Never compressed or archived: appended to while the run lives, and read by
+# everything that looks at runs (resume, metrics, the catalog).
+KEEP_PLAIN = ("ledger.jsonl",)
+
+
+class ArtifactError(RuntimeError):
+    pass
+
+
+def _zstd():  # type: ignore[no-untyped-def]
+    try:
+        import zstandard
+    except ImportError:
+        raise ArtifactError(
+            "artifact_compression='zstd' needs the zstandard package (pip install zstandard)"
+        ) from None
+    return zstandard
+
+
+def check_compression(compression: Compression) -> None:
+    """Fail early on a compression setting that cannot work here."""
+    if compression == "zstd":
+        _zstd()
+    elif compression not in ("none", "gzip"):
+        raise ArtifactError(f"unknown artifact compression {compression!r}")
+
+
+def _compress(data: bytes, compression: Compression) -> bytes:
+    if compression == "gzip":
+        # mtime=0: equal content must give equal bytes, or the object store cannot share it.
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    return _zstd().ZstdCompressor(level=3).compress(data)
+
+
+def _decompress(data: bytes, suffix: str) -> bytes:
+    if suffix == ".gz":
+        return gzip.decompress(data)
+    return _zstd().ZstdDecompressor().decompressobj().decompress(data)
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _store_object(store: Path, data: bytes) -> Path:
+    digest = hashlib.sha256(data).hexdigest()
+    obj = store / digest[:2] / digest[2:]
+    if not obj.exists():
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(obj, data)
+    return obj
+
+
+def _link_object(store: Path, target: Path, data: bytes) -> bool:
+    """Make `target` a hardlink to the store's object for `data`; False if the
+    filesystem will not link (e.g. the store is on another device)."""
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    for _ in range(3):
+        obj = _store_object(store, data)
+        tmp.unlink(missing_ok=True)
+        try:
+            os.link(obj, tmp)
+        except FileNotFoundError:
+            continue  # collected by gc_objects just now: store it again
+        except OSError:
+            return False
+        os.replace(tmp, target)
+        return True
+    return False
+
+
+def write_artifact(
+    path: Path,
+    data: str | bytes,
+    *,
+    compression: Compression = "none",
+    min_bytes: int = 0,
+    store: Path | None = None,
+) -> Path:
+    """Write an artifact, compressed (as `<path>.gz` / `<path>.zst`) if it is at least
+    `min_bytes` long. Returns the file actually written.
+
+    With a `store` (an OBJECTS_DIR), the file is a hardlink to the store's object for
+    its content, shared with every other artifact of the same content. Such a file must
+    only ever be replaced (as this function does), never opened for writing in place.
+    """
+    raw = data.encode("utf-8") if isinstance(data, str) else data
+    path.parent.mkdir(parents=True, exist_ok=True)
+    target = path
+    if compression != "none" and len(raw) >= min_bytes:
+        target = path.with_name(path.name + SUFFIXES[compression])
+        raw = _compress(raw, compression)
+    if store is None or not _link_object(store, target, raw):
+        _atomic_write(target, raw)
+    # Drop other encodings of the same artifact so reads never see a stale one.
+    for other in (path, *(path.with_name(path.name + s) for s in SUFFIXES.values())):
+        if other != target:
+            other.unlink(missing_ok=True)
+    return target
+
+
+def _find_archive(path: Path) -> tuple[Path, str] | None:
+    for parent in path.parents:
+        archive = parent / ARCHIVE_NAME
+        if archive.is_file():
+            return archive, path.relative_to(parent).as_posix()
+    return None
+
+
+def read_artifact(path: Path) -> bytes:
+    """Read an artifact by its plain path, wherever it ended up: the plain file, a
+    compressed copy next to it, or the run's artifacts.zip."""
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        pass
+    for suffix in SUFFIXES.values():
+        try:
+            return _decompress(path.with_name(path.name + suffix).read_bytes(), suffix)
+        except FileNotFoundError:
+            continue
+    found = _find_archive(path)
+    if found is not None:
+        archive, member = found
+        with zipfile.ZipFile(archive) as zf:
+            try:
+                return zf.read(member)
+            except KeyError:
+                pass
+    raise FileNotFoundError(str(path))
+
+
+def read_artifact_text(path: Path) -> str:
+    return read_artifact(path).decode("utf-8", errors="replace")
+
+
+def artifact_exists(path: Path) -> bool:
+    if path.exists() or any(path.with_name(path.name + s).exists() for s in SUFFIXES.values()):
+        return True
+    found = _find_archive(path)
+    if found is None:
+        return False
+    archive, member = found
+    with zipfile.ZipFile(archive) as zf:
+        return member in zf.NameToInfo
+
+
+def _is_plain(path: Path, run_dir: Path) -> bool:
+    return (
+        path.suffix not in SUFFIXES.values()
+        and path.name != ARCHIVE_NAME
+        and path.relative_to(run_dir).as_posix() not in KEEP_PLAIN
+        and not path.name.startswith(".")
+    )
+
+
+def compress_run(
+    run_dir: Path,
+    compression: Compression,
+    *,
+    min_bytes: int = 0,
+    skip: tuple[str, ...] = (),
+    store: Path | None = None,
+) -> int:
+    """Compress the run's plain artifacts of at least `min_bytes`; returns how many.
+
+    `skip` names further files (relative to run_dir) to leave alone.
+    """
+    if compression == "none":
+        return 0
+    n = 0
+    for path in sorted(run_dir.rglob("*")):
+        if not path.is_file() or not _is_plain(path, run_dir):
+            continue
+        if path.relative_to(run_dir).as_posix() in skip or path.stat().st_size < min_bytes:
+            continue
+        write_artifact(path, path.read_bytes(), compression=compression, store=store)
+        n += 1
+    return n
+
+
+@dataclass(frozen=True)
+class ArchiveStats:
+    files: int
+    bytes_before: int
+    bytes_after: int
+
+
+def archive_run(run_dir: Path) -> ArchiveStats:
+    """Pack every artifact of a run (except its ledger) into `run_dir/artifacts.zip`.
+
+    Compressed artifacts are stored decompressed under their plain names (and deflated
+    by zip), so every artifact keeps its path. Archiving an archived run again adds
+    whatever was written since.
+    """
+    archive = run_dir / ARCHIVE_NAME
+    members: dict[str, Path] = {}
+    for path in sorted(run_dir.rglob("*")):
+        if not path.is_file() or path.name.startswith("."):
+            continue
+        rel = path.relative_to(run_dir).as_posix()
+        if rel in KEEP_PLAIN or path == archive:
+            continue
+        if path.suffix in SUFFIXES.values():
+            rel = rel[: -len(path.suffix)]
+        members[rel] = path
+    if not members:
+        return ArchiveStats(0, 0, 0)
+
+    before = sum(p.stat().st_size for p in members.values())
+    tmp = run_dir / f".{ARCHIVE_NAME}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as out:
+        if archive.exists():
+            before += archive.stat().st_size
+            with zipfile.ZipFile(archive) as old:
+                for info in old.infolist():
+                    if info.filename not in members:
+                        out.writestr(info, old.read(info))
+        for rel, path in members.items():
+            data = path.read_bytes()
+            if path.suffix in SUFFIXES.values():
+                data = _decompress(data, path.suffix)
+            out.writestr(rel, data)
+    os.replace(tmp, archive)
+
+    for path in members.values():
+        path.unlink()
+    for d in sorted((p for p in run_dir.rglob("*") if p.is_dir()), reverse=True):
+        try:
+            d.rmdir()
+        except OSError:
+            pass
+    return ArchiveStats(len(members), before, archive.stat().st_size)
+
+
+def archive_runs(runs_dir: Path, *, older_than_s: float) -> dict[str, ArchiveStats]:
+    """Archive finished runs whose ledger has not changed for `older_than_s` seconds."""
+    cutoff = time.time() - older_than_s
+    done: dict[str, ArchiveStats] = {}
+    for ledger in sorted(runs_dir.glob("*/ledger.jsonl")):
+        run_dir = ledger.parent
+        if run_dir.name.startswith(".") or ledger.stat().st_mtime > cutoff:
+            continue
+        records = read_ledger(ledger)
+        # Only finished runs: an interrupted one may still be resumed in place.
+        if not records or records[-1].get("step") != "RUN":
+            continue
+        stats = archive_run(run_dir)
+        if stats.files:
+            done[run_dir.name] = stats
+    return done
+
+
+@dataclass(frozen=True)
+class GcStats:
+    removed: int
+    bytes_freed: int
+    kept: int
+
+
+def gc_objects(store: Path) -> GcStats:
+    """Delete objects no run links to any more.
+
+    The link count is the reference count: an object whose only link is its own
+    store entry belongs to runs that were deleted, archived or rewritten.
+    """
+    removed = freed = kept = 0
+    for obj in sorted(store.glob("??/*")):
+        if obj.name.startswith("."):
+            continue  # being written
+        try:
+            st = obj.lstat()
+            if st.st_nlink > 1:
+                kept += 1
+                continue
+            obj.unlink()
+        except FileNotFoundError:
+            continue
+        removed += 1
+        freed += st.st_size
+    for d in store.glob("??"):
+        try:
+            d.rmdir()
+        except OSError:
+            pass
+    return GcStats(removed, freed, kept)
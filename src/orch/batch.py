@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .config import OrchSettings, parallel_settings
+from .runner import run_feature
+
+
+@dataclass(frozen=True)
+class FeatureResult:
+    feature_id: str
+    ok: bool
+    elapsed_s: float
+    run_dir: Path | None = None
+    error: str | None = None
+
+
+@dataclass
+class BatchResult:
+    results: list[FeatureResult] = field(default_factory=list)
+    elapsed_s: float = 0.0
+
+    @property
+    def passed(self) -> list[FeatureResult]:
+        return [r for r in self.results if r.ok]
+
+    @property
+    def failed(self) -> list[FeatureResult]:
+        return [r for r in self.results if not r.ok]
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+def discover_features(settings: OrchSettings) -> list[str]:
+    """Return the ids of every feature under `settings.features_dir` that has a feature.md."""
+    features_root = settings.repo_root / settings.features_dir
+    if not features_root.is_dir():
+        return []
+    return sorted(
+        p.name for p in features_root.iterdir() if p.is_dir() and (p / "feature.md").exists()
+    )
+
+
+def _run_one(feature_id: str, settings: OrchSettings) -> FeatureResult:
+    # Runs in a worker process: never let an exception escape, so one bad feature
+    # cannot take the rest of the batch down with it.
+    started = time.monotonic()
+    try:
+        run_dir = run_feature(feature_id, settings)
+    except Exception as e:  # noqa: BLE001
+        return FeatureResult(
+            feature_id=feature_id,
+            ok=False,
+            elapsed_s=time.monotonic() - started,
+            error=f"{type(e).__name__}: {e}",
+        )
+    return FeatureResult(
+        feature_id=feature_id,
+        ok=True,
+        elapsed_s=time.monotonic() - started,
+        run_dir=run_dir,
+    )
+
+
+def run_many(
+    feature_ids: list[str],
+    settings: OrchSettings,
+    *,
+    max_workers: int | None = None,
+) -> BatchResult:
+    """Run several features in parallel on a bounded process pool.
+
+    Each feature gets its own run folder (see `runner._new_run_id`) and, when several
+    run at once, its own workspace: unless settings.isolation was set explicitly it is
+    "auto", and an explicit "none" runs the features one at a time (see
+    `parallel_settings`). Results are returned in the order of `feature_ids`,
+    regardless of completion order.
+    """
+
+    workers = max(1, min(max_workers or settings.max_parallel_runs, len(feature_ids) or 1))
+    settings, workers = parallel_settings(settings, workers)
+    started = time.monotonic()
+
+    results: list[FeatureResult | None] = [None] * len(feature_ids)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_run_one, fid, settings): i for i, fid in enumerate(feature_ids)}
+        for fut in as_completed(futures):
+            results[futures[fut]] = fut.result()
+
+    return BatchResult(
+        results=[r for r in results if r is not None],
+        elapsed_s=time.monotonic() - started,
+    )
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    returncode: int
+    stdout: str
+    stderr: str
+
+
+def repo_tree_hash(repo_root: Path, *, exclude: tuple[str, ...] = ()) -> str | None:
+    """Hash of the working tree state (HEAD + uncommitted and untracked changes).
+
+    `exclude` are paths relative to `repo_root` to leave out (e.g. the runs directory,
+    which changes on every run). Returns None if `repo_root` is not a git checkout.
+    """
+
+    pathspec = ["--", ".", *(f":(exclude){e}" for e in exclude)]
+
+    def git(*args: str) -> bytes:
+        return subprocess.run(
+            ["git", *args], cwd=str(repo_root), capture_output=True, check=True
+        ).stdout
+
+    try:
+        h = hashlib.sha256(git("rev-parse", "HEAD"))
+        h.update(git("diff", "HEAD", "--binary", *pathspec))
+        untracked = git("ls-files", "--others", "--exclude-standard", "-z", *pathspec)
+        for rel in untracked.split(b"\0"):
+            if not rel:
+                continue
+            h.update(rel)
+            try:
+                h.update((repo_root / rel.decode("utf-8", "surrogateescape")).read_bytes())
+            except OSError:
+                pass
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return h.hexdigest()
+
+
+@dataclass
+class ToolCache:
+    """On-disk, content-addressed cache of tool responses.
+
+    Entries live at `<root>/<key[:2]>/<key>.json`. An entry's mtime is when it was
+    written, which `max_age_s` counts from; reads only refresh its atime, so size-based
+    eviction drops the least recently used entries first.
+    """
+
+    root: Path
+    max_bytes: int | None = None
+    max_age_s: float | None = None
+    hits: int = 0
+    misses: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @staticmethod
+    def key(cmd: str, prompt: str, tree_hash: str | None = None) -> str:
+        h = hashlib.sha256()
+        for part in (cmd, prompt, tree_hash or ""):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> CachedResponse | None:
+        path = self._path(key)
+        try:
+            st = path.stat()
+            if self.max_age_s is not None and time.time() - st.st_mtime > self.max_age_s:
+                path.unlink(missing_ok=True)
+                raise FileNotFoundError(path)
+            data = json.loads(path.read_text(encoding="utf-8"))
+            # Set explicitly: atime updates on read are off on many mounts (noatime).
+            os.utime(path, (time.time(), st.st_mtime))
+        except (OSError, json.JSONDecodeError):
+            self._count(hit=False)
+            return None
+
+        self._count(hit=True)
+        return CachedResponse(data["returncode"], data["stdout"], data["stderr"])
+
+    def put(self, key: str, response: CachedResponse) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload: dict[str, Any] = {
+            "returncode": response.returncode,
+            "stdout": response.stdout,
+            "stderr": response.stderr,
+        }
+        # Write-then-rename so concurrent readers never see a partial entry.
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently read ones until under max_bytes."""
+        if not self.root.exists():
+            return 0
+
+        now = time.time()
+        removed = 0
+        entries: list[tuple[float, int, Path]] = []
+        for path in self.root.glob("*/*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if self.max_age_s is not None and now - st.st_mtime > self.max_age_s:
+                path.unlink(missing_ok=True)
+                removed += 1
+                continue
+            entries.append((st.st_atime, st.st_size, path))
+
+        if self.max_bytes is not None:
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+
+        return removed
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+# How many bytes before the indexed offset must still match for the offset to be valid.
+_TAIL_BYTES = 64
+
+# Ledger fields that point at run artifacts (linked from the report UI).
+ARTIFACT_KEYS = ("stdout_path", "raw_path", "artifact", "report_path", "trace_path")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    run_id TEXT PRIMARY KEY,
+    byte_offset INTEGER NOT NULL,
+    -- The bytes just before byte_offset, to notice a ledger that was rewritten.
+    tail BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    feature_id TEXT,
+    started_ts TEXT,
+    ended_ts TEXT,
+    outcome TEXT,
+    elapsed_s REAL,
+    verify_ok INTEGER,
+    gate_ok INTEGER,
+    records INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    ts TEXT,
+    step TEXT,
+    node TEXT,
+    status TEXT,
+    tool TEXT,
+    elapsed_s REAL,
+    ok INTEGER,
+    PRIMARY KEY (run_id, line)
+);
+CREATE INDEX IF NOT EXISTS steps_by_step ON steps (step, run_id);
+CREATE TABLE IF NOT EXISTS usage (
+    run_id TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    label TEXT,
+    model TEXT,
+    elapsed_s REAL,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    total_tokens INTEGER,
+    cost_usd REAL,
+    PRIMARY KEY (run_id, line)
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    run_id TEXT NOT NULL,
+    label TEXT NOT NULL,
+    rel TEXT NOT NULL,
+    PRIMARY KEY (run_id, label, rel)
+);
+"""
+
+_RUN_TABLES = ("files", "runs", "steps", "usage", "artifacts")
+
+
+def _flag(value: Any) -> int | None:
+    return int(value) if isinstance(value, bool) else None
+
+
+class Catalog:
+    """SQLite index of every run's ledger: runs, steps, Codex usage and artifacts.
+
+    The catalog only ever reads ledgers: for each run it remembers how many bytes of
+    ledger.jsonl it has indexed, and `update` ingests just the complete lines after
+    that offset. The runner calls it after its ledger writes; `rebuild` (`orch index
+    rebuild`) starts over from the files, so a stale or lost catalog is never a problem.
+    """
+
+    def __init__(self, path: Path, runs_dir: Path, *, timeout: float = 30.0) -> None:
+        self.path = path
+        self.runs_dir = runs_dir
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # `timeout`: how long to wait for another process's write lock.
+        self._db = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def update(self, run_id: str) -> int:
+        """Index what was appended to the run's ledger since the last update; returns
+        the number of new records."""
+        path = self.runs_dir / run_id / "ledger.jsonl"
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT byte_offset, tail FROM files WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            offset, tail = (row["byte_offset"], bytes(row["tail"])) if row else (0, b"")
+            try:
+                f = path.open("rb")
+            except FileNotFoundError:
+                self._forget(run_id)
+                return 0
+            with f:
+                f.seek(offset - len(tail))
+                if f.read(len(tail)) != tail:
+                    # Rewritten or replaced: index the run again from the start.
+                    self._forget(run_id)
+                    offset, tail = 0, b""
+                    f.seek(0)
+                data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end == 0:
+                return 0
+            line_no = self._db.execute(
+                "SELECT COALESCE(MAX(line), 0) FROM steps WHERE run_id = ?", (run_id,)
+            ).fetchone()[0]
+            count = 0
+            for raw in data[:end].splitlines():
+                try:
+                    rec = json.loads(raw)
+                except ValueError:
+                    continue
+                if not isinstance(rec, dict):
+                    continue
+                line_no += 1
+                count += 1
+                self._ingest(run_id, line_no, rec)
+            tail = (tail + data[:end])[-_TAIL_BYTES:]
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (run_id, byte_offset, tail) VALUES (?, ?, ?)",
+                (run_id, offset + end, tail),
+            )
+            return count
+
+    def sync(self) -> int:
+        """`update` every run under runs_dir and drop runs that are gone."""
+        on_disk = {p.parent.name for p in self.runs_dir.glob("*/ledger.jsonl")}
+        with self._lock:
+            known = {r[0] for r in self._db.execute("SELECT run_id FROM files")}
+        for run_id in known - on_disk:
+            with self._lock, self._db:
+                self._forget(run_id)
+        return sum(self.update(run_id) for run_id in sorted(on_disk))
+
+    def rebuild(self) -> int:
+        """Throw the index away and re-read every ledger; returns the record count."""
+        with self._lock, self._db:
+            for table in _RUN_TABLES:
+                self._db.execute(f"DELETE FROM {table}")
+        return self.sync()
+
+    def _forget(self, run_id: str) -> None:
+        for table in _RUN_TABLES:
+            self._db.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+
+    def _ingest(self, run_id: str, line: int, rec: dict[str, Any]) -> None:
+        db = self._db
+        step, ts = rec.get("step"), rec.get("ts")
+        db.execute(
+            "INSERT INTO runs (run_id, started_ts) VALUES (?, ?) ON CONFLICT (run_id) DO NOTHING",
+            (run_id, ts),
+        )
+        db.execute(
+            "UPDATE runs SET records = records + 1, ended_ts = COALESCE(?, ended_ts) "
+            "WHERE run_id = ?",
+            (ts, run_id),
+        )
+        elapsed = rec.get("elapsed_s")
+        db.execute(
+            "INSERT OR REPLACE INTO steps VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                run_id,
+                line,
+                ts,
+                step,
+                rec.get("node"),
+                rec.get("status"),
+                rec.get("tool"),
+                elapsed if isinstance(elapsed, (int, float)) else None,
+                _flag(rec.get("ok")),
+            ),
+        )
+
+        if step == "INTAKE" and rec.get("feature_id"):
+            db.execute(
+                "UPDATE runs SET feature_id = ? WHERE run_id = ?", (rec["feature_id"], run_id)
+            )
+        elif step == "VERIFY" and isinstance(rec.get("ok"), bool):
+            # Passed at least once wins; a failure only shows if nothing passed yet.
+            db.execute(
+                "UPDATE runs SET verify_ok = MAX(COALESCE(verify_ok, 0), ?) WHERE run_id = ?",
+                (int(rec["ok"]), run_id),
+            )
+        elif step == "GATE":
+            db.execute(
+                "UPDATE runs SET gate_ok = ? WHERE run_id = ?", (_flag(rec.get("ok")), run_id)
+            )
+        elif step == "RUN":
+            db.execute(
+                "UPDATE runs SET outcome = ?, elapsed_s = ? WHERE run_id = ?",
+                (rec.get("outcome"), rec.get("elapsed_s"), run_id),
+            )
+        elif step == "CODEX_STATUS":
+            # Per-step usage records carry a delta; older runs only have snapshots.
+            parsed = rec.get("parsed") if isinstance(rec.get("parsed"), dict) else {}
+            usage = rec.get("delta") or parsed
+            if isinstance(usage, dict) and usage:
+                db.execute(
+                    "INSERT OR REPLACE INTO usage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        run_id,
+                        line,
+                        rec.get("label"),
+                        parsed.get("model"),
+                        parsed.get("elapsed_s"),
+                        usage.get("input_tokens"),
+                        usage.get("output_tokens"),
+                        usage.get("total_tokens"),
+                        usage.get("cost_usd"),
+                    ),
+                )
+
+        run_dir = str(self.runs_dir / run_id)
+        for key in ARTIFACT_KEYS:
+            p = rec.get(key)
+            if isinstance(p, str) and p.startswith(run_dir + "/"):
+                db.execute(
+                    "INSERT OR IGNORE INTO artifacts VALUES (?, ?, ?)",
+                    (run_id, key, p[len(run_dir) + 1 :]),
+                )
+
+    def runs(self, *, limit: int | None = None) -> list[dict[str, Any]]:
+        """Run summaries, newest run id first."""
+        sql = "SELECT * FROM runs ORDER BY run_id DESC"
+        params: tuple[Any, ...] = ()
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = (limit,)
+        with self._lock:
+            return [dict(r) for r in self._db.execute(sql, params)]
+
+    def usage(self, run_id: str) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM usage WHERE run_id = ? ORDER BY line", (run_id,)
+            )
+            return [dict(r) for r in rows]
+
+    def artifacts(self, run_id: str) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT label, rel FROM artifacts WHERE run_id = ? ORDER BY rowid", (run_id,)
+            )
+            return [dict(r) for r in rows]
@@ -1,20 +1,278 @@
 from __future__ import annotations
 
+from pathlib import Path
+from typing import Any
+
 import typer
+from rich.console import Console
+from rich.table import Table
 
 from .config import OrchSettings
-from .runner import run_feature
+from .runner import resume_run, run_feature
+from .serve import socket_path
 
 app = typer.Typer(add_completion=False, help="Local orchestration CLI")
+impact_app = typer.Typer(add_completion=False, help="Test-impact map for verify_mode=impact")
+app.add_typer(impact_app, name="impact")
+index_app = typer.Typer(add_completion=False, help="SQLite catalog of runs (report UI)")
+app.add_typer(index_app, name="index")
 
 
 @app.command()
-def run(feature_id: str) -> None:
+def run(
+    feature_id: str = typer.Argument(None, help="Feature to run (e.g. F-001)"),
+    all_features: bool = typer.Option(False, "--all", help="Run every feature in parallel"),
+    workers: int = typer.Option(None, "--workers", "-j", help="Worker processes for --all"),
+) -> None:
     """Run an orchestration pipeline for a feature (e.g. F-001)."""
     settings = OrchSettings()
+    if all_features:
+        _run_batch(None, settings, workers)
+        return
+    if not feature_id:
+        raise typer.BadParameter("Pass a FEATURE_ID or --all")
     run_feature(feature_id, settings)
 
 
+@app.command()
+def resume(run_id: str) -> None:
+    """Resume a run from its first incomplete step (e.g. F-001-20250101-...)."""
+    settings = OrchSettings()
+    resume_run(run_id, settings)
+
+
+@app.command("run-many")
+def run_many(
+    feature_ids: list[str] = typer.Argument(None, help="Features to run; default: all"),
+    workers: int = typer.Option(None, "--workers", "-j", help="Worker processes"),
+) -> None:
+    """Run several features in parallel (default: every feature under features_dir)."""
+    settings = OrchSettings()
+    _run_batch(feature_ids or None, settings, workers)
+
+
+def _run_batch(feature_ids: list[str] | None, settings: OrchSettings, workers: int | None) -> None:
+    from .batch import discover_features, run_many as _run_many
+
+    console = Console()
+    ids = list(dict.fromkeys(feature_ids)) if feature_ids else discover_features(settings)
+    if not ids:
+        console.print(f"No features found under {settings.repo_root / settings.features_dir}")
+        raise typer.Exit(code=1)
+
+    batch = _run_many(ids, settings, max_workers=workers)
+
+    table = Table(title="orch batch")
+    table.add_column("Feature")
+    table.add_column("Result")
+    table.add_column("Elapsed", justify="right")
+    table.add_column("Run / error")
+    for r in batch.results:
+        table.add_row(
+            r.feature_id,
+            "[green]PASS[/green]" if r.ok else "[red]FAIL[/red]",
+            f"{r.elapsed_s:.1f}s",
+            str(r.run_dir) if r.ok else (r.error or ""),
+        )
+    console.print(table)
+    console.print(
+        f"{len(batch.passed)} passed, {len(batch.failed)} failed "
+        f"in {batch.elapsed_s:.1f}s wall-clock"
+    )
+
+    if not batch.ok:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def serve(
+    slots: int = typer.Option(None, "--slots", "-j", help="Concurrent runs (worker slots)"),
+) -> None:
+    """Run the job-queue daemon: accepts `orch submit` requests and runs them."""
+    import signal
+
+    from .serve import Daemon, ServeError
+
+    settings = OrchSettings()
+    daemon = Daemon(settings, slots=slots)
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+    typer.echo(f"orch serve: {daemon.slots} slots, socket {daemon.socket_path}")
+    try:
+        daemon.serve_forever()
+    except ServeError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1) from None
+
+
+@app.command()
+def submit(
+    feature_ids: list[str] = typer.Argument(..., help="Features to queue"),
+    priority: int = typer.Option(0, "--priority", "-p", help="Higher runs first"),
+) -> None:
+    """Queue runs on a running `orch serve`."""
+    path = socket_path(OrchSettings())
+    for feature_id in feature_ids:
+        payload = {"op": "submit", "feature_id": feature_id, "priority": priority}
+        job = _request(path, payload)["job"]
+        typer.echo(f"{job['job_id']} {feature_id} (priority {priority})")
+
+
+@app.command("queue")
+def queue_list() -> None:
+    """Show the jobs known to `orch serve`."""
+    jobs = _request(socket_path(OrchSettings()), {"op": "list"})["jobs"]
+    table = Table(title="orch queue")
+    for col in ("Job", "Feature", "Priority", "State", "Run / error"):
+        table.add_column(col)
+    for j in jobs:
+        table.add_row(
+            j["job_id"],
+            j["feature_id"],
+            str(j["priority"]),
+            j["state"],
+            j["error"] or j["run_id"] or "",
+        )
+    Console().print(table)
+
+
+def _request(path: Path, payload: dict[str, Any]) -> dict[str, Any]:
+    from .serve import ServeError, request
+
+    try:
+        return request(path, payload)
+    except ServeError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1) from None
+
+
+@impact_app.command("build")
+def impact_build() -> None:
+    """Rebuild the test -> source-file map by running each test file under coverage."""
+    from .impact import build_impact_map
+
+    settings = OrchSettings()
+    impact = build_impact_map(settings)
+    typer.echo(
+        f"Mapped {len(impact.tests)} test files -> {settings.repo_root / settings.impact_map_path}"
+    )
+
+
+@app.command()
+def archive(
+    older_than_days: float = typer.Option(
+        None, "--older-than-days", help="Default: ORCH_ARCHIVE_AFTER_DAYS"
+    ),
+) -> None:
+    """Pack artifacts of finished, idle runs into one runs/<run_id>/artifacts.zip each."""
+    from .artifacts import archive_runs
+
+    settings = OrchSettings()
+    days = settings.archive_after_days if older_than_days is None else older_than_days
+    done = archive_runs(settings.repo_root / settings.runs_dir, older_than_s=days * 86400)
+    before = sum(s.bytes_before for s in done.values())
+    after = sum(s.bytes_after for s in done.values())
+    typer.echo(f"Archived {len(done)} runs: {before} -> {after} bytes")
+
+
+@app.command()
+def tail(
+    run_ids: list[str] = typer.Argument(None, help="Runs to follow; default: every run in flight"),
+    lines: int = typer.Option(10, "--lines", "-n", help="Earlier ledger records to show first"),
+    poll: bool = typer.Option(False, "--poll", help="Poll files instead of using inotify"),
+) -> None:
+    """Follow runs live: new ledger records and the output of the steps running now."""
+    from rich.markup import escape
+
+    from .tail import Tailer, format_record, runs_in_flight
+
+    settings = OrchSettings()
+    runs_dir = settings.repo_root / settings.runs_dir
+    if run_ids:
+        run_dirs = [runs_dir / run_id for run_id in dict.fromkeys(run_ids)]
+        missing = [d.name for d in run_dirs if not (d / "ledger.jsonl").exists()]
+        if missing:
+            raise typer.BadParameter(f"no such run: {', '.join(missing)}")
+    else:
+        run_dirs = runs_in_flight(runs_dir)
+        if not run_dirs:
+            typer.echo("No runs in flight")
+            return
+
+    console = Console(highlight=False)
+    many = len(run_dirs) > 1
+    current: tuple[str, str | None] | None = None
+    # Output chunks need not end a line; start records and headers on a fresh one.
+    mid_line = False
+    with Tailer(
+        run_dirs,
+        backlog=lines,
+        poll_interval_s=settings.tail_poll_interval_s,
+        use_inotify=not poll,
+    ) as tailer:
+        try:
+            for event in tailer.follow():
+                prefix = f"[cyan]{escape(event.run_id)}[/cyan] " if many else ""
+                if event.record is not None or current != (event.run_id, event.path):
+                    if mid_line:
+                        console.out("")
+                        mid_line = False
+                if event.record is not None:
+                    line = format_record(event.record, run_dir=runs_dir / event.run_id)
+                    console.print(prefix + escape(line), soft_wrap=True)
+                    current = None
+                    continue
+                if current != (event.run_id, event.path):
+                    current = (event.run_id, event.path)
+                    console.print(f"{prefix}[dim]── {escape(str(event.path))} ──[/dim]")
+                console.out(event.text, end="", highlight=False)
+                mid_line = not event.text.endswith("\n")
+        except KeyboardInterrupt:
+            pass
+
+
+@app.command()
+def gc() -> None:
+    """Delete artifact objects (runs/.objects) that no run links to any more."""
+    from .artifacts import gc_objects
+
+    settings = OrchSettings()
+    stats = gc_objects(settings.repo_root / settings.objects_dir)
+    typer.echo(f"Removed {stats.removed} objects ({stats.bytes_freed} bytes), kept {stats.kept}")
+
+
+@index_app.command("rebuild")
+def index_rebuild() -> None:
+    """Recreate the run catalog from every runs/*/ledger.jsonl."""
+    from .catalog import Catalog
+
+    settings = OrchSettings()
+    catalog = Catalog(
+        settings.repo_root / settings.catalog_path, settings.repo_root / settings.runs_dir
+    )
+    try:
+        records = catalog.rebuild()
+        runs = len(catalog.runs())
+    finally:
+        catalog.close()
+    typer.echo(f"Indexed {records} records from {runs} runs -> {catalog.path}")
+
+
+@index_app.command("sync")
+def index_sync() -> None:
+    """Index ledger records appended since the last update (e.g. by older orch versions)."""
+    from .catalog import Catalog
+
+    settings = OrchSettings()
+    catalog = Catalog(
+        settings.repo_root / settings.catalog_path, settings.repo_root / settings.runs_dir
+    )
+    try:
+        records = catalog.sync()
+    finally:
+        catalog.close()
+    typer.echo(f"Indexed {records} new records -> {catalog.path}")
+
+
 @app.command()
 def version() -> None:
     """Print the orch version."""
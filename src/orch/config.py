@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
 import sys
+from typing import Literal
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from .limits import default_root
+
 
 class OrchSettings(BaseSettings):
     """Configuration for orch.
@@ -27,8 +31,117 @@ class OrchSettings(BaseSettings):
     features_dir: Path = Path("docs/features")
     runs_dir: Path = Path("runs")
 
+    # Batch runs (`orch run-many`): size of the worker process pool.
+    max_parallel_runs: int = Field(default_factory=lambda: min(4, os.cpu_count() or 1))
+
+    # `orch serve`: persistent job queue (and its Unix socket), relative to repo_root.
+    # The daemon runs at most max_parallel_runs jobs at once unless told otherwise.
+    queue_dir: Path = Path("runs/.queue")
+
+    # Run isolation: give every run its own copy of the repo so concurrent runs never
+    # share a checkout. "worktree" uses `git worktree` on a snapshot of the working
+    # tree, "copy" a reflink (copy-on-write) copy, "auto" picks worktree for git repos.
+    # The run's changes are saved as runs/<run_id>/workspace/changes.patch; the
+    # workspace is deleted when the run succeeds and kept for `orch resume` otherwise.
+    # Left unset, `run-many` / `run --all` and `orch serve` use "auto" whenever more
+    # than one run can be in flight (see parallel_settings).
+    isolation: Literal["none", "auto", "worktree", "copy"] = "none"
+    workspaces_dir: Path = Path("runs/.workspaces")
+    workspace_max_age_s: float = 24 * 3600
+    keep_workspace: bool = False
+
+    # Step scheduler: how many independent pipeline nodes may run at once.
+    max_step_workers: int = 4
+
+    # Ledger writes: 0 writes every record as it is appended; otherwise records are
+    # batched and written at most this many seconds later (and at the end of the run).
+    # ledger_fsync also fsyncs every write, for durability across power loss.
+    ledger_flush_interval_s: float = 0.0
+    ledger_fsync: bool = False
+
+    # SQLite catalog of all runs (see orch.catalog), updated as ledgers are written;
+    # `orch index rebuild` recreates it from the ledgers. A run waits at most
+    # catalog_busy_timeout_s for a locked catalog and otherwise skips that update.
+    catalog_enabled: bool = True
+    catalog_path: Path = Path("runs/.catalog.sqlite")
+    catalog_busy_timeout_s: float = 1.0
+
+    # `orch tail`: how often to check followed runs where inotify is unavailable.
+    tail_poll_interval_s: float = 0.5
+
+    # Run artifacts (see orch.artifacts): compress those of at least
+    # artifact_compress_min_bytes ("zstd" needs the zstandard package). Logs that are
+    # streamed while a tool runs are compressed when the run finishes. `orch archive`
+    # packs finished runs idle for archive_after_days into runs/<run_id>/artifacts.zip.
+    # Readers (resume, the report UI) find artifacts wherever they ended up.
+    artifact_compression: Literal["none", "gzip", "zstd"] = "none"
+    artifact_compress_min_bytes: int = 4096
+    archive_after_days: float = 14
+    # Opt-in: store identical artifacts (the same feature.md, plan, review, ... across
+    # runs) once: run files become hardlinks into objects_dir, keyed by SHA-256. orch
+    # only ever replaces artifacts, but anything else that edits a run's files in place
+    # would change every run sharing them. `orch gc` deletes objects no run links to.
+    artifact_dedupe: bool = False
+    objects_dir: Path = Path("runs/.objects")
+
+    # Write runs/<run_id>/trace.json (Chrome Trace Event format; see orch.trace).
+    trace_enabled: bool = True
+
+    # Wall-clock budgets in seconds (None: unlimited). step_timeouts_s is keyed by
+    # pipeline node name ("plan", "verify", ...); other nodes get default_step_timeout_s.
+    # Tool and test processes still running at their deadline are killed (whole
+    # process group) and the step is recorded as "timeout".
+    run_timeout_s: float | None = None
+    default_step_timeout_s: float | None = 3600.0
+    step_timeouts_s: dict[str, float] = Field(default_factory=dict)
+
+    # Host-wide resource pools, shared by every orch process on the machine (see
+    # orch.limits): "codex", "claude" and "verify". resource_limits caps concurrent
+    # calls per pool; resource_rates caps how many may start per second. Pools that
+    # are not listed are unlimited.
+    resource_limits: dict[str, int] = Field(
+        default_factory=lambda: {"codex": 4, "claude": 4, "verify": os.cpu_count() or 1}
+    )
+    resource_rates: dict[str, float] = Field(default_factory=dict)
+    resource_dir: Path = Field(default_factory=default_root)
+
+    # Warm tool workers: keep Codex/Claude processes alive between prompts, started as
+    # `<cmd> <tool_worker_serve_flag>` (the tool must support that server mode).
+    tool_workers: bool = False
+    tool_worker_pool_size: int = 2
+    tool_worker_max_requests: int = 50
+    tool_worker_serve_flag: str = "--serve"
+
+    # Opt-in response cache for Codex/Claude calls (see orch.cache).
+    # Only steps listed in cache_steps are cached; EXECUTE and FIX never are.
+    cache_enabled: bool = False
+    cache_dir: Path = Path("runs/.cache")
+    cache_steps: tuple[str, ...] = ("PLAN",)
+    cache_key_tree: bool = True
+    cache_max_bytes: int | None = 256 * 1024 * 1024
+    # Counted from when an entry was written; reading it does not extend it.
+    cache_max_age_s: float | None = 7 * 24 * 3600
+
+    # Prompt assembly: approximate token budget per step (steps not listed are
+    # unbounded). Content over budget is trimmed; see orch.prompts.
+    prompt_budgets: dict[str, int] = Field(
+        default_factory=lambda: {"PLAN": 8000, "EXECUTE": 16000, "REVIEW": 8000}
+    )
+    # Drop paragraphs a prompt already contains. Tools do not keep context between calls,
+    # so nothing sent in an earlier prompt is dropped; ledger records count those repeats
+    # as prompt.repeated_tokens.
+    prompt_dedupe: bool = True
+
     # Fix loop
     max_fix_iterations: int = 3
+    # Stop the fix loop after this many iterations in a row without
+    # progress: a patch we already tested, or exactly the same failures as before.
+    # The first such iteration retries with an escalated prompt instead.
+    fix_stall_limit: int = 2
+    # >1: race this many FIX candidates per iteration in separate git worktrees and
+    # promote the first one whose tests pass (needs repo_root to be a git checkout).
+    # If none passes, the one with the fewest failing tests is kept for the next round.
+    fix_speculation: int = 1
 
     # Verification command (must be allowlisted)
     verify_command: str = Field(
@@ -38,6 +151,26 @@ class OrchSettings(BaseSettings):
         )
     )
 
+    # Verification mode:
+    # - "full": every VERIFY runs verify_command.
+    # - "impact": VERIFY and fix-loop re-runs only run tests affected by the working-tree
+    #   changes since INTAKE (per the coverage map built by `orch impact build`);
+    #   the GATE then runs verify_command once.
+    verify_mode: Literal["full", "impact"] = "full"
+    impact_map_path: Path = Path("runs/.impact/map.json")
+    impact_test_globs: tuple[str, ...] = ("tests/test_*.py", "tests/**/test_*.py")
+    impact_ignore_globs: tuple[str, ...] = ("*.md", "docs/*", "runs/*")
+
+    # Base pytest invocation used when orch picks the tests itself (impact subsets).
+    pytest_command: str = Field(default_factory=lambda: f"{sys.executable} -m pytest -q")
+
+    # Sharded verification: split the selected tests into this many concurrent pytest
+    # processes, balanced by per-test durations from the last shard_history_runs runs.
+    # Shards keep the options of the command being split (verify_command, or
+    # pytest_command for impact subsets) and replace its test paths with node ids.
+    verify_shards: int = 1
+    shard_history_runs: int = 20
+
     # Shell command allowlist (regexes)
     allowlist_regex: tuple[str, ...] = (
         r"^python(3)?(\s|$)",
@@ -48,3 +181,17 @@ class OrchSettings(BaseSettings):
         r"^pip(\s|$)",
         r"^git(\s|$)",
     )
+
+
+def parallel_settings(settings: OrchSettings, runs: int) -> tuple[OrchSettings, int]:
+    """Settings, and how many may run at once, for `runs` concurrent runs of one repo.
+
+    Concurrent runs must not share a working tree: unless isolation was chosen
+    explicitly, it becomes "auto" (a worktree or copy per run). With an explicit
+    isolation="none" the runs go one at a time instead.
+    """
+    if runs <= 1 or settings.isolation != "none":
+        return settings, runs
+    if "isolation" in settings.model_fields_set:
+        return settings, 1
+    return settings.model_copy(update={"isolation": "auto"}), runs
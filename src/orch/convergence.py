@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .impact import changed_files
+
+# pytest's short test summary: "FAILED tests/test_x.py::test_y - AssertionError: ..."
+_SUMMARY_RE = re.compile(r"^(?:FAILED|ERROR) (?P<id>\S+)(?: - (?P<msg>.*))?$", re.M)
+
+# Parts of a failure message that change between runs without the failure changing:
+# object addresses, temporary paths, timestamps and durations. Other numbers are kept,
+# since a changed asserted value is a changed failure.
+_VOLATILE = (
+    (re.compile(r"0x[0-9a-fA-F]+"), "0x?"),
+    (re.compile(r"(?:/tmp|/var/folders|/private/var)/\S+"), "<tmp>"),
+    (
+        re.compile(
+            r"\b(?:\d{4}-\d{2}-\d{2}[T ])?\d{2}:\d{2}:\d{2}(?:[.,]\d+)?"
+            r"(?:Z|[+-]\d{2}:?\d{2})?"
+        ),
+        "<time>",
+    ),
+    (re.compile(r"\b\d+(?:\.\d+)?\s?(?:s|ms|us|µs|ns|sec|seconds)\b"), "<duration>"),
+)
+
+
+def failure_signatures(pytest_output: str) -> dict[str, str]:
+    """{test id: normalized failure message} from pytest's short test summary."""
+    out: dict[str, str] = {}
+    for m in _SUMMARY_RE.finditer(pytest_output):
+        msg = m.group("msg") or ""
+        for rex, repl in _VOLATILE:
+            msg = rex.sub(repl, msg)
+        out[m.group("id")] = " ".join(msg.split())
+    return out
+
+
+def diff_fingerprint(root: Path, baseline: dict[str, list[int]], now: dict[str, list[int]]) -> str:
+    """Hash of the content of every file changed between two `snapshot_tree` results."""
+    h = hashlib.sha256()
+    for rel in sorted(changed_files(baseline, now)):
+        h.update(rel.encode("utf-8") + b"\0")
+        try:
+            h.update(hashlib.sha256((root / rel).read_bytes()).digest())
+        except OSError:
+            h.update(b"<deleted>")
+    return h.hexdigest()
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    failing: frozenset[str]
+    signature: str
+    diff: str
+
+    @classmethod
+    def of(cls, pytest_output: str, diff: str) -> Fingerprint:
+        sigs = failure_signatures(pytest_output)
+        # No parseable summary (e.g. a collection error): fall back to the raw tail.
+        basis = repr(sorted(sigs.items())) if sigs else " ".join(pytest_output[-2000:].split())
+        return cls(frozenset(sigs), hashlib.sha256(basis.encode("utf-8")).hexdigest(), diff)
+
+    def as_dict(self) -> dict[str, object]:
+        return {
+            "failing": len(self.failing),
+            "signature": self.signature[:12],
+            "diff": self.diff[:12],
+        }
+
+
+@dataclass
+class ConvergenceTracker:
+    """Classifies fix-loop iterations and decides when to escalate or give up.
+
+    An iteration makes no progress if its diff is one we have already tested, or if it
+    fails with exactly the same failures as the iteration before. The first such
+    iteration asks for escalation; `stall_limit` in a row stops the loop.
+    """
+
+    stall_limit: int = 2
+    stalls: int = 0
+    _seen_diffs: set[str] = field(default_factory=set)
+    _last: Fingerprint | None = None
+
+    def observe(self, fp: Fingerprint) -> str:
+        """Record an iteration's outcome; returns how it compares to the previous one."""
+        last, self._last = self._last, fp
+        seen = fp.diff in self._seen_diffs
+        self._seen_diffs.add(fp.diff)
+        if last is None:
+            return "baseline"
+
+        if seen:
+            progress = "same-diff"
+        elif fp.signature == last.signature and fp.failing == last.failing:
+            progress = "same-failures"
+        elif fp.failing < last.failing:
+            progress = "improved"
+        else:
+            progress = "changed"
+
+        self.stalls = self.stalls + 1 if progress in ("same-diff", "same-failures") else 0
+        return progress
+
+    @property
+    def escalate(self) -> bool:
+        return self.stalls >= 1
+
+    @property
+    def stop(self) -> bool:
+        return self.stalls >= self.stall_limit
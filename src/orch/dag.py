@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from .deadline import Cancelled
+from .engine import kill_children
+from .ledger import Ledger
+from .types import Step
+
+
+class DagError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class StepNode:
+    """One node of the run pipeline.
+
+    `inputs` and `outputs` are artifact names (e.g. "plan/plan.md" or "usage:pre-plan").
+    A node becomes ready once every node producing one of its inputs has finished.
+    """
+
+    name: str
+    fn: Callable[[Any], Any]
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
+
+
+def dependencies(nodes: Iterable[StepNode]) -> dict[str, set[str]]:
+    """Map each node name to the names of the nodes it depends on.
+
+    Raises DagError for duplicate names/outputs, unknown inputs and cycles.
+    """
+
+    nodes = list(nodes)
+    producers: dict[str, str] = {}
+    names: set[str] = set()
+    for node in nodes:
+        if node.name in names:
+            raise DagError(f"Duplicate step node: {node.name}")
+        names.add(node.name)
+        for out in node.outputs:
+            if out in producers:
+                raise DagError(f"Output {out!r} produced by both {producers[out]} and {node.name}")
+            producers[out] = node.name
+
+    deps: dict[str, set[str]] = {}
+    for node in nodes:
+        missing = [i for i in node.inputs if i not in producers]
+        if missing:
+            raise DagError(f"Step node {node.name} needs unknown inputs: {', '.join(missing)}")
+        deps[node.name] = {producers[i] for i in node.inputs}
+
+    # Kahn's algorithm, only to reject cycles up front.
+    remaining = {name: set(d) for name, d in deps.items()}
+    while remaining:
+        ready = [name for name, d in remaining.items() if not d]
+        if not ready:
+            raise DagError("Step graph has a cycle: " + ", ".join(sorted(remaining)))
+        for name in ready:
+            del remaining[name]
+        for d in remaining.values():
+            d.difference_update(ready)
+
+    return deps
+
+
+def reusable(nodes: Iterable[StepNode], completed: Iterable[str]) -> set[str]:
+    """Names of `completed` nodes that can be skipped on a re-run.
+
+    A completed node is only reusable if everything upstream of it is reusable too:
+    once a node re-runs, all of its dependents must re-run as well.
+    """
+
+    deps = dependencies(nodes)
+    completed = set(completed)
+    reuse: set[str] = set()
+    changed = True
+    while changed:
+        changed = False
+        for name, d in deps.items():
+            if name in completed and name not in reuse and d <= reuse:
+                reuse.add(name)
+                changed = True
+    return reuse
+
+
+def _ledger_value(value: Any) -> Any:
+    # Only scalar node results go into the ledger; artifacts live on disk.
+    return value if isinstance(value, (bool, int, float, str)) else None
+
+
+def run_dag(
+    nodes: Iterable[StepNode],
+    ctx: Any,
+    *,
+    results: dict[str, Any],
+    ledger: Ledger | None = None,
+    max_workers: int = 4,
+    skip: Iterable[str] = (),
+    cancel: threading.Event | None = None,
+) -> dict[str, Any]:
+    """Run `nodes` as soon as their dependencies are satisfied.
+
+    Each node is called as `fn(ctx)`; its return value is stored in `results` under the
+    node name before any dependent node starts. Every finished node is recorded in the
+    ledger as a NODE record. If a node raises, no new nodes are started, in-flight nodes
+    are allowed to finish, and the first exception is re-raised; nodes that never ran
+    are recorded as "cancelled". A node that raised a TimeoutError is recorded as
+    "timeout" rather than "failed".
+
+    `cancel` is set as soon as a node fails, so in-flight nodes can stop early; if it is
+    set from outside, no new nodes are started either. If waiting is interrupted
+    (KeyboardInterrupt), `cancel` is set and the child processes of in-flight nodes are
+    killed before the interrupt propagates.
+
+    Nodes named in `skip` are treated as already finished (their results must already
+    be in `results`); see `reusable`.
+    """
+
+    nodes = list(nodes)
+    by_name = {n.name: n for n in nodes}
+    pending = dependencies(nodes)
+    skip = set(skip)
+    for name in skip:
+        pending.pop(name, None)
+    for d in pending.values():
+        d.difference_update(skip)
+    running: dict[Future[Any], tuple[str, float]] = {}
+    error: BaseException | None = None
+
+    def _submit_ready(pool: ThreadPoolExecutor) -> None:
+        ready = [name for name, d in pending.items() if not d]
+        for name in ready:
+            del pending[name]
+            running[pool.submit(by_name[name].fn, ctx)] = (name, time.monotonic())
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="orch-step") as pool:
+        _submit_ready(pool)
+        try:
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name, started = running.pop(fut)
+                    elapsed = round(time.monotonic() - started, 3)
+                    exc = fut.exception()
+                    if exc is not None:
+                        status = "timeout" if isinstance(exc, TimeoutError) else "failed"
+                        if ledger is not None:
+                            ledger.append(
+                                {
+                                    "step": Step.NODE,
+                                    "node": name,
+                                    "status": status,
+                                    "elapsed_s": elapsed,
+                                    "error": f"{type(exc).__name__}: {exc}",
+                                }
+                            )
+                        error = error or exc
+                        if cancel is not None:
+                            cancel.set()
+                        continue
+
+                    value = fut.result()
+                    results[name] = value
+                    if ledger is not None:
+                        ledger.append(
+                            {
+                                "step": Step.NODE,
+                                "node": name,
+                                "status": "done",
+                                "elapsed_s": elapsed,
+                                "output": _ledger_value(value),
+                            }
+                        )
+                    for d in pending.values():
+                        d.discard(name)
+
+                if error is None and not (cancel is not None and cancel.is_set()):
+                    _submit_ready(pool)
+        except BaseException:
+            # Interrupted while waiting (Ctrl-C). Tool and test processes run in their
+            # own sessions and never see the terminal's SIGINT: stop them, or leaving
+            # the executor would wait for them to finish on their own.
+            if cancel is not None:
+                cancel.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+            while running:
+                kill_children()
+                done, _ = wait(running, timeout=0.5)
+                for fut in done:
+                    del running[fut]
+            raise
+
+    if pending and ledger is not None:
+        for name in pending:
+            ledger.append({"step": Step.NODE, "node": name, "status": "cancelled"})
+    if error is not None:
+        raise error
+    if pending:
+        raise Cancelled("pipeline cancelled before " + ", ".join(sorted(pending)))
+    return results
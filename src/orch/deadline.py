@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator
+
+
+class DeadlineExceeded(TimeoutError):
+    """A step (or the whole run) used up its wall-clock budget."""
+
+    def __init__(self, scope: str, budget_s: float) -> None:
+        super().__init__(f"{scope} exceeded its {budget_s:g}s budget")
+        self.scope = scope
+        self.budget_s = budget_s
+
+
+class Cancelled(RuntimeError):
+    """The run is being torn down; in-flight steps stop at their next checkpoint."""
+
+
+@dataclass(frozen=True)
+class Deadline:
+    scope: str
+    budget_s: float
+    at: float
+
+    @classmethod
+    def after(cls, scope: str, budget_s: float | None) -> Deadline | None:
+        if budget_s is None:
+            return None
+        return cls(scope, budget_s, time.monotonic() + budget_s)
+
+    def remaining(self) -> float:
+        return max(0.0, self.at - time.monotonic())
+
+    def exceeded(self) -> DeadlineExceeded:
+        return DeadlineExceeded(self.scope, self.budget_s)
+
+
+def tightest(*deadlines: Deadline | None) -> Deadline | None:
+    found = [d for d in deadlines if d is not None]
+    return min(found, key=lambda d: d.at) if found else None
+
+
+# The deadline governing the code running in this context (thread or asyncio task).
+_CURRENT: ContextVar[Deadline | None] = ContextVar("orch_deadline", default=None)
+
+
+def current() -> Deadline | None:
+    return _CURRENT.get()
+
+
+@contextmanager
+def bounded(deadline: Deadline | None) -> Iterator[None]:
+    """Run the block under `deadline` (or the enclosing one, whichever is sooner)."""
+    token = _CURRENT.set(tightest(_CURRENT.get(), deadline))
+    try:
+        yield
+    finally:
+        _CURRENT.reset(token)
+
+
+def remaining_s() -> float | None:
+    """Timeout for the next blocking call; raises DeadlineExceeded if there is no time left."""
+    deadline = _CURRENT.get()
+    if deadline is None:
+        return None
+    left = deadline.remaining()
+    if left <= 0:
+        raise deadline.exceeded()
+    return left
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, BinaryIO
+
+# How much of each stream we keep in memory; everything else only goes to disk.
+DEFAULT_TAIL_BYTES = 64 * 1024
+
+_CHUNK = 64 * 1024
+
+
+@dataclass
+class StreamResult:
+    command: str
+    returncode: int
+    stdout: str
+    stderr: str
+    # True if stdout/stderr hold only the last `tail_bytes` of the stream.
+    truncated: bool = False
+    # Wall time and rusage of the child and the descendants it waited for; see _resources.
+    resources: dict[str, Any] | None = None
+
+
+def _resources(wall_s: float, ru: Any) -> dict[str, Any]:
+    # ru_maxrss is in kilobytes on Linux but bytes on macOS.
+    rss_kb = ru.ru_maxrss // 1024 if sys.platform == "darwin" else ru.ru_maxrss
+    return {
+        "wall_s": round(wall_s, 3),
+        "user_s": round(ru.ru_utime, 3),
+        "sys_s": round(ru.ru_stime, 3),
+        "max_rss_kb": rss_kb,
+        "in_blocks": ru.ru_inblock,
+        "out_blocks": ru.ru_oublock,
+    }
+
+
+class _Tail:
+    """Bounded in-memory tail of a byte stream."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.chunks: deque[bytes] = deque()
+        self.size = 0
+        self.dropped = False
+
+    def feed(self, chunk: bytes) -> None:
+        self.chunks.append(chunk)
+        self.size += len(chunk)
+        while self.size > self.limit and self.chunks:
+            head = self.chunks.popleft()
+            overflow = self.size - self.limit
+            self.dropped = True
+            if len(head) > overflow:
+                self.chunks.appendleft(head[overflow:])
+                self.size -= overflow
+            else:
+                self.size -= len(head)
+
+    def text(self) -> str:
+        return b"".join(self.chunks).decode("utf-8", errors="replace")
+
+
+async def _pump(stream: asyncio.StreamReader, tail: _Tail, sink: BinaryIO | None) -> None:
+    while True:
+        chunk = await stream.read(_CHUNK)
+        if not chunk:
+            return
+        tail.feed(chunk)
+        if sink is not None:
+            sink.write(chunk)
+            # Flush per chunk so the artifact can be followed while the step runs.
+            sink.flush()
+
+
+def merge_resources(items: list[dict[str, Any] | None]) -> dict[str, Any] | None:
+    """Combine `resources` of processes that ran concurrently (e.g. test shards)."""
+    items = [r for r in items if r]
+    if not items:
+        return None
+    return {
+        "wall_s": max(r["wall_s"] for r in items),
+        "user_s": round(sum(r["user_s"] for r in items), 3),
+        "sys_s": round(sum(r["sys_s"] for r in items), 3),
+        "max_rss_kb": max(r["max_rss_kb"] for r in items),
+        "in_blocks": sum(r["in_blocks"] for r in items),
+        "out_blocks": sum(r["out_blocks"] for r in items),
+    }
+
+
+# Process groups of the children we started and have not reaped yet. They lead their
+# own sessions, so a Ctrl-C in the terminal never reaches them; see kill_children.
+_GROUPS: set[int] = set()
+_GROUPS_LOCK = threading.Lock()
+
+
+def track_group(pid: int) -> None:
+    with _GROUPS_LOCK:
+        _GROUPS.add(pid)
+
+
+def untrack_group(pid: int) -> None:
+    with _GROUPS_LOCK:
+        _GROUPS.discard(pid)
+
+
+def kill_children() -> int:
+    """SIGKILL the process group of every child still tracked; returns how many."""
+    with _GROUPS_LOCK:
+        groups = list(_GROUPS)
+    for pid in groups:
+        _kill(pid)
+    return len(groups)
+
+
+def _kill(pid: int) -> None:
+    # The child leads its own process group (start_new_session), so this also takes
+    # down whatever the shell started; otherwise they would keep our pipes open. The
+    # group may outlive the shell itself, so signal it even if the shell has exited.
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+async def _pipe_reader(pipe: IO[bytes]) -> tuple[asyncio.StreamReader, asyncio.BaseTransport]:
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=_CHUNK)
+    transport, _ = await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), pipe
+    )
+    return reader, transport
+
+
+def _open_sink(stack: ExitStack, path: Path | None) -> BinaryIO | None:
+    if path is None:
+        return None
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # An earlier copy may be a hardlink into the artifact object store: replace it,
+    # never truncate it in place.
+    path.unlink(missing_ok=True)
+    return stack.enter_context(path.open("wb"))
+
+
+async def run_streaming(
+    command: str,
+    *,
+    cwd: Path,
+    env: dict[str, str] | None = None,
+    timeout_s: float | None = None,
+    stdout_path: Path | None = None,
+    stderr_path: Path | None = None,
+    tail_bytes: int = DEFAULT_TAIL_BYTES,
+) -> StreamResult:
+    """Run a shell command, streaming its output to disk as it arrives.
+
+    stdout goes to `stdout_path` and stderr to `stderr_path` (either may be None). If both
+    paths are the same file, the streams are interleaved into it in arrival order. Only the
+    last `tail_bytes` of each stream are kept in memory and returned.
+
+    Raises subprocess.TimeoutExpired after `timeout_s`, like subprocess.run. On timeout or
+    cancellation the child's whole process group is killed and reaped before the
+    exception propagates.
+    """
+
+    out_tail, err_tail = _Tail(tail_bytes), _Tail(tail_bytes)
+
+    with ExitStack() as stack:
+        out_sink = _open_sink(stack, stdout_path)
+        if stderr_path is not None and stderr_path == stdout_path:
+            err_sink = out_sink
+        else:
+            err_sink = _open_sink(stack, stderr_path)
+
+        # Popen + our own wait4() instead of asyncio's subprocess API: reaping the
+        # child ourselves is the only way to get its rusage.
+        started = time.monotonic()
+        proc = subprocess.Popen(
+            command,
+            shell=True,
+            cwd=str(cwd),
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+        assert proc.stdout is not None and proc.stderr is not None
+        track_group(proc.pid)
+        loop = asyncio.get_running_loop()
+        reaped = loop.run_in_executor(None, os.wait4, proc.pid, 0)
+        transports: list[asyncio.BaseTransport] = []
+
+        async def _communicate() -> tuple[int, Any]:
+            out, t_out = await _pipe_reader(proc.stdout)
+            err, t_err = await _pipe_reader(proc.stderr)
+            transports.extend((t_out, t_err))
+            await asyncio.gather(_pump(out, out_tail, out_sink), _pump(err, err_tail, err_sink))
+            _, status, ru = await asyncio.shield(reaped)
+            return os.waitstatus_to_exitcode(status), ru
+
+        try:
+            returncode, ru = await asyncio.wait_for(_communicate(), timeout=timeout_s)
+        except BaseException as e:
+            _kill(proc.pid)
+            _, status, _ = await reaped
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            if isinstance(e, asyncio.TimeoutError):
+                raise subprocess.TimeoutExpired(command, timeout_s) from None
+            raise
+        finally:
+            untrack_group(proc.pid)
+            for t in transports:
+                t.close()
+            proc.stdout.close()
+            proc.stderr.close()
+        proc.returncode = returncode
+        resources = _resources(time.monotonic() - started, ru)
+
+    return StreamResult(
+        command=command,
+        returncode=returncode,
+        stdout=out_tail.text(),
+        stderr=err_tail.text(),
+        truncated=out_tail.dropped or err_tail.dropped,
+        resources=resources,
+    )
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import fnmatch
+import json
+import os
+import shlex
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .allowlist import CommandAllowlist
+from .config import OrchSettings
+from .shell import run_allowed
+
+# Never part of the working-tree diff.
+_SKIP_DIRS = {
+    ".git",
+    ".venv",
+    "venv",
+    "__pycache__",
+    ".pytest_cache",
+    ".mypy_cache",
+    ".ruff_cache",
+    "node_modules",
+}
+
+
+def snapshot_tree(root: Path, *, exclude: tuple[Path, ...] = ()) -> dict[str, list[int]]:
+    """Cheap fingerprint of every file under `root`: {relpath: [mtime_ns, size]}."""
+    excluded = {str(p.resolve()) for p in exclude}
+    out: dict[str, list[int]] = {}
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        try:
+            entries = list(os.scandir(d))
+        except OSError:
+            continue
+        for e in entries:
+            if e.is_dir(follow_symlinks=False):
+                if e.name in _SKIP_DIRS or e.name.endswith(".egg-info"):
+                    continue
+                if str(Path(e.path).resolve()) in excluded:
+                    continue
+                stack.append(Path(e.path))
+            elif e.is_file(follow_symlinks=False):
+                st = e.stat(follow_symlinks=False)
+                out[Path(e.path).relative_to(root).as_posix()] = [st.st_mtime_ns, st.st_size]
+    return out
+
+
+def changed_files(before: dict[str, list[int]], after: dict[str, list[int]]) -> set[str]:
+    """Files added, removed or modified between two `snapshot_tree` results."""
+    return {p for p in before.keys() | after.keys() if before.get(p) != after.get(p)}
+
+
+@dataclass
+class ImpactMap:
+    """Which source files each test file exercises (derived from coverage)."""
+
+    tests: dict[str, list[str]] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path) -> "ImpactMap | None":
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
+        return cls(tests={k: list(v) for k, v in data.get("tests", {}).items()})
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"version": 1, "tests": self.tests}, indent=2), encoding="utf-8")
+
+
+def is_test_file(rel: str, globs: tuple[str, ...]) -> bool:
+    return any(fnmatch.fnmatch(rel, g) for g in globs)
+
+
+def affected_tests(
+    impact: ImpactMap,
+    changed: set[str],
+    *,
+    test_globs: tuple[str, ...],
+    ignore_globs: tuple[str, ...] = (),
+) -> list[str] | None:
+    """Test files to run for `changed`, or None if the map cannot account for a change.
+
+    Changed test files are always selected. A changed non-test file selects every test
+    whose coverage touched it; if no test touched it, we cannot tell what depends on it
+    and return None so the caller runs the full suite.
+    """
+
+    users: dict[str, set[str]] = {}
+    for test, deps in impact.tests.items():
+        for dep in deps:
+            users.setdefault(dep, set()).add(test)
+
+    selected: set[str] = set()
+    for rel in changed:
+        if any(fnmatch.fnmatch(rel, g) for g in ignore_globs):
+            continue
+        if is_test_file(rel, test_globs):
+            selected.add(rel)
+        elif rel in users:
+            selected |= users[rel]
+        else:
+            return None
+    return sorted(selected)
+
+
+def subset_command(settings: OrchSettings, tests: list[str]) -> str:
+    return settings.pytest_command + "".join(" " + shlex.quote(t) for t in tests)
+
+
+def build_impact_map(settings: OrchSettings) -> ImpactMap:
+    """Run each test file under coverage and record which repo files it executed.
+
+    Needs the optional `coverage` package in the environment that runs the tests.
+    """
+
+    root = settings.repo_root
+    allowlist = CommandAllowlist.from_regexes(settings.allowlist_regex)
+    python = shlex.split(settings.pytest_command)[0]
+
+    snapshot = snapshot_tree(root, exclude=(root / settings.runs_dir,))
+    tests = sorted(p for p in snapshot if is_test_file(p, settings.impact_test_globs))
+
+    impact = ImpactMap()
+    with tempfile.TemporaryDirectory(prefix="orch-impact-") as tmp:
+        data_file = Path(tmp) / ".coverage"
+        report = Path(tmp) / "coverage.json"
+        for test in tests:
+            run_allowed(
+                f"{python} -m coverage run --data-file={shlex.quote(str(data_file))} "
+                f"-m pytest -q -p no:cacheprovider {shlex.quote(test)}",
+                cwd=root,
+                allowlist=allowlist,
+            )
+            res = run_allowed(
+                f"{python} -m coverage json --data-file={shlex.quote(str(data_file))} "
+                f"-o {shlex.quote(str(report))}",
+                cwd=root,
+                allowlist=allowlist,
+            )
+            if res.returncode != 0 or not report.exists():
+                raise RuntimeError(f"coverage failed for {test}: {res.stderr.strip()}")
+
+            files = json.loads(report.read_text(encoding="utf-8")).get("files", {})
+            deps: set[str] = set()
+            for f in files:
+                p = Path(f)
+                p = p if p.is_absolute() else root / p
+                try:
+                    deps.add(p.resolve().relative_to(root.resolve()).as_posix())
+                except ValueError:
+                    continue  # site-packages etc.
+            impact.tests[test] = sorted(deps - {test})
+            report.unlink()
+
+    impact.save(root / settings.impact_map_path)
+    return impact
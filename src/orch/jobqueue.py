@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import secrets
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Literal
+
+JobState = Literal["queued", "running", "done", "failed", "cancelled"]
+
+
+@dataclass
+class Job:
+    job_id: str
+    feature_id: str
+    priority: int
+    # Submission order; breaks priority ties first-in, first-out.
+    seq: int
+    state: JobState = "queued"
+    submitted_ts: float = 0.0
+    started_ts: float | None = None
+    finished_ts: float | None = None
+    # Assigned when the job is first started; a restarted daemon resumes this run.
+    run_id: str | None = None
+    attempts: int = 0
+    error: str | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class JobQueue:
+    """Priority queue of run requests, persisted as one JSON file per job.
+
+    Higher `priority` runs first. Every state change is written through (write-then-
+    rename), so the queue survives a crash or restart; see `recover`.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._dir = root / "jobs"
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._jobs: dict[str, Job] = {}
+        self._heap: list[tuple[int, int, str]] = []
+        for path in self._dir.glob("*.json"):
+            try:
+                job = Job(**json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError, TypeError):
+                continue
+            self._jobs[job.job_id] = job
+            if job.state == "queued":
+                self._push(job)
+
+    def _push(self, job: Job) -> None:
+        heapq.heappush(self._heap, (-job.priority, job.seq, job.job_id))
+
+    def _save(self, job: Job) -> None:
+        path = self._dir / f"{job.job_id}.json"
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(job.as_dict()), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def submit(self, feature_id: str, *, priority: int = 0) -> Job:
+        with self._lock:
+            seq = max((j.seq for j in self._jobs.values()), default=0) + 1
+            job = Job(
+                job_id=f"job-{seq:06d}-{secrets.token_hex(3)}",
+                feature_id=feature_id,
+                priority=priority,
+                seq=seq,
+                submitted_ts=time.time(),
+            )
+            self._save(job)
+            self._jobs[job.job_id] = job
+            self._push(job)
+            return job
+
+    def claim(self) -> Job | None:
+        """Mark the highest-priority queued job as running and return it."""
+        with self._lock:
+            while self._heap:
+                _, _, job_id = heapq.heappop(self._heap)
+                job = self._jobs[job_id]
+                if job.state != "queued":
+                    continue
+                job.state = "running"
+                job.started_ts = time.time()
+                job.attempts += 1
+                self._save(job)
+                return job
+            return None
+
+    def update(self, job: Job, **changes: Any) -> None:
+        with self._lock:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            if job.state in ("done", "failed", "cancelled"):
+                job.finished_ts = time.time()
+            self._save(job)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.state != "queued":
+                return False
+            job.state = "cancelled"
+            job.finished_ts = time.time()
+            self._save(job)
+            return True
+
+    def recover(self) -> list[Job]:
+        """Requeue jobs left "running" by a previous daemon (they keep their run_id)."""
+        with self._lock:
+            stale = [j for j in self._jobs.values() if j.state == "running"]
+            for job in stale:
+                job.state = "queued"
+                self._save(job)
+                self._push(job)
+            return stale
+
+    def jobs(self) -> list[Job]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.seq)
+
+    def depth(self) -> int:
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j.state == "queued")
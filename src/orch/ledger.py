@@ -1,22 +1,245 @@
 from __future__ import annotations
 
+import fcntl
 import json
-from dataclasses import dataclass
+import os
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from enum import Enum
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable
+
+# How much of the file's end to scan for the last sequence number when reopening.
+_TAIL_BYTES = 64 * 1024
+
+# Per-run lock file, held by the process running the run (see lock_run).
+RUN_LOCK = ".running"
 
 
 def utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def _key(value: Any) -> str:
+    # Records built in-process hold Step members; records read back hold plain strings.
+    return value.value if isinstance(value, Enum) else str(value)
+
+
+class LedgerView:
+    """In-memory index of a run's ledger records: by step, by tool, latest per step.
+
+    A Ledger keeps its view current on every append, so steps can query the run's
+    history without re-reading ledger.jsonl; `load` rebuilds one from disk.
+    """
+
+    def __init__(self, records: Iterable[dict[str, Any]] = ()) -> None:
+        self._lock = threading.Lock()
+        self._records: list[dict[str, Any]] = []
+        self._by_step: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        self._by_tool: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        self.extend(records)
+
+    @classmethod
+    def load(cls, path: Path) -> LedgerView:
+        return cls(read_ledger(path))
+
+    def add(self, record: dict[str, Any]) -> None:
+        with self._lock:
+            self._records.append(record)
+            if "step" in record:
+                self._by_step[_key(record["step"])].append(record)
+            if "tool" in record:
+                self._by_tool[_key(record["tool"])].append(record)
+
+    def extend(self, records: Iterable[dict[str, Any]]) -> None:
+        for record in records:
+            self.add(record)
+
+    @property
+    def records(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return list(self._records)
+
+    def by_step(self, step: str) -> list[dict[str, Any]]:
+        with self._lock:
+            return list(self._by_step.get(_key(step), ()))
+
+    def by_tool(self, tool: str) -> list[dict[str, Any]]:
+        with self._lock:
+            return list(self._by_tool.get(_key(tool), ()))
+
+    def latest(self, step: str) -> dict[str, Any] | None:
+        """The most recent record of `step`, or None."""
+        with self._lock:
+            found = self._by_step.get(_key(step))
+            return found[-1] if found else None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
 @dataclass
 class Ledger:
+    """Append-only JSON-lines log of a run.
+
+    The file stays open between appends. Records are numbered (`seq`, from 1, across
+    every process that ever appended to the file) and written in batches: with
+    `flush_interval_s` 0 every append is written before it returns; otherwise appends
+    are buffered and written together at most that many seconds later (group commit),
+    and on `flush`/`close`. Each batch is one write() under an exclusive flock, so
+    lines from concurrent threads or processes never interleave; `fsync` also syncs
+    every batch to disk.
+    """
+
     path: Path
+    flush_interval_s: float = 0.0
+    fsync: bool = False
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    _pending: list[dict[str, Any]] = field(default_factory=list, repr=False, compare=False)
+    _fd: int | None = field(default=None, repr=False, compare=False)
+    _seq: int = field(default=0, repr=False, compare=False)
+    # File size after our last write; anything beyond it was written by someone else.
+    _end: int = field(default=-1, repr=False, compare=False)
+    _timer: threading.Timer | None = field(default=None, repr=False, compare=False)
+    # Everything appended through this Ledger (plus whatever was loaded into it).
+    view: LedgerView = field(default_factory=LedgerView, repr=False, compare=False)
+    # Called after every batch reaches the file (e.g. to update the run catalog).
+    on_write: Callable[[], None] | None = field(default=None, repr=False, compare=False)
 
     def append(self, record: dict[str, Any]) -> None:
         record = {"ts": utc_now_iso(), **record}
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        with self.path.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        wrote = False
+        with self._lock:
+            self.view.add(record)
+            self._pending.append(record)
+            if self.flush_interval_s <= 0:
+                wrote = self._write_pending()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval_s, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if wrote:
+            self._written()
+
+    def flush(self) -> None:
+        """Write buffered records now."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            wrote = self._write_pending()
+        if wrote:
+            self._written()
+
+    def close(self) -> None:
+        """Flush and release the file handle; a later append reopens it."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            wrote = self._write_pending()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+        if wrote:
+            self._written()
+
+    def _written(self) -> None:
+        # Called without the lock held: a slow hook must not hold up other writers.
+        if self.on_write is not None:
+            self.on_write()
+
+    def _write_pending(self) -> bool:
+        if not self._pending:
+            return False
+        if self._fd is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        fd = self._fd
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size != self._end:
+                self._seq = _last_seq(self.path)
+            lines = []
+            for record in self._pending:
+                self._seq += 1
+                record = {"ts": record["ts"], "seq": self._seq, **record}
+                lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+            data = "".join(lines).encode("utf-8")
+            while data:
+                data = data[os.write(fd, data) :]
+            if self.fsync:
+                os.fsync(fd)
+            self._end = os.fstat(fd).st_size
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._pending.clear()
+        return True
+
+
+def lock_run(run_dir: Path) -> int:
+    """Mark the run in `run_dir` as live until the returned descriptor is closed.
+
+    The lock is an flock, so the kernel drops it when the process exits, however it
+    exits: a run without a RUN record whose lock is free has crashed.
+    """
+    run_dir.mkdir(parents=True, exist_ok=True)
+    fd = os.open(run_dir / RUN_LOCK, os.O_RDWR | os.O_CREAT, 0o644)
+    fcntl.flock(fd, fcntl.LOCK_SH)
+    return fd
+
+
+def run_is_live(run_dir: Path) -> bool:
+    """Whether some process holds the run's lock (see lock_run)."""
+    try:
+        fd = os.open(run_dir / RUN_LOCK, os.O_RDONLY)
+    except OSError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+
+def _last_seq(path: Path) -> int:
+    """Sequence number of the last record in `path` (0 if empty or missing).
+
+    Ledgers written before records were numbered count one per line.
+    """
+    try:
+        with path.open("rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - _TAIL_BYTES))
+            tail = f.read()
+    except FileNotFoundError:
+        return 0
+    for line in reversed(tail.splitlines()):
+        try:
+            seq = json.loads(line).get("seq")
+        except (ValueError, AttributeError):
+            continue
+        if isinstance(seq, int):
+            return seq
+        break
+    return sum(1 for line in path.read_bytes().splitlines() if line.strip())
+
+
+def read_ledger(path: Path) -> list[dict[str, Any]]:
+    """Parse a ledger.jsonl file, ignoring a torn (partially written) last line."""
+    out: list[dict[str, Any]] = []
+    if not path.exists():
+        return out
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            out.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return out
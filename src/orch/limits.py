@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO
+
+_POLL_MIN_S = 0.01
+_POLL_MAX_S = 0.2
+
+
+class PoolTimeout(TimeoutError):
+    pass
+
+
+class Lease:
+    """A held slot of a ResourcePool; release it (or use it as a context manager)."""
+
+    def __init__(self, handle: IO[bytes] | None, wait_s: float) -> None:
+        self._handle = handle
+        self.wait_s = wait_s
+
+    def release(self) -> None:
+        if self._handle is not None:
+            fcntl.flock(self._handle, fcntl.LOCK_UN)
+            self._handle.close()
+            self._handle = None
+
+    def __enter__(self) -> Lease:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.release()
+
+
+@dataclass(frozen=True)
+class ResourcePool:
+    """A named, host-wide concurrency limit with an optional token-bucket rate.
+
+    State lives in lock files under `root`, so every orch process on the host that
+    uses the same `root` shares the limit: slot k is held by flock()ing
+    `<name>.<k>.lock`, and the bucket is a small JSON file updated under its own lock.
+    Locks die with their process, so a crashed run never leaks a slot.
+    """
+
+    name: str
+    root: Path
+    limit: int | None = None
+    # Requests per second (None: unlimited); up to `burst` may start back to back.
+    rate: float | None = None
+    burst: int = 1
+
+    def acquire(self, timeout_s: float | None = None) -> Lease:
+        """Wait for a slot (and a rate token); raises PoolTimeout after `timeout_s`."""
+        started = time.monotonic()
+        deadline = None if timeout_s is None else started + timeout_s
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        handle = self._take_slot(deadline)
+        try:
+            if self.rate is not None:
+                self._take_token(deadline)
+        except BaseException:
+            Lease(handle, 0.0).release()
+            raise
+        return Lease(handle, round(time.monotonic() - started, 3))
+
+    def _sleep(self, delay: float, deadline: float | None) -> None:
+        if deadline is not None:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise PoolTimeout(f"timed out waiting for resource pool {self.name!r}")
+            delay = min(delay, left)
+        time.sleep(delay)
+
+    def _take_slot(self, deadline: float | None) -> IO[bytes] | None:
+        if self.limit is None:
+            return None
+        delay = _POLL_MIN_S
+        while True:
+            for k in range(max(1, self.limit)):
+                handle = (self.root / f"{self.name}.{k}.lock").open("ab")
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    handle.close()
+                    continue
+                return handle
+            self._sleep(delay, deadline)
+            delay = min(delay * 2, _POLL_MAX_S)
+
+    def _take_token(self, deadline: float | None) -> None:
+        assert self.rate is not None
+        path = self.root / f"{self.name}.bucket"
+        while True:
+            with path.open("a+") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or "{}")
+                except ValueError:
+                    state = {}
+                now = time.time()
+                tokens = float(state.get("tokens", self.burst))
+                tokens = min(self.burst, tokens + (now - float(state.get("ts", now))) * self.rate)
+                took = tokens >= 1
+                if took:
+                    tokens -= 1
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps({"tokens": tokens, "ts": now}))
+                f.flush()
+            if took:
+                return
+            self._sleep((1 - tokens) / self.rate, deadline)
+
+
+def default_root() -> Path:
+    """Host-wide location shared by every orch process of this user."""
+    return Path(tempfile.gettempdir()) / f"orch-limits-{os.getuid()}"
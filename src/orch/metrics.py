@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import json
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .ledger import run_is_live
+
+DURATION_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+ITERATION_BUCKETS = (0, 1, 2, 3, 5, 8)
+
+_TOKEN_FIELDS = ("input_tokens", "output_tokens", "total_tokens")
+
+
+@dataclass
+class Histogram:
+    buckets: tuple[float, ...]
+    counts: list[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        self.counts = [0] * len(self.buckets)
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        if i < len(self.counts):
+            self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+    def lines(self, name: str, labels: dict[str, str]) -> list[str]:
+        out = []
+        cumulative = 0
+        for le, n in zip(self.buckets, self.counts):
+            cumulative += n
+            out.append(f"{name}_bucket{_labels({**labels, 'le': _num(le)})} {cumulative}")
+        out.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {self.count}")
+        out.append(f"{name}_sum{_labels(labels)} {_num(self.total)}")
+        out.append(f"{name}_count{_labels(labels)} {self.count}")
+        return out
+
+
+@dataclass
+class _Ledger:
+    """How far one ledger.jsonl has been read, and the per-run state it left behind."""
+
+    offset: int = 0
+    # False once the run's terminal RUN record is seen (until a RESUME reopens it).
+    open: bool = True
+    fix_iterations: int = 0
+
+
+class MetricsCollector:
+    """Aggregates ledgers under `runs_dir` into Prometheus metrics, incrementally.
+
+    Each `refresh` only reads the bytes appended to every ledger.jsonl since the last
+    one (per-file offsets), so a scrape costs a stat() per run plus the new records.
+    A ledger that shrank (rewritten or replaced) triggers a full rebuild.
+    """
+
+    def __init__(self, runs_dir: Path) -> None:
+        self.runs_dir = runs_dir
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._ledgers: dict[str, _Ledger] = {}
+        self._step_seconds: dict[str, Histogram] = {}
+        self._steps: dict[tuple[str, str], int] = defaultdict(int)
+        self._verify: dict[str, int] = defaultdict(int)
+        self._fix_iterations = Histogram(ITERATION_BUCKETS)
+        self._tokens: dict[str, int] = defaultdict(int)
+        self._cost_usd = 0.0
+        self._runs: dict[str, int] = defaultdict(int)
+
+    def refresh(self) -> None:
+        with self._lock:
+            if not self._refresh():
+                self._reset()
+                self._refresh()
+
+    def _refresh(self) -> bool:
+        """Read what was appended since the last call; False if a ledger shrank."""
+        if not self.runs_dir.is_dir():
+            return True
+        seen: set[str] = set()
+        for run_dir in self.runs_dir.iterdir():
+            path = run_dir / "ledger.jsonl"
+            try:
+                size = path.stat().st_size
+            except OSError:
+                continue
+            seen.add(run_dir.name)
+            state = self._ledgers.setdefault(run_dir.name, _Ledger())
+            if size < state.offset:
+                return False
+            if size > state.offset:
+                self._read(path, state)
+        for gone in self._ledgers.keys() - seen:
+            del self._ledgers[gone]
+        return True
+
+    def _read(self, path: Path, state: _Ledger) -> None:
+        with path.open("rb") as f:
+            f.seek(state.offset)
+            data = f.read()
+        # Only whole lines: a record still being written is picked up next time.
+        end = data.rfind(b"\n") + 1
+        state.offset += end
+        for line in data[:end].splitlines():
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(rec, dict):
+                self._observe(rec, state)
+
+    def _observe(self, rec: dict[str, Any], state: _Ledger) -> None:
+        step = rec.get("step")
+        if step == "NODE" and rec.get("node"):
+            node, status = str(rec["node"]), str(rec.get("status"))
+            self._steps[node, status] += 1
+            if isinstance(rec.get("elapsed_s"), (int, float)):
+                hist = self._step_seconds.setdefault(node, Histogram(DURATION_BUCKETS))
+                hist.observe(float(rec["elapsed_s"]))
+        elif step == "VERIFY" and isinstance(rec.get("ok"), bool):
+            self._verify["pass" if rec["ok"] else "fail"] += 1
+        elif step == "FIXLOOP" and isinstance(rec.get("iteration"), int):
+            state.fix_iterations = max(state.fix_iterations, rec["iteration"])
+        elif step == "CODEX_STATUS" and isinstance(rec.get("delta"), dict):
+            delta = rec["delta"]
+            for name in _TOKEN_FIELDS:
+                if isinstance(delta.get(name), int):
+                    self._tokens[name.removesuffix("_tokens")] += delta[name]
+            if isinstance(delta.get("cost_usd"), (int, float)):
+                self._cost_usd += delta["cost_usd"]
+        elif step == "RESUME":
+            state.open = True
+        elif step == "RUN":
+            state.open = False
+            self._runs[str(rec.get("outcome"))] += 1
+            self._fix_iterations.observe(state.fix_iterations)
+            state.fix_iterations = 0
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        self.refresh()
+        with self._lock:
+            out: list[str] = []
+
+            def header(name: str, kind: str, help_text: str) -> None:
+                out.append(f"# HELP {name} {help_text}")
+                out.append(f"# TYPE {name} {kind}")
+
+            header(
+                "orch_runs_in_flight",
+                "gauge",
+                "Runs without a terminal RUN record whose process is still running.",
+            )
+            # A run that crashed never writes its RUN record, but its lock is released.
+            live = sum(
+                1
+                for name, s in self._ledgers.items()
+                if s.open and run_is_live(self.runs_dir / name)
+            )
+            out.append(f"orch_runs_in_flight {live}")
+
+            header("orch_runs_total", "counter", "Finished runs by outcome.")
+            for outcome, n in sorted(self._runs.items()):
+                out.append(f"orch_runs_total{_labels({'outcome': outcome})} {n}")
+
+            header("orch_steps_total", "counter", "Pipeline node executions by status.")
+            for (node, status), n in sorted(self._steps.items()):
+                out.append(f"orch_steps_total{_labels({'node': node, 'status': status})} {n}")
+
+            header("orch_step_duration_seconds", "histogram", "Pipeline node wall time.")
+            for node, hist in sorted(self._step_seconds.items()):
+                out.extend(hist.lines("orch_step_duration_seconds", {"node": node}))
+
+            header("orch_verify_total", "counter", "VERIFY runs by result.")
+            for result in ("pass", "fail"):
+                out.append(f"orch_verify_total{_labels({'result': result})} {self._verify[result]}")
+
+            header("orch_fix_iterations", "histogram", "Fix-loop iterations per finished run.")
+            out.extend(self._fix_iterations.lines("orch_fix_iterations", {}))
+
+            header("orch_codex_tokens_total", "counter", "Codex tokens spent, per measured step.")
+            for kind in ("input", "output", "total"):
+                out.append(f"orch_codex_tokens_total{_labels({'kind': kind})} {self._tokens[kind]}")
+
+            header("orch_codex_cost_usd_total", "counter", "Codex cost in USD.")
+            out.append(f"orch_codex_cost_usd_total {_num(self._cost_usd)}")
+            return "\n".join(out) + "\n"
+
+
+def _num(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+# Rough size of a token in characters. Good enough for budgeting English prose and
+# code without depending on a tokenizer for a specific model.
+CHARS_PER_TOKEN = 4
+
+# Paragraphs shorter than this (headings, "Steps:", ...) are structure, not content,
+# and are never dropped as duplicates.
+_MIN_DEDUPE_CHARS = 40
+
+_FENCE_RE = re.compile(r"^```[^\n]*\n.*?^```[ \t]*$", re.M | re.S)
+_PARA_SPLIT_RE = re.compile(r"\n[ \t]*\n")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def trim_text(text: str, max_tokens: int) -> str:
+    """Shrink `text` to about `max_tokens`.
+
+    First collapses fenced code blocks (the surrounding prose usually says what they
+    do), then cuts the middle, keeping the head and the tail.
+    """
+
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    text = _FENCE_RE.sub("```\n[... code block trimmed ...]\n```", text)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    budget = max(0, max_tokens * CHARS_PER_TOKEN)
+    marker = f"\n\n[... {estimate_tokens(text) - max_tokens} tokens trimmed ...]\n\n"
+    keep = max(0, budget - len(marker))
+    head = keep * 7 // 10
+    tail = keep - head
+    return text[:head] + marker + (text[-tail:] if tail else "")
+
+
+def _fingerprint(paragraph: str) -> str:
+    return hashlib.sha256(" ".join(paragraph.split()).encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class PromptStats:
+    tokens: int
+    budget: int | None
+    trimmed_tokens: int
+    deduped_tokens: int
+    sections: dict[str, int]
+    # Tokens of paragraphs already sent in an earlier prompt (see PromptBuilder.sent).
+    repeated_tokens: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "tokens": self.tokens,
+            "budget": self.budget,
+            "trimmed_tokens": self.trimmed_tokens,
+            "deduped_tokens": self.deduped_tokens,
+            "repeated_tokens": self.repeated_tokens,
+            "sections": self.sections,
+        }
+
+
+@dataclass
+class _Section:
+    title: str | None
+    text: str
+
+    def render(self, text: str) -> str:
+        return f"\n\n{self.title}:\n{text}" if self.title else f"\n\n{text}"
+
+
+@dataclass
+class PromptBuilder:
+    """Assembles a step prompt from fixed instructions plus content sections.
+
+    Sections are deduplicated paragraph by paragraph (a paragraph already included in
+    an earlier section is dropped) and, if the result is over `budget_tokens`, trimmed
+    so that small sections stay whole and large ones share what is left.
+
+    Deduplication stops at the prompt: every tool call is a fresh session that has not
+    seen earlier prompts, so content sent before must be sent again. `sent` only
+    measures that: it holds fingerprints of paragraphs earlier prompts sent to the same
+    tool, `build` reports the repeats as `repeated_tokens` and adds its own paragraphs.
+    """
+
+    instructions: str
+    budget_tokens: int | None = None
+    dedupe: bool = True
+    sent: set[str] | None = None
+    _sections: list[_Section] = field(default_factory=list)
+
+    def add(self, title: str | None, text: str) -> PromptBuilder:
+        self._sections.append(_Section(title, text))
+        return self
+
+    def _dedupe(self) -> tuple[list[str], int]:
+        seen: set[str] = set()
+        texts: list[str] = []
+        dropped = 0
+        for section in self._sections:
+            if not self.dedupe:
+                texts.append(section.text)
+                continue
+            kept: list[str] = []
+            for para in _PARA_SPLIT_RE.split(section.text):
+                if len(para.strip()) >= _MIN_DEDUPE_CHARS:
+                    fp = _fingerprint(para)
+                    if fp in seen:
+                        dropped += estimate_tokens(para)
+                        continue
+                    seen.add(fp)
+                kept.append(para)
+            texts.append("\n\n".join(kept))
+        return texts, dropped
+
+    def _allocate(self, texts: list[str]) -> list[int]:
+        """Per-section token limits: water-fill the budget, smallest sections first."""
+        overhead = estimate_tokens(self.instructions) + sum(
+            estimate_tokens(s.render("")) for s in self._sections
+        )
+        left = max(0, (self.budget_tokens or 0) - overhead)
+        limits = [0] * len(texts)
+        order = sorted(range(len(texts)), key=lambda i: estimate_tokens(texts[i]))
+        for n, i in enumerate(order):
+            share = left // (len(order) - n)
+            limits[i] = min(estimate_tokens(texts[i]), share)
+            left -= limits[i]
+        return limits
+
+    def build(self) -> tuple[str, PromptStats]:
+        texts, deduped = self._dedupe()
+        before = [estimate_tokens(t) for t in texts]
+
+        if self.budget_tokens is not None:
+            limits = self._allocate(texts)
+            texts = [trim_text(t, n) for t, n in zip(texts, limits)]
+
+        prompt = self.instructions + "".join(
+            s.render(t) for s, t in zip(self._sections, texts)
+        )
+        after = [estimate_tokens(t) for t in texts]
+        stats = PromptStats(
+            tokens=estimate_tokens(prompt),
+            budget=self.budget_tokens,
+            trimmed_tokens=sum(max(0, b - a) for b, a in zip(before, after)),
+            deduped_tokens=deduped,
+            sections={(s.title or "body"): n for s, n in zip(self._sections, after)},
+            repeated_tokens=self._record_sent(texts),
+        )
+        return prompt, stats
+
+    def _record_sent(self, texts: list[str]) -> int:
+        if self.sent is None:
+            return 0
+        repeated = 0
+        fingerprints: set[str] = set()
+        for text in texts:
+            for para in _PARA_SPLIT_RE.split(text):
+                if len(para.strip()) < _MIN_DEDUPE_CHARS:
+                    continue
+                fp = _fingerprint(para)
+                if fp in self.sent:
+                    repeated += estimate_tokens(para)
+                fingerprints.add(fp)
+        self.sent |= fingerprints
+        return repeated
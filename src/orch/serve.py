@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from .config import OrchSettings, parallel_settings
+from .jobqueue import Job, JobQueue
+from .runner import _new_run_id, resume_run, run_feature
+
+
+# How long a stopping daemon waits for interrupted runs to record their outcome.
+_STOP_GRACE_S = 30.0
+
+
+class ServeError(RuntimeError):
+    pass
+
+
+def socket_path(settings: OrchSettings) -> Path:
+    return settings.repo_root / settings.queue_dir / "orch.sock"
+
+
+def request(path: Path, payload: dict[str, Any], *, timeout_s: float = 10.0) -> dict[str, Any]:
+    """Send one request to a running `orch serve` and return its reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout_s)
+        try:
+            sock.connect(str(path))
+        except OSError as e:
+            raise ServeError(f"orch serve is not running at {path}: {e}") from e
+        with sock.makefile("rw", encoding="utf-8") as f:
+            f.write(json.dumps(payload) + "\n")
+            f.flush()
+            line = f.readline()
+    if not line:
+        raise ServeError("orch serve closed the connection")
+    reply = json.loads(line)
+    if not reply.get("ok"):
+        raise ServeError(reply.get("error", "request failed"))
+    return reply
+
+
+def _init_worker() -> None:
+    # Idle workers ignore SIGINT; only a worker that is running a job is interrupted
+    # when the daemon stops (see Daemon._shutdown).
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _run_job(feature_id: str, run_id: str, settings: OrchSettings) -> tuple[bool, str | None]:
+    # Runs in a worker process. A job that already has a ledger was started by an
+    # earlier daemon: pick it up where it stopped instead of starting over.
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    try:
+        if (settings.repo_root / settings.runs_dir / run_id / "ledger.jsonl").exists():
+            resume_run(run_id, settings)
+        else:
+            run_feature(feature_id, settings, run_id=run_id)
+    except Exception as e:  # noqa: BLE001
+        return False, f"{type(e).__name__}: {e}"
+    finally:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+    return True, None
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    orch: Daemon
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Line-delimited JSON requests: submit, list, cancel, ping, shutdown."""
+
+    server: _Server
+
+    def handle(self) -> None:
+        for raw in self.rfile:
+            try:
+                reply = self.server.orch.handle(json.loads(raw))
+            except Exception as e:  # noqa: BLE001
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class Daemon:
+    """Long-running job runner behind `orch serve`.
+
+    Run requests arrive on a Unix socket and go into a persistent `JobQueue`; at most
+    `slots` runs execute at once, each in its own worker process and its own
+    `runs/<run_id>/` folder (and, with more than one slot, its own workspace; see
+    `parallel_settings`). Stopping interrupts the running jobs instead of waiting for
+    them; they stay "running" in the queue and are resumed on restart.
+    """
+
+    def __init__(self, settings: OrchSettings, *, slots: int | None = None) -> None:
+        self.settings, self.slots = parallel_settings(
+            settings, max(1, slots or settings.max_parallel_runs)
+        )
+        self.queue = JobQueue(settings.repo_root / settings.queue_dir)
+        self.socket_path = socket_path(settings)
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._running = 0
+
+    def handle(self, req: dict[str, Any]) -> dict[str, Any]:
+        op = req.get("op")
+        if op == "ping":
+            return {"ok": True, "slots": self.slots, "running": self._running}
+        if op == "submit":
+            job = self.queue.submit(str(req["feature_id"]), priority=int(req.get("priority", 0)))
+            self._wake.set()
+            return {"ok": True, "job": job.as_dict()}
+        if op == "list":
+            return {"ok": True, "jobs": [j.as_dict() for j in self.queue.jobs()]}
+        if op == "cancel":
+            if self.queue.cancel(str(req["job_id"])):
+                return {"ok": True}
+            return {"ok": False, "error": f"job {req['job_id']} is not queued"}
+        if op == "shutdown":
+            self.stop()
+            return {"ok": True}
+        return {"ok": False, "error": f"unknown op {op!r}"}
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def _finished(self, job: Job, fut: Future[tuple[bool, str | None]]) -> None:
+        if fut.cancelled():
+            ok, error = False, "cancelled"
+        elif (exc := fut.exception()) is not None:
+            ok, error = False, f"{type(exc).__name__}: {exc}"
+        else:
+            ok, error = fut.result()
+        with self._lock:
+            self._running -= 1
+        # A run that failed or never started because we are shutting down stays
+        # "running", so the next daemon resumes it (see JobQueue.recover).
+        if ok or not self._stop.is_set():
+            self.queue.update(job, state="done" if ok else "failed", error=error)
+        self._wake.set()
+
+    def serve_forever(self) -> None:
+        lock = self._lock_queue()
+        try:
+            self._serve()
+        finally:
+            os.close(lock)
+
+    def _lock_queue(self) -> int:
+        # One daemon per queue: a second one would requeue the first one's running jobs
+        # (JobQueue.recover) and take over its socket. The kernel drops the flock
+        # however the daemon exits, so a crashed daemon never blocks the next one.
+        queue_dir = self.socket_path.parent
+        queue_dir.mkdir(parents=True, exist_ok=True)
+        fd = os.open(queue_dir / "serve.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            raise ServeError(f"orch serve is already running for {queue_dir}") from None
+        return fd
+
+    def _serve(self) -> None:
+        self.queue.recover()
+        self.socket_path.unlink(missing_ok=True)
+        server = _Server(str(self.socket_path), _Handler)
+        server.orch = self
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        pool = ProcessPoolExecutor(max_workers=self.slots, initializer=_init_worker)
+        try:
+            while not self._stop.is_set():
+                self._wake.clear()
+                self._dispatch(pool)
+                self._wake.wait(timeout=1.0)
+        except KeyboardInterrupt:
+            self._stop.set()
+        finally:
+            self._shutdown(pool)
+            server.shutdown()
+            server.server_close()
+            self.socket_path.unlink(missing_ok=True)
+
+    def _shutdown(self, pool: ProcessPoolExecutor) -> None:
+        # Leaving the executor normally would wait for every running job, which can take
+        # hours. Interrupt them instead: the run records its outcome and kills its tool
+        # processes (see run_dag), and the job is resumed by the next daemon.
+        # ProcessPoolExecutor has no public handle on its worker processes.
+        workers = list((pool._processes or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for proc in workers:
+            if proc.pid is not None:
+                try:
+                    os.kill(proc.pid, signal.SIGINT)
+                except ProcessLookupError:
+                    pass
+        for proc in workers:
+            proc.join(_STOP_GRACE_S)
+            if proc.is_alive():
+                proc.kill()
+
+    def _dispatch(self, pool: ProcessPoolExecutor) -> None:
+        while self._running < self.slots:
+            job = self.queue.claim()
+            if job is None:
+                return
+            if job.run_id is None:
+                self.queue.update(job, run_id=_new_run_id(job.feature_id))
+            with self._lock:
+                self._running += 1
+            fut = pool.submit(_run_job, job.feature_id, job.run_id, self.settings)
+            fut.add_done_callback(lambda f, job=job: self._finished(job, f))
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import json
+import os
+import re
+import shlex
+import statistics
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .allowlist import CommandAllowlist
+from .artifacts import write_artifact
+from .shell import run_allowed, run_allowed_async
+
+# Pytest flags that make every shard report per-test durations.
+DURATIONS_FLAGS = "--durations=0 --durations-min=0"
+
+_DURATION_RE = re.compile(
+    r"^(?P<s>\d+(?:\.\d+)?)s\s+(?:setup|call|teardown)\s+(?P<id>\S.*?)\s*$", re.M
+)
+
+
+@dataclass(frozen=True)
+class ShardResult:
+    index: int
+    tests: int
+    returncode: int
+    elapsed_s: float
+    stdout_path: Path
+    resources: dict[str, Any] | None = None
+
+
+def collect_tests(
+    command: str,
+    *,
+    cwd: Path,
+    allowlist: CommandAllowlist,
+    timeout_s: float | None = None,
+) -> list[str]:
+    """Node ids pytest would run for `command` (an allowlisted pytest invocation)."""
+    # Node ids are printed at exactly one -q; more (e.g. a -q in the command plus one in
+    # addopts) switches pytest to per-file counts. Try with and without our own -q.
+    args = [a for a in shlex.split(command) if a not in ("-q", "-qq", "--quiet")]
+    for extra in (["--collect-only", "-q"], ["--collect-only"]):
+        res = run_allowed(
+            shlex.join([*args, *extra]), cwd=cwd, allowlist=allowlist, timeout_s=timeout_s
+        )
+        if res.returncode != 0:
+            return []
+
+        # One node id per line, then a blank line and a summary.
+        ids: list[str] = []
+        for line in res.stdout.splitlines():
+            if not line.strip():
+                break
+            if "::" in line and not line.startswith(" "):
+                ids.append(line.strip())
+        if ids:
+            return list(dict.fromkeys(ids))
+    return []
+
+
+def parse_durations(text: str) -> dict[str, float]:
+    """Per-test durations (setup + call + teardown) from pytest's `--durations` report."""
+    out: dict[str, float] = {}
+    for m in _DURATION_RE.finditer(text):
+        out[m.group("id")] = round(out.get(m.group("id"), 0.0) + float(m.group("s")), 4)
+    return out
+
+
+def historical_durations(runs_root: Path, *, limit: int) -> dict[str, float]:
+    """Most recent known duration per test, from VERIFY records of the last `limit` runs."""
+    if not runs_root.is_dir():
+        return {}
+
+    ledgers = sorted(
+        (p for p in runs_root.glob("*/ledger.jsonl")),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )[:limit]
+
+    out: dict[str, float] = {}
+    for path in ledgers:
+        try:
+            lines = path.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            continue
+        for line in reversed(lines):
+            if '"test_durations"' not in line:
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            for test, seconds in (rec.get("test_durations") or {}).items():
+                out.setdefault(test, seconds)
+    return out
+
+
+def plan_shards(tests: list[str], durations: dict[str, float], n: int) -> list[list[str]]:
+    """Split `tests` into at most `n` shards with balanced expected duration (LPT greedy).
+
+    Tests without history are assumed to take the median known duration.
+    """
+
+    known = [durations[t] for t in tests if t in durations]
+    default = statistics.median(known) if known else 1.0
+
+    shards: list[list[str]] = [[] for _ in range(max(1, min(n, len(tests))))]
+    heap = [(0.0, i) for i in range(len(shards))]
+    for test in sorted(tests, key=lambda t: durations.get(t, default), reverse=True):
+        load, i = heapq.heappop(heap)
+        shards[i].append(test)
+        heapq.heappush(heap, (load + durations.get(test, default), i))
+    return [s for s in shards if s]
+
+
+def shard_path(out_path: Path, index: int) -> Path:
+    return out_path.with_name(f"{out_path.stem}.shard-{index}{out_path.suffix}")
+
+
+def shard_command(command: str, tests: list[str]) -> str:
+    """`command` without the arguments that select `tests`, to run one shard's node ids.
+
+    Options (e.g. `-x`, `-p no:cacheprovider`, `--timeout=60`) are kept. Positional
+    arguments naming a collected test, its file or a directory above it are dropped.
+    """
+    files = {t.split("::", 1)[0] for t in tests}
+
+    def selects(arg: str) -> bool:
+        if arg.startswith("-"):
+            return False
+        path = os.path.normpath(arg.split("::", 1)[0])
+        return path == "." or any(f == path or f.startswith(path + "/") for f in files)
+
+    return shlex.join(a for a in shlex.split(command) if not selects(a))
+
+
+async def _run_shard(
+    index: int,
+    tests: list[str],
+    *,
+    pytest_command: str,
+    cwd: Path,
+    allowlist: CommandAllowlist,
+    out_path: Path,
+    timeout_s: float | None,
+) -> ShardResult:
+    cmd = f"{pytest_command} {DURATIONS_FLAGS} " + " ".join(shlex.quote(t) for t in tests)
+    path = shard_path(out_path, index)
+    started = time.monotonic()
+    res = await run_allowed_async(
+        cmd, cwd=cwd, allowlist=allowlist, output_path=path, timeout_s=timeout_s
+    )
+    elapsed = round(time.monotonic() - started, 3)
+    return ShardResult(index, len(tests), res.returncode, elapsed, path, res.resources)
+
+
+def run_shards(
+    shards: list[list[str]],
+    *,
+    pytest_command: str,
+    cwd: Path,
+    allowlist: CommandAllowlist,
+    out_path: Path,
+    timeout_s: float | None = None,
+) -> list[ShardResult]:
+    """Run every shard concurrently; each streams to `<out_path stem>.shard-<k><suffix>`."""
+
+    async def main() -> list[ShardResult]:
+        return list(
+            await asyncio.gather(
+                *(
+                    _run_shard(
+                        i,
+                        tests,
+                        pytest_command=pytest_command,
+                        cwd=cwd,
+                        allowlist=allowlist,
+                        out_path=out_path,
+                        timeout_s=timeout_s,
+                    )
+                    for i, tests in enumerate(shards, start=1)
+                )
+            )
+        )
+
+    return asyncio.run(main())
+
+
+def merge_outputs(results: list[ShardResult], out_path: Path) -> dict[str, float]:
+    """Concatenate shard logs into `out_path`; returns the merged per-test durations."""
+    durations: dict[str, float] = {}
+    parts: list[str] = []
+    for r in results:
+        text = r.stdout_path.read_text(encoding="utf-8", errors="replace")
+        durations.update(parse_durations(text))
+        parts.append(
+            f"===== shard {r.index}/{len(results)}: {r.tests} tests, "
+            f"rc={r.returncode}, {r.elapsed_s:.2f}s =====\n"
+        )
+        parts.append(text if text.endswith("\n") else text + "\n")
+    # Replaced, never rewritten in place: an earlier copy may be shared (see artifacts).
+    write_artifact(out_path, "".join(parts))
+    return durations
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-import subprocess
+import asyncio
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 
 from .allowlist import CommandAllowlist
+from .engine import run_streaming
+from .trace import span
 
 
 @dataclass
@@ -13,30 +16,69 @@ class ShellResult:
     returncode: int
     stdout: str
     stderr: str
+    # Set when output was streamed to disk; stdout/stderr then only hold their tails.
+    output_path: Path | None = None
+    truncated: bool = False
+    # Wall time, CPU, peak RSS and block I/O of the command (see engine._resources).
+    resources: dict[str, Any] | None = None
 
 
-def run_allowed(
+async def run_allowed_async(
     command: str,
     *,
     cwd: Path,
     allowlist: CommandAllowlist,
     env: dict[str, str] | None = None,
-    timeout_s: int | None = None,
+    timeout_s: float | None = None,
+    output_path: Path | None = None,
 ) -> ShellResult:
+    """Run an allowlisted shell command.
+
+    If `output_path` is given, stdout and stderr are streamed there (interleaved) while
+    the command runs.
+    """
+
     allowlist.check(command)
 
-    p = subprocess.run(
-        command,
-        cwd=str(cwd),
-        shell=True,
-        text=True,
-        capture_output=True,
-        env=env,
-        timeout=timeout_s,
-    )
+    with span("subprocess", cat="subprocess", command=command) as sp:
+        res = await run_streaming(
+            command,
+            cwd=cwd,
+            env=env,
+            timeout_s=timeout_s,
+            stdout_path=output_path,
+            stderr_path=output_path,
+        )
+        sp.set(returncode=res.returncode, **(res.resources or {}))
     return ShellResult(
         command=command,
-        returncode=p.returncode,
-        stdout=p.stdout,
-        stderr=p.stderr,
+        returncode=res.returncode,
+        stdout=res.stdout,
+        stderr=res.stderr,
+        output_path=output_path,
+        truncated=res.truncated,
+        resources=res.resources,
+    )
+
+
+def run_allowed(
+    command: str,
+    *,
+    cwd: Path,
+    allowlist: CommandAllowlist,
+    env: dict[str, str] | None = None,
+    timeout_s: float | None = None,
+    output_path: Path | None = None,
+) -> ShellResult:
+    """Blocking wrapper around `run_allowed_async`."""
+
+    return asyncio.run(
+        run_allowed_async(
+            command,
+            cwd=cwd,
+            allowlist=allowlist,
+            env=env,
+            timeout_s=timeout_s,
+            output_path=output_path,
+        )
     )
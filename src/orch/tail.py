@@ -0,0 +1,456 @@
+from __future__ import annotations
+
+import codecs
+import ctypes
+import json
+import os
+import select
+import struct
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+from .artifacts import ARCHIVE_NAME, SUFFIXES
+from .ledger import run_is_live, utc_now_iso
+
+# inotify(7) event bits.
+IN_MODIFY = 0x2
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+_WATCH_MASK = IN_MODIFY | IN_MOVED_TO | IN_CREATE
+
+_EVENT = struct.Struct("iIII")
+# Top-level entries of a run dir that are never step output.
+_NOT_OUTPUT = ("ledger.jsonl", "trace.json", "workspace")
+# After a wakeup, let writes that arrive together be handled together.
+_BATCH_S = 0.05
+
+
+class _Inotify:
+    """Minimal ctypes binding of Linux inotify (no third-party dependency)."""
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available on this platform")
+        self._libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add(self, path: Path, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(path))
+        return int(wd)
+
+    def remove(self, wd: int) -> None:
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self, timeout_s: float | None) -> list[tuple[int, int, str]]:
+        """Wait up to `timeout_s` (None: forever) and return (wd, mask, name) events."""
+        ready, _, _ = select.select([self.fd], [], [], timeout_s)
+        if not ready:
+            return []
+        time.sleep(_BATCH_S)
+        out: list[tuple[int, int, str]] = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return out
+            pos = 0
+            while pos < len(data):
+                wd, mask, _cookie, size = _EVENT.unpack_from(data, pos)
+                pos += _EVENT.size
+                name = data[pos : pos + size].rstrip(b"\0")
+                pos += size
+                out.append((wd, mask, os.fsdecode(name)))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+@dataclass
+class TailEvent:
+    """A new ledger record, or text appended to one of the run's output files."""
+
+    run_id: str
+    record: dict[str, Any] | None = None
+    # Output file, relative to the run dir.
+    path: str | None = None
+    text: str = ""
+
+
+@dataclass
+class _File:
+    inode: int
+    offset: int
+    decoder: codecs.IncrementalDecoder = field(
+        default_factory=lambda: codecs.getincrementaldecoder("utf-8")(errors="replace")
+    )
+
+
+class _Run:
+    """Byte offsets into one run's ledger and output files."""
+
+    def __init__(self, run_dir: Path) -> None:
+        self.dir = run_dir
+        self.ledger_offset = 0
+        self.files: dict[str, _File] = {}
+        self.done = False
+
+    def read_ledger(self) -> list[dict[str, Any]]:
+        """Complete records appended since the last call."""
+        path = self.dir / "ledger.jsonl"
+        try:
+            with path.open("rb") as f:
+                if f.seek(0, os.SEEK_END) < self.ledger_offset:
+                    self.ledger_offset = 0  # rewritten: start over
+                f.seek(self.ledger_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        # Only whole lines: a record still being written is picked up next time.
+        end = data.rfind(b"\n") + 1
+        self.ledger_offset += end
+        out = []
+        for line in data[:end].splitlines():
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(rec, dict):
+                out.append(rec)
+                self.done = rec.get("step") == "RUN"
+        return out
+
+    def read_output(self, rel: str, *, adopt: bool = False) -> str:
+        """Text appended to `rel` since the last call.
+
+        A file seen for the first time with `adopt` (or one replaced by a new file at
+        the same path) is taken as a finished artifact: nothing of it is returned.
+        """
+        try:
+            st = (self.dir / rel).stat()
+        except FileNotFoundError:
+            self.files.pop(rel, None)
+            return ""
+        known = self.files.get(rel)
+        if known is None or known.inode != st.st_ino:
+            start = st.st_size if adopt or known is not None else 0
+            known = self.files[rel] = _File(st.st_ino, start)
+        if st.st_size < known.offset:
+            known.offset = 0  # truncated in place
+        if st.st_size == known.offset:
+            return ""
+        with (self.dir / rel).open("rb") as f:
+            f.seek(known.offset)
+            data = f.read(st.st_size - known.offset)
+        known.offset += len(data)
+        return known.decoder.decode(data)
+
+    def output_files(self, sub: Path | None = None) -> Iterator[str]:
+        """Files under the run dir (or its subdirectory `sub`) that may be step output."""
+        stack = [sub or self.dir]
+        while stack:
+            try:
+                entries = list(os.scandir(stack.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                rel = Path(entry.path).relative_to(self.dir).as_posix()
+                if not is_output(rel):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(Path(entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    yield rel
+
+
+def is_output(rel: str) -> bool:
+    """Whether the run-dir relative path `rel` can hold streamed step output."""
+    name = rel.rsplit("/", 1)[-1]
+    return not (
+        rel.split("/", 1)[0] in _NOT_OUTPUT
+        or name.startswith(".")
+        or name.endswith(".tmp")
+        or name == ARCHIVE_NAME
+        or any(name.endswith(s) for s in SUFFIXES.values())
+    )
+
+
+def _finished(ledger: Path) -> bool:
+    """Whether the ledger's last record is the terminal RUN record."""
+    try:
+        with ledger.open("rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - 64 * 1024))
+            lines = f.read().splitlines()
+    except OSError:
+        return False
+    for line in reversed(lines):
+        try:
+            return bool(json.loads(line).get("step") == "RUN")
+        except (ValueError, AttributeError):
+            continue
+    return False
+
+
+def runs_in_flight(runs_dir: Path) -> list[Path]:
+    """Run dirs whose ledger has no terminal RUN record yet and whose process is alive.
+
+    A run that crashed never writes its RUN record, but its lock is released.
+    """
+    return sorted(
+        p.parent
+        for p in runs_dir.glob("*/ledger.jsonl")
+        if not p.parent.name.startswith(".") and not _finished(p) and run_is_live(p.parent)
+    )
+
+
+class Tailer:
+    """Follows the ledgers and output files of one or more runs.
+
+    Every file is read from the byte offset where the previous read stopped, so each
+    wakeup costs a read of just the new bytes. Output is what tools and tests stream
+    into a run's files while they run: bytes written in place. Files that appear
+    complete (atomic writes, object-store links, compression) are not echoed.
+
+    With inotify (Linux), one watch descriptor per run directory wakes the tailer
+    exactly when something changes, and it sleeps in select() otherwise. Elsewhere, or
+    when inotify cannot be used, it stats the runs' files every `poll_interval_s`.
+
+    A run that stops without writing its RUN record (its process crashed or was killed)
+    is finished too: once its lock is free (see ledger.lock_run), it gets a final
+    CRASHED record. Runs are checked for this every `poll_interval_s`.
+    """
+
+    def __init__(
+        self,
+        run_dirs: list[Path],
+        *,
+        backlog: int = 10,
+        poll_interval_s: float = 0.5,
+        use_inotify: bool = True,
+    ) -> None:
+        self.poll_interval_s = poll_interval_s
+        self._runs = {d.name: _Run(d) for d in run_dirs}
+        self._backlog: list[TailEvent] = []
+        for run in self._runs.values():
+            records = run.read_ledger()
+            self._backlog += [TailEvent(run.dir.name, r) for r in records[-backlog:] if backlog]
+            for rel in run.output_files():
+                run.read_output(rel, adopt=True)
+        self._inotify: _Inotify | None = None
+        self._watches: dict[int, tuple[_Run, Path]] = {}
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+                for run in self._runs.values():
+                    if not run.done:
+                        self._watch_tree(run, run.dir)
+            except OSError:
+                self.close()
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify is not None else "poll"
+
+    @property
+    def done(self) -> bool:
+        return all(run.done for run in self._runs.values())
+
+    def close(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+            self._watches.clear()
+
+    def __enter__(self) -> Tailer:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _watch_tree(self, run: _Run, top: Path) -> None:
+        assert self._inotify is not None
+        dirs = [top]
+        while dirs:
+            d = dirs.pop()
+            try:
+                self._watches[self._inotify.add(d, _WATCH_MASK)] = (run, d)
+                entries = list(os.scandir(d))
+            except FileNotFoundError:
+                continue  # already removed again (e.g. by compression or archiving)
+            dirs += [
+                Path(e.path)
+                for e in entries
+                if e.is_dir(follow_symlinks=False)
+                and is_output(Path(e.path).relative_to(run.dir).as_posix())
+            ]
+
+    def _unwatch(self, run: _Run) -> None:
+        assert self._inotify is not None
+        for wd in [wd for wd, (r, _) in self._watches.items() if r is run]:
+            self._inotify.remove(wd)
+            del self._watches[wd]
+
+    def events(self, timeout_s: float | None = None) -> list[TailEvent]:
+        """Wait (at most `timeout_s`; None: until something happens) for new records
+        and output, and return them."""
+        if self._backlog:
+            out, self._backlog = self._backlog, []
+            return out
+        if self._inotify is not None:
+            try:
+                return self._inotify_events(timeout_s)
+            except OSError:
+                self.close()  # e.g. out of watches (fs.inotify.max_user_watches): poll
+        deadline = None if timeout_s is None else time.monotonic() + timeout_s
+        while True:
+            out = []
+            for run in self._runs.values():
+                if not run.done:
+                    out += self._poll_output(run)
+                    out += self._records(run)
+                    out += self._crashed(run)
+            if out or self.done:
+                return out
+            wait = self.poll_interval_s
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return out
+            time.sleep(wait)
+
+    def _inotify_events(self, timeout_s: float | None) -> list[TailEvent]:
+        deadline = None if timeout_s is None else time.monotonic() + timeout_s
+        while not self.done:
+            # Wake up now and then: a crashed run changes nothing there is a watch on.
+            wait = self.poll_interval_s
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    break
+            out = self._inotify_batch(wait)
+            if out:
+                return out
+        return []
+
+    def _inotify_batch(self, timeout_s: float) -> list[TailEvent]:
+        assert self._inotify is not None
+        changed: dict[_Run, dict[str, bool]] = {}
+        ledgers: set[_Run] = set()
+        for wd, mask, name in self._inotify.read(timeout_s):
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: look at everything.
+                for run in self._runs.values():
+                    changed.setdefault(run, {}).update(self._scan(run, run.dir))
+                    ledgers.add(run)
+                continue
+            if mask & IN_IGNORED or wd not in self._watches or not name:
+                continue
+            run, d = self._watches[wd]
+            rel = (d / name).relative_to(run.dir).as_posix()
+            if rel == "ledger.jsonl":
+                ledgers.add(run)
+            elif not is_output(rel):
+                continue
+            elif mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._watch_tree(run, d / name)
+                    # Files may have been created before the watch was added.
+                    changed.setdefault(run, {}).update(self._scan(run, d / name))
+            else:
+                files = changed.setdefault(run, {})
+                # Moved into place: an artifact written elsewhere, finished.
+                files[rel] = files.get(rel, False) or bool(mask & IN_MOVED_TO)
+
+        out: list[TailEvent] = []
+        for run in self._runs.values():
+            if run.done:
+                continue
+            files = changed.get(run, {})
+            for rel, moved in files.items():
+                text = run.read_output(rel, adopt=moved)
+                if text:
+                    out.append(TailEvent(run.dir.name, path=rel, text=text))
+            if run in ledgers:
+                out += self._records(run)
+            out += self._crashed(run)
+            if run.done:
+                self._unwatch(run)
+        return out
+
+    def _scan(self, run: _Run, top: Path) -> dict[str, bool]:
+        # Without events to tell renames apart, object-store links count as finished.
+        return {rel: _linked(run.dir / rel) for rel in run.output_files(top)}
+
+    def _poll_output(self, run: _Run) -> list[TailEvent]:
+        out = []
+        for rel in run.output_files():
+            # Polling cannot see renames; object-store links are finished artifacts.
+            text = run.read_output(rel, adopt=_linked(run.dir / rel))
+            if text:
+                out.append(TailEvent(run.dir.name, path=rel, text=text))
+        return out
+
+    def _records(self, run: _Run) -> list[TailEvent]:
+        return [TailEvent(run.dir.name, rec) for rec in run.read_ledger()]
+
+    def _crashed(self, run: _Run) -> list[TailEvent]:
+        """If `run` stopped without its RUN record: its last records and a CRASHED one."""
+        if run.done or run_is_live(run.dir):
+            return []
+        # It may have written its RUN record and exited since the last read.
+        out = self._records(run)
+        if not run.done:
+            run.done = True
+            rec = {
+                "ts": utc_now_iso(),
+                "step": "CRASHED",
+                "reason": "no RUN record and no process holds the run's lock",
+            }
+            out.append(TailEvent(run.dir.name, rec))
+        return out
+
+    def follow(self) -> Iterator[TailEvent]:
+        """Yield events until every followed run has written its RUN record or crashed."""
+        while True:
+            yield from self.events()
+            if self.done and not self._backlog:
+                return
+
+
+def _linked(path: Path) -> bool:
+    try:
+        return path.stat().st_nlink > 1
+    except OSError:
+        return False
+
+
+# Ledger fields too long or too noisy for a one-line summary.
+_HIDDEN = ("ts", "seq", "step", "prompt", "stderr", "parsed", "resources", "raw")
+
+
+def format_record(rec: dict[str, Any], *, run_dir: Path | None = None, width: int = 60) -> str:
+    """One line per ledger record: time, step, then the short scalar fields (paths
+    relative to `run_dir`)."""
+    ts = str(rec.get("ts", ""))[11:19]
+    parts = [f"{ts:8} {str(rec.get('step', '?')):<12}"]
+    for key, value in rec.items():
+        if key in _HIDDEN or isinstance(value, (dict, list)) or value is None:
+            continue
+        text = str(value)
+        if run_dir is not None and text.startswith(f"{run_dir}/"):
+            text = text[len(str(run_dir)) + 1 :]
+        if len(text) > width:
+            text = text[: width - 1] + "…"
+        parts.append(f"{key}={text}")
+    return " ".join(parts)
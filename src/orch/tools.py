@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import shlex
-import subprocess
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
+
+from .engine import run_streaming
+from .trace import span
 
 
 @dataclass
@@ -12,19 +16,26 @@ class ToolResult:
     returncode: int
     stdout: str
     stderr: str
+    # Set when stdout was streamed to disk; `stdout` then only holds its tail.
+    stdout_path: Path | None = None
+    truncated: bool = False
+    # Wall time, CPU, peak RSS and block I/O of the tool process (see engine._resources).
+    resources: dict[str, Any] | None = None
 
 
-def run_tool(
+async def run_tool_async(
     cmd: str,
     *,
     prompt: str,
     cwd: Path,
     env: dict[str, str] | None = None,
-    timeout_s: int | None = None,
+    timeout_s: float | None = None,
+    output_path: Path | None = None,
 ) -> ToolResult:
     """Run a local terminal tool (Codex/Claude) via shell.
 
     `cmd` is the base command; we append the prompt as a single POSIX-shell-escaped argument.
+    If `output_path` is given, stdout is streamed there while the tool runs.
 
     Notes:
     - Use env vars ORCH_CODEX_CMD / ORCH_CLAUDE_CMD to point at real tools.
@@ -32,13 +43,38 @@ def run_tool(
     """
 
     full = f"{cmd} {shlex.quote(prompt)}"
-    p = subprocess.run(
-        full,
-        cwd=str(cwd),
-        shell=True,
-        text=True,
-        capture_output=True,
-        env=env,
-        timeout=timeout_s,
+    with span("subprocess", cat="subprocess", command=cmd, prompt_chars=len(prompt)) as sp:
+        res = await run_streaming(
+            full,
+            cwd=cwd,
+            env=env,
+            timeout_s=timeout_s,
+            stdout_path=output_path,
+        )
+        sp.set(returncode=res.returncode, **(res.resources or {}))
+    return ToolResult(
+        full, res.returncode, res.stdout, res.stderr, output_path, res.truncated, res.resources
+    )
+
+
+def run_tool(
+    cmd: str,
+    *,
+    prompt: str,
+    cwd: Path,
+    env: dict[str, str] | None = None,
+    timeout_s: float | None = None,
+    output_path: Path | None = None,
+) -> ToolResult:
+    """Blocking wrapper around `run_tool_async`."""
+
+    return asyncio.run(
+        run_tool_async(
+            cmd,
+            prompt=prompt,
+            cwd=cwd,
+            env=env,
+            timeout_s=timeout_s,
+            output_path=output_path,
+        )
     )
-    return ToolResult(full, p.returncode, p.stdout, p.stderr)
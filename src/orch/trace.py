@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Iterator
+
+from .artifacts import read_artifact
+
+
+class Span:
+    """A timed region; becomes one Chrome "complete" event when it exits."""
+
+    __slots__ = ("_tracer", "name", "cat", "args", "_ts", "_t0")
+
+    def __init__(self, tracer: Tracer, name: str, cat: str, args: dict[str, Any]) -> None:
+        self._tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self._ts = 0
+        self._t0 = 0
+
+    def set(self, **args: Any) -> None:
+        """Attach (more) args, e.g. a return code known only at the end."""
+        self.args.update(args)
+
+    def __enter__(self) -> Span:
+        self._ts = time.time_ns() // 1000
+        self._t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *exc: object) -> None:
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        dur = (time.perf_counter_ns() - self._t0) // 1000
+        self._tracer.complete(self.name, self.cat, self._ts, dur, self.args)
+
+
+class _NoSpan:
+    """What `span` hands out when tracing is off: nothing is timed or kept."""
+
+    __slots__ = ()
+
+    def set(self, **args: Any) -> None:
+        pass
+
+    def __enter__(self) -> _NoSpan:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Tracer:
+    """Collects spans for one run attempt and writes them in Chrome Trace Event format.
+
+    Open the resulting `trace.json` in chrome://tracing or https://ui.perfetto.dev.
+    Every thread, and every asyncio task within a thread, gets its own track, so
+    concurrent tool calls and test shards show up side by side.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.started_us = time.time_ns() // 1000
+        self._t0 = time.perf_counter_ns()
+        self._lock = threading.Lock()
+        self._events: list[dict[str, Any]] = []
+        self._tids: dict[tuple[int, int], int] = {}
+
+    def span(self, name: str, cat: str, **args: Any) -> Span:
+        return Span(self, name, cat, args)
+
+    def elapsed_us(self) -> int:
+        return (time.perf_counter_ns() - self._t0) // 1000
+
+    def complete(
+        self, name: str, cat: str, ts_us: int, dur_us: int, args: dict[str, Any]
+    ) -> None:
+        event = {"name": name, "cat": cat, "ph": "X", "ts": ts_us, "dur": dur_us, "args": args}
+        with self._lock:
+            event["tid"] = self._tid()
+            self._events.append(event)
+
+    def _tid(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = (threading.get_ident(), id(task) if task is not None else 0)
+        tid = self._tids.get(key)
+        if tid is None:
+            tid = self._tids[key] = len(self._tids) + 1
+            label = threading.current_thread().name
+            if task is not None:
+                label += f" / {task.get_name()}"
+            self._events.append(
+                {"name": "thread_name", "ph": "M", "tid": tid, "args": {"name": label}}
+            )
+        return tid
+
+    def write(self, path: Path) -> None:
+        """Write the trace; earlier attempts of the run (`orch resume`) already in `path`
+        are kept, each as its own process in the viewer."""
+        events: list[dict[str, Any]] = []
+        try:
+            events = json.loads(read_artifact(path))["traceEvents"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        pid = max((e.get("pid", 0) for e in events), default=0) + 1
+        events.append(
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": self.name}}
+        )
+        with self._lock:
+            events.extend({**e, "pid": pid} for e in self._events)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(
+            json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, default=str),
+            encoding="utf-8",
+        )
+        os.replace(tmp, path)
+
+
+_CURRENT: ContextVar[Tracer | None] = ContextVar("orch_tracer", default=None)
+
+
+def span(name: str, cat: str = "step", **args: Any) -> Span | _NoSpan:
+    """A span on the current tracer (see `tracing`); a no-op when there is none."""
+    tracer = _CURRENT.get()
+    if tracer is None:
+        return _NO_SPAN
+    return tracer.span(name, cat, **args)
+
+
+@contextmanager
+def tracing(tracer: Tracer | None) -> Iterator[None]:
+    """Make `tracer` current in this thread (and in tasks/threads started from here with
+    a copy of the context, e.g. asyncio tasks and asyncio.to_thread)."""
+    token = _CURRENT.set(tracer)
+    try:
+        yield
+    finally:
+        _CURRENT.reset(token)
@@ -12,3 +12,6 @@ class Step(str, Enum):
     FIXLOOP = "FIXLOOP"
     GATE = "GATE"
     PUBLISH = "PUBLISH"
+    NODE = "NODE"
+    RESUME = "RESUME"
+    RUN = "RUN"
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from .codex_status import CodexStatus
+
+_DELTA_FIELDS = ("input_tokens", "output_tokens", "total_tokens", "cost_usd")
+
+
+def usage_delta(before: CodexStatus, after: CodexStatus) -> dict[str, Any]:
+    """Per-field difference between two status snapshots (None where either is unknown)."""
+    out: dict[str, Any] = {}
+    for name in _DELTA_FIELDS:
+        a, b = getattr(before, name), getattr(after, name)
+        if a is None or b is None:
+            out[name] = None
+        elif isinstance(a, float) or isinstance(b, float):
+            out[name] = round(b - a, 6)
+        else:
+            out[name] = b - a
+    return out
+
+
+class UsageSampler:
+    """Measures Codex usage per step with as few `/status` probes as possible.
+
+    Probes run on a background thread, so they are off the critical path: the probe
+    after a step overlaps with whatever runs next. Probes are also coalesced: the
+    snapshot taken after one measured step is the baseline of the next one, so N Codex
+    steps cost N + 1 probes instead of 2N. This assumes nothing else spends Codex usage
+    between measured steps of the same run.
+    """
+
+    def __init__(
+        self,
+        probe: Callable[[], CodexStatus],
+        emit: Callable[[dict[str, Any]], None],
+    ) -> None:
+        self._probe = probe
+        self._emit = emit
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="orch-usage")
+        self._lock = threading.Lock()
+        self._latest: Future[tuple[CodexStatus, float]] | None = None
+        self.probes = 0
+
+    def _timed_probe(self) -> tuple[CodexStatus, float]:
+        started = time.monotonic()
+        status = self._probe()
+        return status, round(time.monotonic() - started, 3)
+
+    def sample(self) -> Future[tuple[CodexStatus, float]]:
+        """Start a probe in the background; it becomes the baseline for the next step."""
+        with self._lock:
+            self.probes += 1
+            self._latest = self._pool.submit(self._timed_probe)
+            return self._latest
+
+    @contextmanager
+    def measure(self, label: str) -> Iterator[None]:
+        """Emit one usage record for the Codex call(s) made inside this block.
+
+        A failed probe never fails the block: the record then carries an "error" instead
+        of usage figures.
+        """
+        with self._lock:
+            baseline = self._latest
+        if baseline is None:
+            baseline = self.sample()
+        try:
+            before, _ = baseline.result()
+        except Exception as e:  # noqa: BLE001
+            before, baseline_error = None, f"baseline probe failed: {e}"
+
+        yield
+
+        after_future = self.sample()
+
+        def _done(fut: Future[tuple[CodexStatus, float]]) -> None:
+            if fut.exception() is not None:
+                self._emit({"step": "CODEX_STATUS", "label": label, "error": str(fut.exception())})
+                return
+            if before is None:
+                self._emit({"step": "CODEX_STATUS", "label": label, "error": baseline_error})
+                return
+            after, probe_s = fut.result()
+            record: dict[str, Any] = {
+                "step": "CODEX_STATUS",
+                "label": label,
+                "parsed": after.as_dict(),
+                "delta": usage_delta(before, after),
+                "probe_s": probe_s,
+            }
+            if after.model is None and after.total_tokens is None:
+                # Unparseable: keep a bit of the raw text for debugging.
+                record["raw"] = after.raw[-2000:]
+            self._emit(record)
+
+        after_future.add_done_callback(_done)
+
+    def close(self) -> None:
+        """Wait for in-flight probes (and their records)."""
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import selectors
+import signal
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from .engine import track_group, untrack_group
+from .tools import ToolResult
+
+
+class WorkerError(RuntimeError):
+    pass
+
+
+class ToolWorker:
+    """A long-lived tool process answering prompts over line-delimited JSON.
+
+    The tool is started as `<cmd> <serve_flag>`; see tools/fake_server.py for the protocol.
+    """
+
+    def __init__(self, cmd: str, *, cwd: Path, serve_flag: str = "--serve") -> None:
+        self.cmd = cmd
+        self.cwd = cwd
+        self.requests = 0
+        self._next_id = 0
+        self.proc = subprocess.Popen(
+            f"{cmd} {serve_flag}",
+            cwd=str(cwd),
+            shell=True,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+            start_new_session=True,
+        )
+        track_group(self.proc.pid)
+
+    @property
+    def pid(self) -> int:
+        return self.proc.pid
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def request(self, payload: dict[str, Any], *, timeout_s: float | None = None) -> dict[str, Any]:
+        assert self.proc.stdin is not None and self.proc.stdout is not None
+        self._next_id += 1
+        msg = {"id": self._next_id, **payload}
+        try:
+            self.proc.stdin.write(json.dumps(msg) + "\n")
+            self.proc.stdin.flush()
+        except OSError as e:
+            raise WorkerError(f"worker {self.pid} is gone: {e}") from e
+
+        with selectors.DefaultSelector() as sel:
+            sel.register(self.proc.stdout, selectors.EVENT_READ)
+            if not sel.select(timeout_s):
+                raise subprocess.TimeoutExpired(self.cmd, timeout_s)
+
+        line = self.proc.stdout.readline()
+        if not line:
+            raise WorkerError(f"worker {self.pid} exited (rc={self.proc.poll()})")
+        reply = json.loads(line)
+        if reply.get("id") != msg["id"]:
+            raise WorkerError(
+                f"worker {self.pid} answered request {reply.get('id')}, not {msg['id']}"
+            )
+        return reply
+
+    def run(self, prompt: str, *, cwd: Path, timeout_s: float | None = None) -> dict[str, Any]:
+        self.requests += 1
+        return self.request({"op": "run", "prompt": prompt, "cwd": str(cwd)}, timeout_s=timeout_s)
+
+    def healthy(self, timeout_s: float = 5.0) -> bool:
+        if not self.alive():
+            return False
+        try:
+            return bool(self.request({"op": "ping"}, timeout_s=timeout_s).get("ok"))
+        except (WorkerError, subprocess.TimeoutExpired, json.JSONDecodeError):
+            return False
+
+    def close(self) -> None:
+        if self.alive():
+            try:
+                assert self.proc.stdin is not None
+                self.proc.stdin.write(json.dumps({"op": "exit"}) + "\n")
+                self.proc.stdin.close()
+                self.proc.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.proc.wait()
+        untrack_group(self.proc.pid)
+
+
+class ToolWorkerPool:
+    """Warm tool processes, keyed by command.
+
+    Every request names its own cwd, so one worker serves all runs and workspaces. At
+    most `size` workers run per command; a worker is recycled after `max_requests`
+    prompts, and health-checked (ping) before every reuse.
+    """
+
+    def __init__(
+        self,
+        *,
+        size: int = 2,
+        max_requests: int = 50,
+        serve_flag: str = "--serve",
+        health_timeout_s: float = 5.0,
+    ) -> None:
+        self.size = max(1, size)
+        self.max_requests = max_requests
+        self.serve_flag = serve_flag
+        self.health_timeout_s = health_timeout_s
+        self.started = 0
+        self.recycled = 0
+        self._idle: dict[str, list[ToolWorker]] = {}
+        self._busy: dict[str, int] = {}
+        self._cond = threading.Condition()
+
+    def _checkout(self, cmd: str, cwd: Path) -> ToolWorker:
+        # A new worker starts in `cwd`; later requests may be for other directories.
+        with self._cond:
+            while True:
+                idle = self._idle.setdefault(cmd, [])
+                busy = self._busy.get(cmd, 0)
+                if idle:
+                    worker = idle.pop()
+                    break
+                if busy < self.size:
+                    worker = None
+                    break
+                self._cond.wait()
+            self._busy[cmd] = busy + 1
+
+        if worker is not None and worker.healthy(self.health_timeout_s):
+            return worker
+        if worker is not None:
+            worker.close()
+            self.recycled += 1
+        try:
+            worker = ToolWorker(cmd, cwd=cwd, serve_flag=self.serve_flag)
+        except BaseException:
+            self._release(cmd, None)
+            raise
+        self.started += 1
+        return worker
+
+    def _release(self, cmd: str, worker: ToolWorker | None) -> None:
+        with self._cond:
+            self._busy[cmd] -= 1
+            if worker is not None:
+                self._idle.setdefault(cmd, []).append(worker)
+            self._cond.notify()
+
+    def run(
+        self,
+        cmd: str,
+        *,
+        prompt: str,
+        cwd: Path,
+        timeout_s: float | None = None,
+    ) -> tuple[ToolResult, int]:
+        """Send `prompt` to a warm worker; returns the result and the worker pid.
+
+        The result's `resources` hold the request's wall time, plus whatever CPU and I/O
+        figures the worker reported for it (see tools/fake_server.py).
+        """
+        worker = self._checkout(cmd, cwd)
+        keep = False
+        started = time.monotonic()
+        try:
+            reply = worker.run(prompt, cwd=cwd, timeout_s=timeout_s)
+            keep = worker.requests < self.max_requests
+        finally:
+            if not keep:
+                worker.close()
+                self.recycled += 1
+            self._release(cmd, worker if keep else None)
+        wall_s = round(time.monotonic() - started, 3)
+
+        reported = reply.get("resources")
+        result = ToolResult(
+            command=f"{cmd} {self.serve_flag} <prompt>",
+            returncode=int(reply.get("returncode", 1)),
+            stdout=reply.get("stdout", ""),
+            stderr=reply.get("stderr", ""),
+            resources={"wall_s": wall_s, **(reported if isinstance(reported, dict) else {})},
+        )
+        return result, worker.pid
+
+    def close(self) -> None:
+        with self._cond:
+            workers = [w for ws in self._idle.values() for w in ws]
+            self._idle.clear()
+        for w in workers:
+            w.close()
+
+
+_POOL: ToolWorkerPool | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def shared_pool(*, size: int, max_requests: int, serve_flag: str) -> ToolWorkerPool:
+    """Process-wide pool, created on first use and shut down at interpreter exit."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ToolWorkerPool(size=size, max_requests=max_requests, serve_flag=serve_flag)
+            atexit.register(_POOL.close)
+        return _POOL
+
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import difflib
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from .impact import changed_files, snapshot_tree
+
+
+class WorkspaceError(RuntimeError):
+    pass
+
+
+def _git(
+    root: Path,
+    *args: str,
+    env: dict[str, str] | None = None,
+    input: bytes | None = None,
+) -> bytes:
+    p = subprocess.run(
+        ["git", *args],
+        cwd=str(root),
+        env=env,
+        input=input,
+        capture_output=True,
+    )
+    if p.returncode != 0:
+        raise WorkspaceError(
+            f"git {' '.join(args)} failed: {p.stderr.decode('utf-8', 'replace').strip()}"
+        )
+    return p.stdout
+
+
+def is_git_repo(root: Path) -> bool:
+    try:
+        return _git(root, "rev-parse", "--show-toplevel").strip() != b""
+    except (OSError, WorkspaceError):
+        return False
+
+
+def repo_prefix(root: Path) -> str:
+    """Path of `root` relative to the top of its git checkout ("" at the top)."""
+    return _git(root, "rev-parse", "--show-prefix").decode().strip()
+
+
+def snapshot_commit(root: Path, *, exclude: tuple[str, ...] = ()) -> str:
+    """Commit the current working tree (tracked and untracked, minus .gitignore'd files).
+
+    A clean working tree is HEAD itself. Otherwise the snapshot is built in a throwaway
+    index, so HEAD, the real index and the working tree are untouched. `exclude` are
+    repo-relative paths to leave out (e.g. the runs directory).
+    """
+
+    try:
+        head = _git(root, "rev-parse", "--verify", "-q", "HEAD").decode().strip()
+    except WorkspaceError:
+        head = ""
+    pathspec = ["."] + [f":(exclude){e}" for e in exclude]
+    # The real index's stat cache makes this cheap; hashing the whole tree into a
+    # fresh index is only needed when something actually changed.
+    if head and not _git(root, "status", "--porcelain", "-uall", "--", *pathspec).strip():
+        return head
+
+    with tempfile.TemporaryDirectory(prefix="orch-index-") as tmp:
+        env = {**os.environ, "GIT_INDEX_FILE": str(Path(tmp) / "index")}
+        if head:
+            _git(root, "read-tree", head, env=env)
+        _git(root, "add", "-A", "--", *pathspec, env=env)
+        tree = _git(root, "write-tree", env=env).decode().strip()
+
+    # commit-tree needs an identity; don't depend on the user's git config.
+    ident = {
+        "GIT_AUTHOR_NAME": os.environ.get("GIT_AUTHOR_NAME", "orch"),
+        "GIT_AUTHOR_EMAIL": os.environ.get("GIT_AUTHOR_EMAIL", "orch@localhost"),
+        "GIT_COMMITTER_NAME": os.environ.get("GIT_COMMITTER_NAME", "orch"),
+        "GIT_COMMITTER_EMAIL": os.environ.get("GIT_COMMITTER_EMAIL", "orch@localhost"),
+    }
+    parents = ["-p", head] if head else []
+    out = _git(
+        root,
+        "commit-tree",
+        tree,
+        *parents,
+        "-m",
+        "orch workspace snapshot",
+        env={**os.environ, **ident},
+    )
+    return out.decode().strip()
+
+
+def add_worktree(root: Path, path: Path, commit: str) -> Path:
+    """Check `commit` out into a new detached worktree at `path`."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _git(root, "worktree", "add", "--detach", "--force", str(path), commit)
+    return path
+
+
+def remove_worktree(root: Path, path: Path) -> None:
+    try:
+        _git(root, "worktree", "remove", "--force", str(path))
+    except WorkspaceError:
+        shutil.rmtree(path, ignore_errors=True)
+        _git(root, "worktree", "prune")
+
+
+def diff_since(path: Path, base: str, *, exclude: tuple[str, ...] = ()) -> bytes:
+    """Binary patch from commit `base` to the current working tree at `path`."""
+    head = snapshot_commit(path, exclude=exclude)
+    return _git(path, "diff", "--binary", base, head)
+
+
+def changed_since(path: Path, base: str, *, exclude: tuple[str, ...] = ()) -> list[str]:
+    """Files (relative to `path`) that differ between commit `base` and the working tree."""
+    head = snapshot_commit(path, exclude=exclude)
+    return _git(path, "diff", "--name-only", "--relative", base, head).decode().splitlines()
+
+
+def apply_patch(root: Path, patch: bytes) -> None:
+    """Apply a `git diff --binary` patch to the working tree at `root` (index untouched)."""
+    if patch.strip():
+        top = Path(_git(root, "rev-parse", "--show-toplevel").decode().strip())
+        _git(top, "apply", "--binary", "--whitespace=nowarn", "-", input=patch)
+
+
+@dataclass(frozen=True)
+class Workspace:
+    """A run's private copy of the repo."""
+
+    # Stand-in for repo_root inside the workspace (tools and tests run here).
+    root: Path
+    # Directory to delete when the workspace is closed.
+    location: Path
+    # "worktree" or "copy".
+    mode: str
+    # Snapshot commit a worktree was checked out from (None for copies).
+    base: str | None = None
+
+
+def _copy_tree(src: Path, dest: Path, *, exclude: tuple[str, ...]) -> None:
+    skip = {".git", *(Path(e).parts[0] for e in exclude)}
+    entries = [p for p in src.iterdir() if p.name not in skip]
+    dest.mkdir(parents=True)
+    if not entries:
+        return
+    # Reflink (copy-on-write) where the filesystem supports it, a plain copy elsewhere.
+    p = subprocess.run(
+        ["cp", "-a", "--reflink=auto", *map(str, entries), str(dest)],
+        capture_output=True,
+    )
+    if p.returncode != 0:  # e.g. BSD cp without --reflink
+        shutil.rmtree(dest, ignore_errors=True)
+        shutil.copytree(src, dest, symlinks=True, ignore=lambda d, names: skip & set(names))
+
+
+def open_workspace(
+    root: Path, dest: Path, *, mode: str = "auto", exclude: tuple[str, ...] = ()
+) -> Workspace:
+    """Give a run its own copy of `root` at `dest`, including uncommitted changes.
+
+    "worktree" checks a snapshot of the working tree out with `git worktree` (only the
+    checkout is new; objects are shared). "copy" copies the tree, minus .git, with
+    copy-on-write reflinks where the filesystem supports them. "auto" picks worktree
+    for git checkouts and copy otherwise. `exclude` are repo-relative paths to leave out.
+    """
+
+    if mode == "auto":
+        mode = "worktree" if is_git_repo(root) else "copy"
+    if mode == "worktree":
+        base = snapshot_commit(root, exclude=exclude)
+        add_worktree(root, dest, base)
+        return Workspace(dest / repo_prefix(root), dest, "worktree", base)
+    if mode == "copy":
+        _copy_tree(root, dest, exclude=exclude)
+        return Workspace(dest, dest, "copy")
+    raise WorkspaceError(f"Unknown workspace mode: {mode!r}")
+
+
+def workspace_patch(ws: Workspace, source: Path, *, exclude: tuple[str, ...] = ()) -> bytes:
+    """The run's changes: a `git diff --binary` for worktrees, a unified diff for copies."""
+    if ws.base is not None:
+        return diff_since(ws.root, ws.base, exclude=exclude)
+
+    skip = tuple(ws.root / e for e in exclude)
+    before = snapshot_tree(source, exclude=tuple(source / e for e in exclude))
+    after = snapshot_tree(ws.root, exclude=skip)
+    out: list[str] = []
+    for rel in sorted(changed_files(before, after)):
+        # Copies keep mtimes (cp -a), so only files the run touched show up here.
+        old, new = source / rel, ws.root / rel
+        try:
+            a = old.read_text(encoding="utf-8").splitlines(True) if old.exists() else []
+            b = new.read_text(encoding="utf-8").splitlines(True) if new.exists() else []
+        except UnicodeDecodeError:
+            out.append(f"Binary files a/{rel} and b/{rel} differ\n")
+            continue
+        out.extend(difflib.unified_diff(a, b, f"a/{rel}", f"b/{rel}"))
+    return "".join(out).encode("utf-8")
+
+
+def close_workspace(root: Path, ws: Workspace) -> None:
+    if ws.mode == "worktree":
+        remove_worktree(root, ws.location)
+    else:
+        shutil.rmtree(ws.location, ignore_errors=True)
+
+
+def gc_workspaces(root: Path, workspaces: Path, *, older_than_s: float) -> list[Path]:
+    """Remove workspaces under `workspaces` not touched for `older_than_s` seconds."""
+    if not workspaces.is_dir():
+        return []
+    cutoff = time.time() - older_than_s
+    removed: list[Path] = []
+    for d in workspaces.iterdir():
+        try:
+            if d.stat().st_mtime >= cutoff:
+                continue
+        except OSError:
+            continue
+        if (d / ".git").is_file():  # a linked worktree
+            try:
+                remove_worktree(root, d)
+            except WorkspaceError:
+                shutil.rmtree(d, ignore_errors=True)
+        else:
+            shutil.rmtree(d, ignore_errors=True)
+        removed.append(d)
+    if removed and is_git_repo(root):
+        try:
+            _git(root, "worktree", "prune")
+        except WorkspaceError:
+            pass
+    return removed
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture
+def repo_copy(tmp_path: Path, monkeypatch) -> Path:
+    """A temp copy of the repo (cwd set to it), so runs do not pollute the working tree."""
+    repo_root = tmp_path / "repo"
+
+    def _ignore(_dir, names):
+        return {
+            n
+            for n in names
+            if n in {".venv", "runs", ".pytest_cache", "__pycache__", ".git"}
+        }
+
+    shutil.copytree(Path.cwd(), repo_root, dirs_exist_ok=True, ignore=_ignore)
+    monkeypatch.chdir(repo_root)
+    return repo_root
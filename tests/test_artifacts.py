@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from demo_project import report_ui
+from orch.artifacts import (
+    ArtifactError,
+    archive_run,
+    archive_runs,
+    artifact_exists,
+    check_compression,
+    gc_objects,
+    read_artifact,
+    write_artifact,
+)
+from orch.config import OrchSettings
+from orch.engine import run_streaming
+from orch.runner import resume_run, run_feature
+from orch.shards import ShardResult, merge_outputs
+
+
+def test_compressed_writes_read_back_transparently(tmp_path: Path) -> None:
+    path = tmp_path / "verify" / "pytest.txt"
+    write_artifact(path, "tiny")
+    assert path.read_text() == "tiny"
+
+    written = write_artifact(path, "x" * 10_000, compression="gzip", min_bytes=100)
+    assert written.name == "pytest.txt.gz"
+    assert not path.exists()  # no stale plain copy left behind
+    assert written.stat().st_size < 1000
+    assert read_artifact(path) == b"x" * 10_000
+    assert artifact_exists(path)
+    assert not artifact_exists(tmp_path / "verify" / "missing.txt")
+
+
+def test_zstd_needs_its_package() -> None:
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        with pytest.raises(ArtifactError, match="zstandard"):
+            check_compression("zstd")
+    else:
+        check_compression("zstd")
+
+
+def test_archive_packs_a_run_and_keeps_paths(tmp_path: Path, monkeypatch) -> None:
+    run_dir = tmp_path / "F-001-a"
+    (run_dir / "ledger.jsonl").parent.mkdir(parents=True)
+    (run_dir / "ledger.jsonl").write_text(json.dumps({"step": "RUN", "outcome": "ok"}) + "\n")
+    write_artifact(run_dir / "plan" / "plan.md", "# Plan\n")
+    write_artifact(run_dir / "verify" / "pytest.txt", "ok " * 5000, compression="gzip")
+
+    stats = archive_run(run_dir)
+    assert stats.files == 2
+    assert sorted(p.name for p in run_dir.iterdir()) == ["artifacts.zip", "ledger.jsonl"]
+    assert read_artifact(run_dir / "plan" / "plan.md") == b"# Plan\n"
+    assert artifact_exists(run_dir / "verify" / "pytest.txt")
+
+    # Files written after archiving are added by the next archive_run.
+    write_artifact(run_dir / "review" / "review.md", "LGTM")
+    archive_run(run_dir)
+    assert read_artifact(run_dir / "plan" / "plan.md") == b"# Plan\n"
+    assert read_artifact(run_dir / "review" / "review.md") == b"LGTM"
+
+    monkeypatch.setattr(report_ui, "RUNS_DIR", tmp_path)
+    client = TestClient(report_ui.app)
+    r = client.get("/runs/F-001-a/artifact/verify/pytest.txt")
+    assert r.status_code == 200
+    assert r.text == "ok " * 5000
+    assert client.get("/runs/F-001-a/artifact/verify/nope.txt").status_code == 404
+
+
+def test_archive_runs_only_takes_finished_idle_runs(tmp_path: Path) -> None:
+    for name, last in (("done", "RUN"), ("live", "PLAN"), ("recent", "RUN")):
+        run_dir = tmp_path / name
+        run_dir.mkdir()
+        (run_dir / "ledger.jsonl").write_text(json.dumps({"step": last}) + "\n")
+        write_artifact(run_dir / "out.txt", "x")
+        if name != "recent":
+            old = time.time() - 3 * 86400
+            os.utime(run_dir / "ledger.jsonl", (old, old))
+
+    assert set(archive_runs(tmp_path, older_than_s=86400)) == {"done"}
+
+
+def test_run_with_compression_and_resume_after_archive(repo_copy: Path) -> None:
+    settings = OrchSettings()
+    settings.repo_root = repo_copy
+    settings.artifact_compression = "gzip"
+    settings.artifact_compress_min_bytes = 0
+
+    run_dir = run_feature("F-001", settings)
+    assert (run_dir / "ledger.jsonl").exists()
+    assert (run_dir / "plan" / "plan.md.gz").exists()
+    assert b"Plan" in read_artifact(run_dir / "plan" / "plan.md")
+
+    archive_run(run_dir)
+    # Every node's artifacts are still found, so nothing has to run again.
+    resume_run(run_dir.name, settings)
+    records = [json.loads(line) for line in (run_dir / "ledger.jsonl").read_text().splitlines()]
+    resume = next(r for r in records if r["step"] == "RESUME")
+    assert "plan" in resume["reused"] and "publish" in resume["reused"]
+
+
+def test_identical_artifacts_share_one_object(tmp_path: Path) -> None:
+    store = tmp_path / ".objects"
+    a = write_artifact(tmp_path / "r1" / "plan.md", "# Plan\n", store=store)
+    b = write_artifact(tmp_path / "r2" / "plan.md", "# Plan\n", store=store)
+    c = write_artifact(tmp_path / "r3" / "plan.md", "# Other\n", store=store)
+    assert a.stat().st_ino == b.stat().st_ino != c.stat().st_ino
+    assert a.stat().st_nlink == 3  # two runs plus the store entry
+    assert len(list(store.glob("??/*"))) == 2
+
+    # Equal content compresses to equal bytes, so compressed artifacts are shared too.
+    x = write_artifact(tmp_path / "r1" / "log.txt", "y" * 5000, compression="gzip", store=store)
+    y = write_artifact(tmp_path / "r2" / "log.txt", "y" * 5000, compression="gzip", store=store)
+    assert x.stat().st_ino == y.stat().st_ino
+
+    # Rewriting one run's copy leaves the other run's untouched.
+    write_artifact(tmp_path / "r1" / "plan.md", "# Changed\n", store=store)
+    assert b.read_text() == "# Plan\n"
+
+
+def test_gc_removes_objects_no_run_links(tmp_path: Path) -> None:
+    store = tmp_path / ".objects"
+    write_artifact(tmp_path / "r1" / "plan.md", "keep", store=store)
+    write_artifact(tmp_path / "r2" / "plan.md", "drop me", store=store)
+    (tmp_path / "r2" / "plan.md").unlink()
+
+    stats = gc_objects(store)
+    assert (stats.removed, stats.bytes_freed, stats.kept) == (1, len("drop me"), 1)
+    assert (tmp_path / "r1" / "plan.md").read_text() == "keep"
+    assert gc_objects(store).removed == 0
+
+    # An object collected while unreferenced is simply stored again on the next write.
+    write_artifact(tmp_path / "r3" / "plan.md", "drop me", store=store)
+    assert (tmp_path / "r3" / "plan.md").stat().st_nlink == 2
+
+
+def test_runs_of_the_same_feature_share_artifacts(repo_copy: Path) -> None:
+    settings = OrchSettings()
+    settings.repo_root = repo_copy
+    settings.artifact_dedupe = True
+
+    first = run_feature("F-001", settings)
+    second = run_feature("F-001", settings)
+    feature = [r / "intake" / "feature.md" for r in (first, second)]
+    assert feature[0].stat().st_ino == feature[1].stat().st_ino
+
+    # Archiving drops the first run's links; only objects no other run links go.
+    archive_run(first)
+    gc_objects(repo_copy / settings.objects_dir)
+    assert feature[1].stat().st_nlink == 2
+    assert read_artifact(feature[0]) == feature[1].read_bytes()
+
+
+def test_rewriting_a_shared_artifact_leaves_other_runs_intact(tmp_path: Path) -> None:
+    store = tmp_path / ".objects"
+    mine, theirs = (tmp_path / r / "verify" / "pytest.txt" for r in ("r1", "r2"))
+    for path in (mine, theirs):
+        write_artifact(path, "1 passed\n", store=store)
+    assert mine.stat().st_ino == theirs.stat().st_ino
+
+    # Every way orch writes run artifacts: a streamed log, merged shard logs, a rerun.
+    asyncio.run(run_streaming("echo streamed", cwd=tmp_path, stdout_path=mine))
+    assert mine.read_text() == "streamed\n"
+    shard = tmp_path / "shard-1.txt"
+    shard.write_text("2 failed\n")
+    merge_outputs([ShardResult(1, 2, 1, 0.5, shard)], mine)
+    assert "2 failed" in mine.read_text()
+    write_artifact(mine, "3 passed\n", store=store)
+
+    assert theirs.read_text() == "1 passed\n"
+    assert theirs.stat().st_nlink == 2
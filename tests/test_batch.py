@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from orch.batch import discover_features, run_many
+from orch.config import OrchSettings
+from orch.ledger import read_ledger
+from orch.runner import _new_run_id
+
+
+def test_new_run_id_does_not_collide() -> None:
+    ids = {_new_run_id("F-001") for _ in range(200)}
+    assert len(ids) == 200
+
+
+def test_discover_features_lists_feature_dirs() -> None:
+    settings = OrchSettings()
+    assert discover_features(settings) == ["F-001", "F-002", "F-003"]
+
+
+def test_run_many_runs_each_feature_in_its_own_folder(repo_copy: Path) -> None:
+    repo_root = repo_copy
+    settings = OrchSettings()
+    settings.repo_root = repo_root
+
+    batch = run_many(["F-002", "F-003", "F-404"], settings, max_workers=2)
+
+    assert [r.feature_id for r in batch.results] == ["F-002", "F-003", "F-404"]
+    ok, ok2, missing = batch.results
+    assert ok.ok and ok2.ok
+    assert ok.run_dir != ok2.run_dir
+    assert (ok.run_dir / "ledger.jsonl").exists()
+    assert not missing.ok and "FileNotFoundError" in (missing.error or "")
+    assert not batch.ok
+    # Concurrent runs never share a working tree.
+    for r in (ok, ok2):
+        assert any(rec["step"] == "WORKSPACE" for rec in read_ledger(r.run_dir / "ledger.jsonl"))
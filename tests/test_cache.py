@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import time
+from pathlib import Path
+
+from orch.cache import CachedResponse, ToolCache, repo_tree_hash
+from orch.config import OrchSettings
+from orch.ledger import read_ledger
+from orch.runner import run_feature
+
+
+def test_get_put_and_counters(tmp_path: Path) -> None:
+    cache = ToolCache(root=tmp_path)
+    key = cache.key("codex", "plan this", "tree-1")
+    assert key != cache.key("codex", "plan this", "tree-2")
+
+    assert cache.get(key) is None
+    cache.put(key, CachedResponse(0, "# Plan", ""))
+    assert cache.get(key) == CachedResponse(0, "# Plan", "")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_tree_hash_ignores_the_runs_directory(tmp_path: Path) -> None:
+    (tmp_path / "app.py").write_text("x = 1\n")
+    for cmd in (
+        ["git", "init", "-q"],
+        ["git", "add", "-A"],
+        ["git", "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init"],
+    ):
+        subprocess.run(cmd, cwd=tmp_path, check=True)
+
+    before = repo_tree_hash(tmp_path, exclude=("runs",))
+    assert before is not None
+    (tmp_path / "runs" / ".cache").mkdir(parents=True)
+    (tmp_path / "runs" / ".cache" / "entry.json").write_text("{}")
+    assert repo_tree_hash(tmp_path, exclude=("runs",)) == before
+    assert repo_tree_hash(tmp_path) != before
+
+    (tmp_path / "notes.md").write_text("untracked\n")
+    assert repo_tree_hash(tmp_path, exclude=("runs",)) != before
+
+
+def test_evicts_expired_then_least_recently_used(tmp_path: Path) -> None:
+    cache = ToolCache(root=tmp_path, max_bytes=None, max_age_s=3600)
+    keys = [cache.key("codex", str(i)) for i in range(3)]
+    for k in keys:
+        cache.put(k, CachedResponse(0, "x" * 100, ""))
+
+    old = time.time() - 7200
+    os.utime(cache._path(keys[0]), (old, old))
+    assert cache.evict() == 1
+    assert cache.get(keys[0]) is None
+
+    cache.max_bytes = cache._path(keys[1]).stat().st_size
+    os.utime(cache._path(keys[1]), (time.time() - 60, time.time() - 60))
+    assert cache.evict() == 1
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
+
+
+def test_reads_do_not_extend_an_entrys_age(tmp_path: Path) -> None:
+    cache = ToolCache(root=tmp_path, max_age_s=3600)
+    old, new = cache.key("codex", "old"), cache.key("codex", "new")
+    cache.put(old, CachedResponse(0, "x", ""))
+    cache.put(new, CachedResponse(0, "y", ""))
+    written = time.time() - 3000
+    os.utime(cache._path(old), (written, written))
+
+    assert cache.get(old) is not None  # read, but still written 50 minutes ago
+    assert cache._path(old).stat().st_mtime == written
+
+    # The read counts for LRU: the other entry goes first.
+    cache.max_bytes = cache._path(old).stat().st_size
+    os.utime(cache._path(new), (written, time.time()))
+    assert cache.evict() == 1
+    assert cache.get(old) is not None and cache.get(new) is None
+
+    os.utime(cache._path(old), (time.time(), time.time() - 4000))
+    assert cache.get(old) is None
+
+
+def test_plan_is_served_from_cache_on_rerun(repo_copy: Path) -> None:
+    settings = OrchSettings()
+    settings.repo_root = repo_copy
+    settings.cache_enabled = True
+    settings.cache_steps = ("PLAN", "EXECUTE")
+
+    first = read_ledger(run_feature("F-002", settings) / "ledger.jsonl")
+    second_dir = run_feature("F-002", settings)
+    second = read_ledger(second_dir / "ledger.jsonl")
+
+    def by_step(records, step):
+        return next(r for r in records if r.get("step") == step and "returncode" in r)
+
+    assert by_step(first, "PLAN")["cache"] == "miss"
+    assert by_step(second, "PLAN")["cache"] == "hit"
+    assert "cache" not in by_step(second, "EXECUTE")  # never cached, even if listed
+    assert (second_dir / "plan" / "plan.md").read_text(encoding="utf-8").startswith("# Plan")
+    assert next(r for r in second if r.get("step") == "CACHE")["hits"] == 1
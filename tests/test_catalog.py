@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from demo_project import report_ui
+from orch.catalog import Catalog
+from orch.config import OrchSettings
+from orch.runner import _make_context, run_feature
+
+
+def _append(path: Path, *records: dict, newline: bool = True) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(r) + ("\n" if newline else "") for r in records))
+
+
+def test_catalog_indexes_appends_incrementally(tmp_path: Path) -> None:
+    runs = tmp_path / "runs"
+    ledger = runs / "F-001-a" / "ledger.jsonl"
+    _append(
+        ledger,
+        {"ts": "t1", "step": "INTAKE", "feature_id": "F-001"},
+        {"ts": "t2", "step": "VERIFY", "ok": False, "stdout_path": str(runs / "F-001-a/v.txt")},
+        {"ts": "t3", "step": "CODEX_STATUS", "label": "PLAN", "delta": {"total_tokens": 7}},
+    )
+    catalog = Catalog(runs / ".catalog.sqlite", runs)
+    assert catalog.update("F-001-a") == 3
+    assert catalog.update("F-001-a") == 0
+
+    # A torn last line is left for the next update.
+    _append(ledger, {"ts": "t4", "step": "VERIFY", "ok": True}, newline=False)
+    assert catalog.update("F-001-a") == 0
+    _append(ledger, {"ts": "t5", "step": "RUN", "outcome": "ok"}, newline=False)
+    ledger.open("a").write("\n")
+    # The torn line and the one glued to it are one unparseable line: skipped.
+    assert catalog.update("F-001-a") == 0
+
+    _append(ledger, {"ts": "t6", "step": "GATE", "ok": True})
+    assert catalog.update("F-001-a") == 1
+
+    (run,) = catalog.runs()
+    assert run["feature_id"] == "F-001"
+    assert (run["started_ts"], run["ended_ts"]) == ("t1", "t6")
+    assert (run["verify_ok"], run["gate_ok"]) == (0, 1)
+    assert catalog.usage("F-001-a")[0]["total_tokens"] == 7
+    assert catalog.artifacts("F-001-a") == [{"label": "stdout_path", "rel": "v.txt"}]
+
+
+def test_catalog_rebuild_and_sync_follow_the_files(tmp_path: Path) -> None:
+    runs = tmp_path / "runs"
+    _append(runs / "a" / "ledger.jsonl", {"step": "RUN", "outcome": "ok"})
+    _append(runs / "b" / "ledger.jsonl", {"step": "RUN", "outcome": "failed"})
+    catalog = Catalog(runs / ".catalog.sqlite", runs)
+    assert catalog.sync() == 2
+
+    # A rewritten (shorter) ledger is re-indexed; a deleted run disappears.
+    (runs / "a" / "ledger.jsonl").write_text("")
+    _append(runs / "a" / "ledger.jsonl", {"step": "INTAKE", "feature_id": "F-9"})
+    (runs / "b" / "ledger.jsonl").unlink()
+    catalog.sync()
+    (run,) = catalog.runs()
+    assert (run["run_id"], run["feature_id"], run["outcome"]) == ("a", "F-9", None)
+
+    assert catalog.rebuild() == 1
+
+
+def test_runs_index_reads_the_catalog(tmp_path: Path, monkeypatch) -> None:
+    _append(tmp_path / "F-001-x" / "ledger.jsonl", {"step": "INTAKE", "feature_id": "F-001"})
+    monkeypatch.setattr(report_ui, "RUNS_DIR", tmp_path)
+    monkeypatch.setattr(report_ui, "CATALOG_PATH", tmp_path / ".catalog.sqlite")
+    client = TestClient(report_ui.app)
+
+    assert "F-001-x" in client.get("/runs").text
+
+    # Not indexed yet: the listing never touches ledgers itself.
+    _append(tmp_path / "F-002-y" / "ledger.jsonl", {"step": "INTAKE", "feature_id": "F-002"})
+    assert "F-002-y" not in client.get("/runs").text
+    Catalog(tmp_path / ".catalog.sqlite", tmp_path).update("F-002-y")
+    assert "F-002-y" in client.get("/runs").text
+
+
+def test_run_detail_reads_usage_and_artifacts_from_the_catalog(
+    tmp_path: Path, monkeypatch
+) -> None:
+    run_dir = tmp_path / "F-001-x"
+    _append(
+        run_dir / "ledger.jsonl",
+        {"step": "INTAKE", "feature_id": "F-001"},
+        {
+            "step": "CODEX_STATUS",
+            "label": "post-plan",
+            "parsed": {"model": "gpt-x", "elapsed_s": 1.5, "total_tokens": 40},
+            "delta": {"total_tokens": 12},
+        },
+        {"step": "PLAN", "stdout_path": str(run_dir / "plan/plan.md")},
+    )
+    monkeypatch.setattr(report_ui, "RUNS_DIR", tmp_path)
+    # A catalog_path setting outside the runs dir.
+    monkeypatch.setattr(report_ui, "CATALOG_PATH", tmp_path.parent / f"{tmp_path.name}.sqlite")
+    page = TestClient(report_ui.app).get("/runs/F-001-x").text
+
+    assert "gpt-x" in page and "<td>12</td>" in page
+    assert "/runs/F-001-x/artifact/plan/plan.md" in page
+    assert report_ui.CATALOG_PATH.exists()
+    assert not (tmp_path / ".catalog.sqlite").exists()
+
+
+def test_catalog_failures_do_not_fail_the_run(tmp_path: Path) -> None:
+    settings = OrchSettings()
+    settings.repo_root = tmp_path
+    ctx = _make_context(settings, "F-001", "F-001-x")
+    assert ctx.catalog is not None
+    ctx.catalog.close()  # every update now raises sqlite3.ProgrammingError
+    printed: list[str] = []
+    ctx.console.print = printed.append  # type: ignore[method-assign]
+
+    ctx.ledger.append({"step": "INTAKE"})
+    ctx.ledger.append({"step": "RUN", "outcome": "ok"})
+    ctx.ledger.close()
+
+    assert ctx.catalog_errors == 2
+    assert len(printed) == 1 and "orch index sync" in printed[0]
+
+
+def test_runner_keeps_the_catalog_current(repo_copy: Path) -> None:
+    settings = OrchSettings()
+    settings.repo_root = repo_copy
+
+    run_dir = run_feature("F-001", settings)
+
+    catalog = Catalog(repo_copy / "runs" / ".catalog.sqlite", repo_copy / "runs")
+    try:
+        (row,) = catalog.runs()
+    finally:
+        catalog.close()
+    assert (row["run_id"], row["feature_id"], row["outcome"]) == (run_dir.name, "F-001", "ok")
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+from orch.config import OrchSettings
+from orch.convergence import ConvergenceTracker, Fingerprint, failure_signatures
+from orch.ledger import read_ledger
+from orch.runner import _make_context, _step_fixloop
+
+OUTPUT = """\
+FAILED tests/test_lib.py::test_f - AssertionError: assert 0 == 1 at 0x7f3a2c
+FAILED tests/test_lib.py::test_g - FileNotFoundError: /tmp/pytest-12/x.txt
+2 failed in 0.12s
+"""
+
+
+def test_failure_signatures_ignore_volatile_details() -> None:
+    sigs = failure_signatures(OUTPUT)
+    assert set(sigs) == {"tests/test_lib.py::test_f", "tests/test_lib.py::test_g"}
+    again = OUTPUT.replace("0x7f3a2c", "0x1234").replace("pytest-12", "pytest-13")
+    assert failure_signatures(again) == sigs
+
+
+def test_failure_signatures_keep_asserted_values() -> None:
+    before = "FAILED tests/test_lib.py::test_f - assert 2 == 1 (took 0.31s at 10:00:01)\n"
+    after = "FAILED tests/test_lib.py::test_f - assert 3 == 1 (took 0.27s at 10:00:09)\n"
+    assert failure_signatures(before) != failure_signatures(after)
+    assert failure_signatures(before) == failure_signatures(after.replace("3 ==", "2 =="))
+
+
+def test_tracker_classifies_iterations() -> None:
+    tracker = ConvergenceTracker(stall_limit=2)
+    one_failure = "FAILED tests/test_lib.py::test_f - AssertionError\n"
+
+    assert tracker.observe(Fingerprint.of(OUTPUT, "d0")) == "baseline"
+    assert tracker.observe(Fingerprint.of(one_failure, "d1")) == "improved"
+    assert tracker.observe(Fingerprint.of(one_failure, "d2")) == "same-failures"
+    assert tracker.escalate and not tracker.stop
+    assert tracker.observe(Fingerprint.of(one_failure, "d1")) == "same-diff"
+    assert tracker.stop
+
+
+def test_fix_loop_stops_when_fixes_change_nothing(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    (root / "tests").mkdir(parents=True)
+    (root / "tests" / "test_lib.py").write_text("def test_f():\n    assert 0 == 1\n")
+
+    settings = OrchSettings()
+    settings.repo_root = root
+    settings.claude_cmd = f"{sys.executable} -c pass"  # a "fix" that edits nothing
+    settings.verify_command = f"{sys.executable} -m pytest -q -p no:cacheprovider tests"
+    settings.max_fix_iterations = 5
+
+    ctx = _make_context(settings, "F-X", "F-X-run")
+    (ctx.run_dir / "verify").mkdir(parents=True)
+    (ctx.run_dir / "verify" / "pytest.txt").write_text(
+        "FAILED tests/test_lib.py::test_f - assert 0 == 1\n"
+    )
+
+    with pytest.raises(RuntimeError, match="no progress"):
+        _step_fixloop(ctx)
+
+    records = [r for r in read_ledger(ctx.ledger.path) if r["step"] in ("FIX", "FIXLOOP")]
+    assert sum(r["step"] == "FIX" for r in records) == 2
+    assert [r.get("strategy") for r in records if "strategy" in r] == ["default", "escalated"]
+    assert records[-1]["stopped"] == "no-progress"
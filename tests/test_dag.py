@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from orch.dag import DagError, StepNode, dependencies, run_dag
+from orch.engine import run_streaming
+from orch.ledger import Ledger
+from orch.runner import pipeline
+
+
+def test_pipeline_graph_is_valid() -> None:
+    deps = dependencies(pipeline())
+    assert deps["plan"] == {"intake"}
+    assert deps["publish"] == {"gate"}
+
+
+def test_independent_nodes_run_concurrently(tmp_path: Path) -> None:
+    barrier = threading.Barrier(2, timeout=5)
+    order: list[str] = []
+
+    def side(name: str):
+        def fn(_ctx) -> str:
+            barrier.wait()  # deadlocks (BrokenBarrierError) unless both run at once
+            order.append(name)
+            return name
+
+        return fn
+
+    nodes = [
+        StepNode("a", side("a"), outputs=("a",)),
+        StepNode("b", side("b"), outputs=("b",)),
+        StepNode("c", lambda _ctx: order.append("c"), inputs=("a", "b")),
+    ]
+    ledger = Ledger(tmp_path / "ledger.jsonl")
+    results: dict = {}
+    run_dag(nodes, None, results=results, ledger=ledger)
+
+    assert order[-1] == "c"
+    assert results["a"] == "a"
+    records = [json.loads(line) for line in ledger.path.read_text().splitlines()]
+    assert sorted(r["node"] for r in records) == ["a", "b", "c"]
+    assert all(r["status"] == "done" for r in records)
+
+
+def test_failure_stops_dependents(tmp_path: Path) -> None:
+    ran: list[str] = []
+
+    def boom(_ctx) -> None:
+        raise RuntimeError("boom")
+
+    nodes = [
+        StepNode("a", boom, outputs=("a",)),
+        StepNode("b", lambda _ctx: ran.append("b"), inputs=("a",)),
+    ]
+    with pytest.raises(RuntimeError, match="boom"):
+        run_dag(nodes, None, results={}, ledger=Ledger(tmp_path / "ledger.jsonl"))
+    assert ran == []
+
+
+def test_cycle_rejected() -> None:
+    nodes = [
+        StepNode("a", lambda _ctx: None, inputs=("b",), outputs=("a",)),
+        StepNode("b", lambda _ctx: None, inputs=("a",), outputs=("b",)),
+    ]
+    with pytest.raises(DagError, match="cycle"):
+        dependencies(nodes)
+
+
+def test_interrupt_kills_running_children(tmp_path: Path) -> None:
+    # Children run in their own session, so a terminal Ctrl-C only reaches orch itself.
+    cancel = threading.Event()
+
+    def slow(_ctx) -> int:
+        res = asyncio.run(run_streaming("sleep 30", cwd=tmp_path))
+        return res.returncode
+
+    threading.Timer(0.5, os.kill, (os.getpid(), signal.SIGINT)).start()
+    started = time.monotonic()
+    with pytest.raises(KeyboardInterrupt):
+        run_dag([StepNode("slow", slow)], None, results={}, cancel=cancel)
+    assert time.monotonic() - started < 5
+    assert cancel.is_set()
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from orch.config import OrchSettings
+from orch.dag import StepNode, run_dag
+from orch.deadline import Cancelled, DeadlineExceeded
+from orch.ledger import Ledger, read_ledger
+from orch.runner import run_feature
+
+HANG = f"{sys.executable} -c 'import time; time.sleep(60)'"
+
+
+def _records(repo_root: Path) -> list[dict]:
+    (ledger,) = (repo_root / "runs").glob("*/ledger.jsonl")
+    return read_ledger(ledger)
+
+
+def test_step_timeout_kills_tool_and_records_timeout(repo_copy: Path) -> None:
+    settings = OrchSettings()
+    settings.repo_root = repo_copy
+    settings.claude_cmd = HANG
+    settings.step_timeouts_s = {"execute": 0.5}
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded, match="execute"):
+        run_feature("F-002", settings)
+    assert time.monotonic() - started < 30
+
+    records = _records(repo_copy)
+    nodes = {r["node"]: r["status"] for r in records if r.get("step") == "NODE"}
+    assert nodes["plan"] == "done"
+    assert nodes["execute"] == "timeout"
+    assert nodes["publish"] == "cancelled"
+    assert records[-1]["step"] == "RUN" and records[-1]["outcome"] == "timeout"
+
+
+def test_run_deadline_bounds_every_step(repo_copy: Path) -> None:
+    settings = OrchSettings()
+    settings.repo_root = repo_copy
+    settings.claude_cmd = HANG
+    settings.run_timeout_s = 1.0
+
+    with pytest.raises(DeadlineExceeded, match="run"):
+        run_feature("F-002", settings)
+    assert _records(repo_copy)[-1]["outcome"] == "timeout"
+
+
+def test_cancel_stops_scheduling(tmp_path: Path) -> None:
+    cancel = threading.Event()
+    ran: list[str] = []
+
+    def first(_ctx) -> None:
+        ran.append("a")
+        cancel.set()
+
+    nodes = [
+        StepNode("a", first, outputs=("x",)),
+        StepNode("b", lambda _ctx: ran.append("b"), inputs=("x",)),
+    ]
+    ledger = Ledger(tmp_path / "ledger.jsonl")
+    with pytest.raises(Cancelled):
+        run_dag(nodes, None, results={}, ledger=ledger, cancel=cancel)
+
+    assert ran == ["a"]
+    last = read_ledger(tmp_path / "ledger.jsonl")[-1]
+    assert (last["node"], last["status"]) == ("b", "cancelled")
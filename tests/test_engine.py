@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from orch.config import OrchSettings
+from orch.engine import run_streaming
+from orch.ledger import read_ledger
+from orch.runner import run_feature
+from orch.tools import run_tool_async
+
+
+def test_streams_to_disk_and_keeps_bounded_tail(tmp_path: Path) -> None:
+    out = tmp_path / "out" / "log.txt"
+    cmd = f"{sys.executable} -c \"import sys; sys.stdout.write('x' * 200000); sys.stderr.write('err')\""
+
+    res = asyncio.run(
+        run_streaming(cmd, cwd=tmp_path, stdout_path=out, stderr_path=out, tail_bytes=1000)
+    )
+
+    assert res.returncode == 0
+    assert out.stat().st_size == 200003
+    assert len(res.stdout) == 1000
+    assert res.stderr == "err"
+    assert res.truncated
+
+
+def test_tool_invocations_run_concurrently(tmp_path: Path) -> None:
+    cmd = f"{sys.executable} -c \"import time, sys; time.sleep(0.5); print(sys.argv[1])\""
+
+    async def main() -> list[str]:
+        results = await asyncio.gather(
+            *(run_tool_async(cmd, prompt=f"p{i}", cwd=tmp_path) for i in range(4))
+        )
+        return [r.stdout.strip() for r in results]
+
+    started = time.monotonic()
+    assert asyncio.run(main()) == ["p0", "p1", "p2", "p3"]
+    assert time.monotonic() - started < 1.5
+
+
+def test_timeout_kills_child(tmp_path: Path) -> None:
+    # No `exec`: the shell's own child must be killed too.
+    cmd = f"{sys.executable} -c \"import time; time.sleep(30)\""
+    started = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        asyncio.run(run_streaming(cmd, cwd=tmp_path, timeout_s=0.3))
+    assert time.monotonic() - started < 5
+
+
+def test_reports_child_resources(tmp_path: Path) -> None:
+    # Through the shell: the figures must include its (grand)children.
+    script = "b = bytearray(64 * 1024 * 1024); open('f', 'wb').write(b); sum(range(10**6))"
+    cmd = f'{sys.executable} -c "{script}"'
+
+    res = asyncio.run(run_streaming(cmd, cwd=tmp_path))
+
+    assert res.returncode == 0
+    r = res.resources
+    assert r is not None
+    assert r["max_rss_kb"] > 60 * 1024
+    assert r["user_s"] + r["sys_s"] > 0
+    assert r["wall_s"] >= r["user_s"] / 4
+    assert set(r) == {"wall_s", "user_s", "sys_s", "max_rss_kb", "in_blocks", "out_blocks"}
+
+
+def test_run_records_resources_of_tools_and_tests(repo_copy: Path) -> None:
+    settings = OrchSettings()
+    settings.repo_root = repo_copy
+
+    records = read_ledger(run_feature("F-001", settings) / "ledger.jsonl")
+
+    plan = next(r for r in records if r.get("step") == "PLAN")
+    verify = next(r for r in records if r.get("step") == "VERIFY")
+    assert plan["resources"]["max_rss_kb"] > 0
+    assert verify["resources"]["wall_s"] > 0
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+from orch.config import OrchSettings
+from orch.impact import ImpactMap, affected_tests, build_impact_map, changed_files, snapshot_tree
+
+GLOBS = ("tests/test_*.py",)
+
+
+def test_snapshot_diff_sees_added_and_modified_files(tmp_path: Path) -> None:
+    (tmp_path / "a.py").write_text("a = 1\n")
+    (tmp_path / "__pycache__").mkdir()
+    (tmp_path / "__pycache__" / "a.pyc").write_text("x")
+    before = snapshot_tree(tmp_path)
+    assert list(before) == ["a.py"]
+
+    (tmp_path / "a.py").write_text("a = 22\n")
+    (tmp_path / "b.py").write_text("b = 1\n")
+    assert changed_files(before, snapshot_tree(tmp_path)) == {"a.py", "b.py"}
+
+
+def test_affected_tests_selects_by_coverage() -> None:
+    impact = ImpactMap(
+        tests={
+            "tests/test_app.py": ["demo_project/app.py"],
+            "tests/test_greeter.py": ["demo_project/greeter.py"],
+        }
+    )
+
+    assert affected_tests(impact, {"demo_project/app.py"}, test_globs=GLOBS) == ["tests/test_app.py"]
+    assert affected_tests(
+        impact, {"tests/test_new.py", "README.md"}, test_globs=GLOBS, ignore_globs=("*.md",)
+    ) == ["tests/test_new.py"]
+    assert affected_tests(impact, set(), test_globs=GLOBS) == []
+    # Unknown file: the map cannot tell what depends on it.
+    assert affected_tests(impact, {"demo_project/other.py"}, test_globs=GLOBS) is None
+
+
+def test_build_impact_map(tmp_path: Path) -> None:
+    pytest.importorskip("coverage")
+    (tmp_path / "lib.py").write_text("def f():\n    return 1\n")
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_lib.py").write_text(
+        "import lib\n\n\ndef test_f():\n    assert lib.f() == 1\n"
+    )
+    (tmp_path / "tests" / "test_other.py").write_text("def test_x():\n    assert True\n")
+
+    settings = OrchSettings()
+    settings.repo_root = tmp_path
+    settings.pytest_command = f"{sys.executable} -m pytest -q"
+    impact = build_impact_map(settings)
+
+    assert impact.tests["tests/test_lib.py"] == ["lib.py"]
+    assert impact.tests["tests/test_other.py"] == []
+    assert ImpactMap.load(tmp_path / settings.impact_map_path) == impact
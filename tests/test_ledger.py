@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from orch.config import OrchSettings
+from orch.ledger import Ledger, LedgerView, lock_run, read_ledger, run_is_live
+from orch.runner import _make_context, _step_gate
+from orch.types import Step
+
+
+def _append_many(path: str, tag: str, n: int) -> None:
+    ledger = Ledger(Path(path))
+    for i in range(n):
+        ledger.append({"step": "X", "tag": tag, "i": i, "pad": "x" * 5000})
+    ledger.close()
+
+
+def test_concurrent_appends_are_whole_lines_with_unique_seq(tmp_path: Path) -> None:
+    path = tmp_path / "ledger.jsonl"
+    threads = [
+        threading.Thread(target=_append_many, args=(str(path), f"t{k}", 50)) for k in range(4)
+    ]
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_append_many, args=(str(path), f"p{k}", 50)) for k in range(2)]
+    for w in [*threads, *procs]:
+        w.start()
+    for w in [*threads, *procs]:
+        w.join()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    records = [json.loads(line) for line in lines]
+    assert len(records) == 300
+    assert [r["seq"] for r in records] == list(range(1, 301))
+
+
+def test_batched_appends_are_written_on_flush(tmp_path: Path) -> None:
+    path = tmp_path / "ledger.jsonl"
+    ledger = Ledger(path, flush_interval_s=60)
+    ledger.append({"step": "A"})
+    ledger.append({"step": "B"})
+    assert read_ledger(path) == []
+
+    ledger.flush()
+    assert [(r["seq"], r["step"]) for r in read_ledger(path)] == [(1, "A"), (2, "B")]
+
+    ledger.append({"step": "C"})
+    ledger.close()
+    assert [r["seq"] for r in read_ledger(path)] == [1, 2, 3]
+
+
+def test_on_write_runs_after_the_lock_is_released(tmp_path: Path) -> None:
+    ledger = Ledger(tmp_path / "ledger.jsonl")
+    seen: list[int] = []
+
+    def on_write() -> None:
+        # A slow hook would otherwise block every other writer: append from a
+        # second thread while it runs.
+        other = threading.Thread(target=ledger.append, args=({"step": "B"},))
+        if not seen:
+            seen.append(1)
+            other.start()
+            other.join(timeout=5)
+            assert not other.is_alive()
+        seen.append(2)
+
+    ledger.on_write = on_write
+    ledger.append({"step": "A"})
+    ledger.close()
+    assert [r["step"] for r in read_ledger(ledger.path)] == ["A", "B"]
+    assert len(seen) == 3
+
+
+def test_seq_continues_after_reopen_and_legacy_lines(tmp_path: Path) -> None:
+    path = tmp_path / "ledger.jsonl"
+    path.write_text('{"step": "INTAKE"}\n{"step": "PLAN"}\n', encoding="utf-8")
+
+    Ledger(path).append({"step": "RESUME"})
+    Ledger(path).append({"step": "RUN"})
+
+    assert [r.get("seq") for r in read_ledger(path)] == [None, None, 3, 4]
+
+
+def test_batched_appends_are_written_after_the_interval(tmp_path: Path) -> None:
+    path = tmp_path / "ledger.jsonl"
+    ledger = Ledger(path, flush_interval_s=0.05)
+    ledger.append({"step": "A"})
+    deadline = time.monotonic() + 5
+    while not read_ledger(path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [r["step"] for r in read_ledger(path)] == ["A"]
+    ledger.close()
+
+
+def test_view_indexes_appends_and_reloads_from_disk(tmp_path: Path) -> None:
+    path = tmp_path / "ledger.jsonl"
+    ledger = Ledger(path, flush_interval_s=60)
+    ledger.append({"step": Step.VERIFY, "ok": False})
+    ledger.append({"step": "FIX", "tool": "claude", "iteration": 1})
+    ledger.append({"step": "VERIFY", "ok": True})
+
+    # Queryable before anything reached the file.
+    assert ledger.view.latest("VERIFY")["ok"] is True
+    assert [r["ok"] for r in ledger.view.by_step(Step.VERIFY)] == [False, True]
+    assert [r["step"] for r in ledger.view.by_tool("claude")] == ["FIX"]
+    assert ledger.view.latest("GATE") is None
+
+    ledger.close()
+    view = LedgerView.load(path)
+    assert len(view) == 3
+    assert view.latest(Step.VERIFY)["seq"] == 3
+
+
+def test_gate_uses_latest_verify_result(tmp_path: Path) -> None:
+    settings = OrchSettings()
+    settings.repo_root = tmp_path
+    ctx = _make_context(settings, "F-X", "F-X-run")
+    # An unrelated "ok": true used to satisfy the gate's substring check.
+    ctx.ledger.append({"step": "CACHE", "ok": True})
+    ctx.ledger.append({"step": "VERIFY", "ok": True})
+    ctx.ledger.append({"step": "VERIFY", "after_fix_iteration": 1, "ok": False})
+
+    with pytest.raises(RuntimeError):
+        _step_gate(ctx)
+    assert ctx.view.latest("GATE")["ok"] is False
+
+
+def test_run_lock_is_held_until_released(tmp_path: Path) -> None:
+    run_dir = tmp_path / "F-001-a"
+    assert not run_is_live(run_dir)
+    fd = lock_run(run_dir)
+    assert run_is_live(run_dir)
+    assert run_is_live(run_dir)  # checking does not take the lock away
+    os.close(fd)
+    assert not run_is_live(run_dir)
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from demo_project import report_ui
+from orch.ledger import lock_run
+from orch.metrics import MetricsCollector
+
+
+def _append(path: Path, *records: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        for rec in records:
+            f.write(json.dumps(rec) + "\n")
+
+
+def _value(text: str, series: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{series} not in metrics")
+
+
+def test_metrics_aggregate_incrementally(tmp_path: Path) -> None:
+    a = tmp_path / "F-001-a" / "ledger.jsonl"
+    b = tmp_path / "F-002-b" / "ledger.jsonl"
+    _append(
+        a,
+        {"step": "NODE", "node": "plan", "status": "done", "elapsed_s": 0.3},
+        {"step": "CODEX_STATUS", "label": "PLAN", "delta": {"total_tokens": 120, "cost_usd": 0.5}},
+        {"step": "VERIFY", "ok": False},
+        {"step": "FIXLOOP", "iteration": 1, "strategy": "default"},
+        {"step": "FIXLOOP", "iteration": 2, "strategy": "escalated"},
+        {"step": "VERIFY", "after_fix_iteration": 2, "ok": True},
+        {"step": "RUN", "outcome": "ok", "elapsed_s": 3.0},
+    )
+    _append(b, {"step": "INTAKE", "feature_id": "F-002"})
+    lock = lock_run(b.parent)
+    # Crashed: no RUN record, and nothing holds its lock any more.
+    _append(tmp_path / "F-003-c" / "ledger.jsonl", {"step": "INTAKE", "feature_id": "F-003"})
+    os.close(lock_run(tmp_path / "F-003-c"))
+
+    collector = MetricsCollector(tmp_path)
+    text = collector.render()
+    assert _value(text, "orch_runs_in_flight") == 1
+    assert _value(text, 'orch_runs_total{outcome="ok"}') == 1
+    assert _value(text, 'orch_verify_total{result="pass"}') == 1
+    assert _value(text, 'orch_verify_total{result="fail"}') == 1
+    assert _value(text, 'orch_step_duration_seconds_bucket{node="plan",le="0.5"}') == 1
+    assert _value(text, 'orch_fix_iterations_bucket{le="2"}') == 1
+    assert _value(text, 'orch_codex_tokens_total{kind="total"}') == 120
+    assert _value(text, "orch_codex_cost_usd_total") == 0.5
+
+    # Only the new bytes are read; a half-written line waits for its newline.
+    with b.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"step": "NODE", "node": "plan", "status": "done", "elapsed_s": 2}))
+    text = collector.render()
+    assert _value(text, 'orch_steps_total{node="plan",status="done"}') == 1
+    with b.open("a", encoding="utf-8") as f:
+        f.write("\n" + json.dumps({"step": "RUN", "outcome": "failed"}) + "\n")
+    text = collector.render()
+    assert _value(text, 'orch_steps_total{node="plan",status="done"}') == 2
+    assert _value(text, "orch_runs_in_flight") == 0
+    os.close(lock)
+    assert _value(text, 'orch_runs_total{outcome="failed"}') == 1
+
+
+def test_metrics_endpoint(tmp_path: Path, monkeypatch) -> None:
+    _append(tmp_path / "r1" / "ledger.jsonl", {"step": "RUN", "outcome": "ok"})
+    monkeypatch.setattr(report_ui, "RUNS_DIR", tmp_path)
+
+    r = TestClient(report_ui.app).get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert 'orch_runs_total{outcome="ok"} 1' in r.text
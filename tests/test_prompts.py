@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from orch.config import OrchSettings
+from orch.ledger import read_ledger
+from orch.prompts import PromptBuilder, estimate_tokens, trim_text
+from orch.runner import run_feature
+
+PARA = "The greeter must print a friendly message for every name it is given."
+
+
+def test_unbounded_prompt_is_unchanged() -> None:
+    prompt, stats = PromptBuilder("Do it.").add("PLAN", "step one").build()
+    assert prompt == "Do it.\n\nPLAN:\nstep one"
+    assert stats.trimmed_tokens == stats.deduped_tokens == 0
+
+
+def test_dedupes_paragraphs_already_in_an_earlier_section() -> None:
+    builder = PromptBuilder("Do it.")
+    builder.add("PLAN", f"# Plan\n\n{PARA}")
+    builder.add("FEATURE", f"# Plan\n\n{PARA}\n\nExtra.")
+    prompt, stats = builder.build()
+    assert prompt.count(PARA) == 1
+    assert "FEATURE:\n# Plan\n\nExtra." in prompt  # short structural lines are kept
+    assert stats.deduped_tokens == estimate_tokens(PARA)
+
+
+def test_repeats_across_prompts_are_measured_not_dropped() -> None:
+    sent: set[str] = set()
+    PromptBuilder("Plan it.", sent=sent).add(None, PARA).build()
+    prompt, stats = PromptBuilder("Review it.", sent=sent).add("PLAN", f"{PARA}\n\nNew.").build()
+
+    # The tool has not seen the first prompt, so the paragraph is sent again.
+    assert PARA in prompt
+    assert stats.repeated_tokens == estimate_tokens(PARA)
+    assert stats.deduped_tokens == 0
+
+
+def test_budget_keeps_small_sections_whole_and_trims_large_ones() -> None:
+    small = "short section"
+    large = "\n".join(f"line {i} " + "x" * 60 for i in range(200))
+    builder = PromptBuilder("Do it.", budget_tokens=500).add("A", small).add("B", large)
+    prompt, stats = builder.build()
+
+    assert small in prompt
+    assert "tokens trimmed" in prompt
+    assert "line 0 " in prompt and "line 199 " in prompt  # head and tail survive
+    assert stats.tokens <= 500 + 5
+    assert stats.trimmed_tokens > 0
+
+
+def test_trim_collapses_code_blocks_first() -> None:
+    text = "Intro.\n\n```python\n" + "x = 1\n" * 200 + "```\n\nOutro."
+    out = trim_text(text, 20)
+    assert out.startswith("Intro.") and out.endswith("Outro.")
+    assert "code block trimmed" in out
+
+
+def test_step_records_include_prompt_size(repo_copy: Path) -> None:
+    settings = OrchSettings()
+    settings.repo_root = repo_copy
+    settings.prompt_budgets = {"EXECUTE": 50}
+    run_dir = run_feature("F-002", settings)
+
+    records = {r["step"]: r for r in read_ledger(run_dir / "ledger.jsonl") if "prompt" in r}
+    assert records["PLAN"]["prompt"]["budget"] is None
+    assert records["EXECUTE"]["prompt"]["budget"] == 50
+    assert records["EXECUTE"]["prompt"]["trimmed_tokens"] > 0
+    # EXECUTE is Claude's first prompt of the run.
+    assert records["EXECUTE"]["prompt"]["repeated_tokens"] == 0
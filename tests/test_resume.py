@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from orch.config import OrchSettings
+from orch.ledger import lock_run, read_ledger
+from orch.runner import resume_run, run_feature
+
+
+def test_resume_skips_completed_steps(repo_copy: Path) -> None:
+    repo_root = repo_copy
+    settings = OrchSettings()
+    settings.repo_root = repo_root
+    run_dir = run_feature("F-002", settings)
+
+    # Simulate a crash right after EXECUTE: drop every ledger record after it.
+    ledger_path = run_dir / "ledger.jsonl"
+    lines = ledger_path.read_text(encoding="utf-8").splitlines()
+    cut = next(
+        i
+        for i, line in enumerate(lines)
+        if json.loads(line).get("node") == "execute" and json.loads(line).get("status") == "done"
+    )
+    ledger_path.write_text("\n".join(lines[: cut + 1]) + "\n", encoding="utf-8")
+    plan_mtime = (run_dir / "plan" / "plan.md").stat().st_mtime_ns
+
+    # Resumed nodes must not call the EXECUTE tool again.
+    settings.claude_cmd = "false"
+    assert resume_run(run_dir.name, settings) == run_dir
+
+    records = read_ledger(ledger_path)
+    resume_at = next(i for i, r in enumerate(records) if r.get("step") == "RESUME")
+    assert {"intake", "plan", "execute"} <= set(records[resume_at]["reused"])
+    rerun = {r["node"] for r in records[resume_at:] if r.get("step") == "NODE"}
+    assert "plan" not in rerun and "execute" not in rerun
+    assert {"verify", "review", "gate", "publish"} <= rerun
+    assert (run_dir / "plan" / "plan.md").stat().st_mtime_ns == plan_mtime
+
+
+def test_resume_refuses_a_live_run(tmp_path: Path) -> None:
+    settings = OrchSettings(repo_root=tmp_path)
+    run_dir = tmp_path / settings.runs_dir / "F-002-run"
+    run_dir.mkdir(parents=True)
+    ledger_path = run_dir / "ledger.jsonl"
+    ledger_path.write_text(json.dumps({"step": "INTAKE", "feature_id": "F-002"}) + "\n")
+
+    fd = lock_run(run_dir)  # another process is still executing the run
+    try:
+        with pytest.raises(RuntimeError, match="still running"):
+            resume_run("F-002-run", settings)
+    finally:
+        os.close(fd)
+    assert [r["step"] for r in read_ledger(ledger_path)] == ["INTAKE"]
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from orch.config import OrchSettings
+from orch.jobqueue import JobQueue
+from orch.ledger import read_ledger
+from orch.serve import Daemon, ServeError, request
+
+
+def test_queue_orders_by_priority_and_survives_restart(tmp_path: Path) -> None:
+    q = JobQueue(tmp_path)
+    low = q.submit("F-001")
+    high = q.submit("F-002", priority=5)
+    also_low = q.submit("F-003")
+
+    first = q.claim()
+    assert first is not None and first.job_id == high.job_id
+    q.update(first, run_id="F-002-run")
+
+    # A new daemon sees the same queue; the interrupted job is requeued with its run id.
+    q2 = JobQueue(tmp_path)
+    (stale,) = q2.recover()
+    assert (stale.job_id, stale.run_id) == (high.job_id, "F-002-run")
+    claimed = [q2.claim(), q2.claim(), q2.claim(), q2.claim()]
+    assert [j.job_id if j else None for j in claimed] == [
+        high.job_id,
+        low.job_id,
+        also_low.job_id,
+        None,
+    ]
+
+
+def test_daemon_runs_submitted_jobs(repo_copy: Path) -> None:
+    settings = OrchSettings()
+    settings.repo_root = repo_copy
+    daemon = Daemon(settings, slots=2)
+    thread = threading.Thread(target=daemon.serve_forever)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 10
+        while not daemon.socket_path.exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        for fid in ("F-001", "F-002"):
+            request(daemon.socket_path, {"op": "submit", "feature_id": fid})
+
+        deadline = time.monotonic() + 120
+        while time.monotonic() < deadline:
+            jobs = request(daemon.socket_path, {"op": "list"})["jobs"]
+            if all(j["state"] in ("done", "failed") for j in jobs):
+                break
+            time.sleep(0.2)
+    finally:
+        daemon.stop()
+        thread.join(timeout=60)
+
+    assert [j["state"] for j in jobs] == ["done", "done"], jobs
+    for j in jobs:
+        records = read_ledger(repo_copy / "runs" / j["run_id"] / "ledger.jsonl")
+        assert records[-1]["step"] == "RUN" and records[-1]["outcome"] == "ok"
+    assert not daemon.socket_path.exists()
+
+
+def test_second_daemon_on_the_same_queue_is_refused(tmp_path: Path) -> None:
+    settings = OrchSettings(repo_root=tmp_path)
+    first = Daemon(settings, slots=1)
+    thread = threading.Thread(target=first.serve_forever)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 10
+        while not first.socket_path.exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        with pytest.raises(ServeError, match="already running"):
+            Daemon(settings, slots=1).serve_forever()
+        assert request(first.socket_path, {"op": "ping"})["ok"]
+    finally:
+        first.stop()
+        thread.join(timeout=60)
+
+    # Once the first daemon is gone, the next one may start.
+    second = Daemon(settings, slots=1)
+    second.stop()
+    second.serve_forever()
+
+
+def test_daemon_isolates_concurrent_slots(tmp_path: Path) -> None:
+    assert Daemon(OrchSettings(repo_root=tmp_path), slots=2).settings.isolation == "auto"
+    serial = Daemon(OrchSettings(repo_root=tmp_path, isolation="none"), slots=2)
+    assert (serial.settings.isolation, serial.slots) == ("none", 1)
+
+
+def test_stop_interrupts_running_jobs(repo_copy: Path) -> None:
+    settings = OrchSettings()
+    settings.repo_root = repo_copy
+    settings.claude_cmd = f"{sys.executable} -c 'import time; time.sleep(60)'"
+    daemon = Daemon(settings, slots=1)
+    thread = threading.Thread(target=daemon.serve_forever)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 10
+        while not daemon.socket_path.exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        request(daemon.socket_path, {"op": "submit", "feature_id": "F-001"})
+
+        # Wait until the run is stuck in the slow tool.
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            (job,) = request(daemon.socket_path, {"op": "list"})["jobs"]
+            run_dir = repo_copy / "runs" / str(job["run_id"])
+            if (run_dir / "execute").is_dir():
+                break
+            time.sleep(0.2)
+        time.sleep(1.0)
+    finally:
+        stopped = time.monotonic()
+        daemon.stop()
+        thread.join(timeout=60)
+
+    assert time.monotonic() - stopped < 20
+    assert not thread.is_alive()
+    records = read_ledger(run_dir / "ledger.jsonl")
+    assert records[-1]["step"] == "RUN" and records[-1]["outcome"] == "failed"
+
+    # The next daemon picks the interrupted job up again.
+    (stale,) = JobQueue(repo_copy / settings.queue_dir).recover()
+    assert (stale.job_id, stale.run_id) == (job["job_id"], job["run_id"])
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+from pathlib import Path
+
+from orch.allowlist import CommandAllowlist
+from orch.config import OrchSettings
+from orch.shards import (
+    collect_tests,
+    historical_durations,
+    merge_outputs,
+    parse_durations,
+    plan_shards,
+    run_shards,
+    shard_command,
+)
+
+
+def test_plan_shards_balances_by_duration() -> None:
+    durations = {"a": 10.0, "b": 6.0, "c": 4.0, "d": 1.0}
+    shards = plan_shards(["a", "b", "c", "d", "e"], durations, 2)
+
+    # "e" has no history and counts as the median (5.0): best split is 14 / 12.
+    assert sorted(sum(durations.get(t, 5.0) for t in s) for s in shards) == [12.0, 14.0]
+    assert sorted(t for s in shards for t in s) == ["a", "b", "c", "d", "e"]
+    assert plan_shards(["a"], {}, 4) == [["a"]]
+
+
+def test_parse_durations_sums_phases() -> None:
+    text = (
+        "===== slowest durations =====\n"
+        "0.50s call     tests/test_x.py::test_a\n"
+        "0.01s setup    tests/test_x.py::test_a\n"
+        "0.20s call     tests/test_x.py::test_b[x y]\n"
+    )
+    assert parse_durations(text) == {
+        "tests/test_x.py::test_a": 0.51,
+        "tests/test_x.py::test_b[x y]": 0.2,
+    }
+
+
+def test_historical_durations_prefers_latest_run(tmp_path: Path) -> None:
+    for name, value in (("old", 1.0), ("new", 2.0)):
+        d = tmp_path / name
+        d.mkdir()
+        (d / "ledger.jsonl").write_text(
+            json.dumps({"step": "VERIFY", "test_durations": {"t::x": value}}) + "\n"
+        )
+    os.utime(tmp_path / "old" / "ledger.jsonl", (1, 1))
+    assert historical_durations(tmp_path, limit=5) == {"t::x": 2.0}
+
+
+def test_shards_run_concurrently_and_merge(tmp_path: Path) -> None:
+    (tmp_path / "tests").mkdir()
+    for i in range(4):
+        (tmp_path / "tests" / f"test_s{i}.py").write_text(
+            "import time\n\n\ndef test_sleep():\n    time.sleep(0.3)\n"
+        )
+
+    settings = OrchSettings()
+    allowlist = CommandAllowlist.from_regexes(settings.allowlist_regex)
+    pytest_cmd = f"{sys.executable} -m pytest -q -p no:cacheprovider"
+
+    tests = collect_tests(f"{pytest_cmd} tests", cwd=tmp_path, allowlist=allowlist)
+    assert len(tests) == 4
+
+    out = tmp_path / "verify" / "pytest.txt"
+    results = run_shards(
+        plan_shards(tests, {}, 2),
+        pytest_command=pytest_cmd,
+        cwd=tmp_path,
+        allowlist=allowlist,
+        out_path=out,
+    )
+    assert [r.tests for r in results] == [2, 2]
+    assert all(r.returncode == 0 for r in results)
+
+    durations = merge_outputs(results, out)
+    assert set(durations) == set(tests)
+    assert all(d >= 0.3 for d in durations.values())
+    assert out.read_text().count("===== shard") == 2
+
+
+def test_shard_command_keeps_the_options_of_the_verify_command() -> None:
+    tests = ["tests/test_a.py::test_one", "tests/unit/test_b.py::test_two"]
+    cmd = "python -m pytest -q -x -p no:cacheprovider --timeout=60 tests ./tests/test_a.py"
+    assert shard_command(cmd, tests) == "python -m pytest -q -x -p no:cacheprovider --timeout=60"
+    assert shard_command("pytest . -k 'not slow'", tests) == "pytest -k 'not slow'"
+    assert shard_command("pytest tests/unit/test_b.py::test_two", tests) == "pytest"
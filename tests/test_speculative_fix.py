@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from orch import runner
+from orch.config import OrchSettings
+from orch.ledger import read_ledger
+from orch.limits import Lease, ResourcePool
+from orch.runner import _lease_async, _make_context, _snapshot, _step_fixloop_speculative
+
+FIXER = '''
+import re, sys, time
+from pathlib import Path
+
+prompt = sys.argv[1]
+if "Candidate 1 of" in prompt:
+    time.sleep(30)  # slow candidate; must be cancelled once candidate 2 passes
+Path("lib.py").write_text("def f():\\n    return 1\\n")
+'''
+
+
+def _git_repo(root: Path) -> None:
+    (root / "tests").mkdir(parents=True)
+    (root / "lib.py").write_text("def f():\n    return 0\n")
+    (root / "fixer.py").write_text(FIXER)
+    (root / "tests" / "test_lib.py").write_text("import lib\n\n\ndef test_f():\n    assert lib.f() == 1\n")
+    for cmd in (
+        ["git", "init", "-q"],
+        ["git", "add", "-A"],
+        ["git", "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init"],
+    ):
+        subprocess.run(cmd, cwd=root, check=True)
+
+
+def test_first_passing_candidate_wins_and_others_are_cancelled(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    _git_repo(root)
+
+    settings = OrchSettings()
+    settings.repo_root = root
+    settings.claude_cmd = f"{sys.executable} fixer.py"
+    settings.verify_command = f"{sys.executable} -m pytest -q -p no:cacheprovider tests/test_lib.py"
+    settings.fix_speculation = 2
+
+    ctx = _make_context(settings, "F-X", "F-X-run")
+    (ctx.run_dir / "verify").mkdir(parents=True)
+    (ctx.run_dir / "verify" / "pytest.txt").write_text("FAILED tests/test_lib.py::test_f\n")
+
+    started = time.monotonic()
+    _step_fixloop_speculative(ctx)
+    assert time.monotonic() - started < 20
+
+    assert (root / "lib.py").read_text() == "def f():\n    return 1\n"
+    fixes = {r["candidate"]: r["outcome"] for r in read_ledger(ctx.ledger.path) if r["step"] == "FIX"}
+    assert fixes == {1: "cancelled", 2: "won"}
+    worktrees = subprocess.run(
+        ["git", "worktree", "list"], cwd=root, capture_output=True, text=True
+    ).stdout
+    assert len(worktrees.splitlines()) == 1
+
+
+def test_candidates_honour_impact_verify_mode(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    _git_repo(root)
+    # Unrelated to lib.py and failing: only a full verify run would see it.
+    (root / "tests" / "test_other.py").write_text("def test_other():\n    assert False\n")
+
+    settings = OrchSettings()
+    settings.repo_root = root
+    settings.claude_cmd = f"{sys.executable} fixer.py"
+    settings.pytest_command = f"{sys.executable} -m pytest -q -p no:cacheprovider"
+    settings.verify_command = f"{settings.pytest_command} tests"
+    settings.verify_mode = "impact"
+    settings.fix_speculation = 2
+    settings.max_fix_iterations = 1
+    (root / settings.impact_map_path).parent.mkdir(parents=True)
+    (root / settings.impact_map_path).write_text(
+        json.dumps({"tests": {"tests/test_lib.py": ["lib.py"], "tests/test_other.py": []}})
+    )
+
+    ctx = _make_context(settings, "F-X", "F-X-run")
+    (ctx.run_dir / "intake").mkdir(parents=True)
+    (ctx.run_dir / "intake" / "tree.json").write_text(json.dumps(_snapshot(ctx)))
+    (ctx.run_dir / "verify").mkdir()
+    (ctx.run_dir / "verify" / "pytest.txt").write_text("FAILED tests/test_lib.py::test_f\n")
+
+    _step_fixloop_speculative(ctx)
+
+    verify = [r for r in read_ledger(ctx.ledger.path) if r["step"] == "VERIFY"][-1]
+    assert verify["ok"] and verify["scope"] == "impact"
+    assert verify["selected_tests"] == ["tests/test_lib.py"]
+
+
+PARTIAL_FIXER = '''
+import sys, time
+from pathlib import Path
+
+log, prompt = Path(sys.argv[1]), sys.argv[2]
+(log / f"{time.time_ns()}.txt").write_text(prompt)
+Path("lib.py").write_text("def f():\\n    return 2\\n")  # still wrong
+'''
+
+
+def test_failed_round_feeds_the_next_one(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    _git_repo(root)
+    (root / "fixer.py").write_text(PARTIAL_FIXER)
+    prompts = tmp_path / "prompts"
+    prompts.mkdir()
+
+    settings = OrchSettings()
+    settings.repo_root = root
+    settings.claude_cmd = f"{sys.executable} fixer.py {prompts}"
+    settings.verify_command = f"{sys.executable} -m pytest -q -p no:cacheprovider tests/test_lib.py"
+    settings.fix_speculation = 2
+    settings.max_fix_iterations = 2
+
+    ctx = _make_context(settings, "F-X", "F-X-run")
+    (ctx.run_dir / "verify").mkdir(parents=True)
+    (ctx.run_dir / "verify" / "pytest.txt").write_text("FAILED tests/test_lib.py::test_f\n")
+
+    with pytest.raises(RuntimeError, match="exhausted"):
+        _step_fixloop_speculative(ctx)
+
+    texts = [p.read_text() for p in sorted(prompts.iterdir())]
+    first, second = [t for t in texts if "Candidate 1 of" in t]
+    assert first != second
+    assert "assert 2 == 1" in second
+    assert (root / "lib.py").read_text() == "def f():\n    return 2\n"  # best candidate kept
+    progress = [r for r in read_ledger(ctx.ledger.path) if "progress" in r]
+    assert [r["progress"] for r in progress] == ["changed", "same-diff"]
+
+
+def test_lease_taken_after_cancellation_is_released(tmp_path: Path, monkeypatch) -> None:
+    settings = OrchSettings()
+    settings.repo_root = tmp_path
+    settings.resource_dir = tmp_path / "limits"
+    settings.resource_limits = {"verify": 1}
+    ctx = _make_context(settings, "F-X", "F-X-run")
+    pool = ResourcePool("verify", settings.resource_dir, limit=1)
+
+    # Keep every lease referenced, so only an explicit release frees its slot.
+    leases: list[Lease] = []
+    lease_fn = runner._lease
+
+    def _lease(ctx, name):
+        leases.append(lease_fn(ctx, name))
+        return leases[-1]
+
+    monkeypatch.setattr(runner, "_lease", _lease)
+    held = pool.acquire()
+
+    async def main() -> None:
+        task = asyncio.create_task(_lease_async(ctx, "verify"))
+        await asyncio.sleep(0.2)  # its thread is now waiting for the slot
+        task.cancel()
+        held.release()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())  # waits for the thread, which got the slot after the cancel
+
+    assert len(leases) == 1
+    pool.acquire(timeout_s=1).release()
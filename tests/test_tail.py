@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from orch.artifacts import write_artifact
+from orch.cli import app
+from orch.ledger import lock_run
+from orch.tail import Tailer, TailEvent, format_record, runs_in_flight
+
+
+def _append(run_dir: Path, **record: object) -> None:
+    with (run_dir / "ledger.jsonl").open("a") as f:
+        f.write(json.dumps({"ts": "2026-01-01T10:00:00+00:00", **record}) + "\n")
+
+
+def _drain(tailer: Tailer, until: int, timeout_s: float = 5.0) -> list[TailEvent]:
+    out: list[TailEvent] = []
+    deadline = time.monotonic() + timeout_s
+    while len(out) < until and time.monotonic() < deadline:
+        out += tailer.events(timeout_s=0.2)
+    return out
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_follows_records_and_streamed_output(tmp_path: Path, use_inotify: bool) -> None:
+    run_dir = tmp_path / "F-001-a"
+    lock = lock_run(run_dir)
+    for i in range(3):
+        _append(run_dir, step="NODE", node=f"n{i}", status="done")
+    write_artifact(run_dir / "intake" / "feature.md", "already there")
+
+    with Tailer([run_dir], backlog=2, poll_interval_s=0.05, use_inotify=use_inotify) as tailer:
+        assert [e.record["node"] for e in tailer.events()] == ["n1", "n2"]  # type: ignore[index]
+
+        # A test run streaming into a new subdirectory, plus an artifact written whole.
+        (run_dir / "verify").mkdir()
+        with (run_dir / "verify" / "pytest.txt").open("wb") as out:
+            out.write(b"collected 2 items\n")
+            out.flush()
+            text = "".join(e.text for e in _drain(tailer, 1))
+            assert text == "collected 2 items\n"
+            out.write(b"2 passed\n")
+        write_artifact(run_dir / "plan" / "plan.md", "# Plan\n", store=tmp_path / ".objects")
+        _append(run_dir, step="VERIFY", ok=True)
+
+        events = _drain(tailer, 2)
+        assert [(e.path, e.text) for e in events if e.record is None] == [
+            ("verify/pytest.txt", "2 passed\n")
+        ]
+        assert [e.record for e in events if e.record is not None][0]["step"] == "VERIFY"
+
+        _append(run_dir, step="RUN", outcome="ok")
+        assert [e.record["step"] for e in _drain(tailer, 1)] == ["RUN"]  # type: ignore[index]
+        assert tailer.done
+    os.close(lock)
+
+
+def test_follow_stops_when_the_run_finishes(tmp_path: Path) -> None:
+    run_dir = tmp_path / "F-001-a"
+    lock = lock_run(run_dir)
+    _append(run_dir, step="INTAKE")
+
+    def finish() -> None:
+        time.sleep(0.2)
+        _append(run_dir, step="RUN", outcome="ok")
+        os.close(lock)
+
+    threading.Thread(target=finish).start()
+    with Tailer([run_dir], poll_interval_s=0.05) as tailer:
+        steps = [e.record["step"] for e in tailer.follow() if e.record is not None]
+    assert steps == ["INTAKE", "RUN"]
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_follow_stops_when_the_run_crashes(tmp_path: Path, use_inotify: bool) -> None:
+    run_dir = tmp_path / "F-001-a"
+    lock = lock_run(run_dir)
+    _append(run_dir, step="INTAKE")
+
+    def crash() -> None:
+        time.sleep(0.2)
+        _append(run_dir, step="PLAN")
+        os.close(lock)  # the process dies without writing its RUN record
+
+    threading.Thread(target=crash).start()
+    with Tailer([run_dir], poll_interval_s=0.05, use_inotify=use_inotify) as tailer:
+        records = [e.record for e in tailer.follow() if e.record is not None]
+    assert [r["step"] for r in records] == ["INTAKE", "PLAN", "CRASHED"]
+
+
+def test_cli_follows_every_run_in_flight(tmp_path: Path, monkeypatch) -> None:
+    runs = tmp_path / "runs"
+    locks = []
+    for name, last in (
+        ("F-001-a", "RUN"),
+        ("F-001-b", "PLAN"),
+        ("F-002-c", "VERIFY"),
+        ("F-003-d", "PLAN"),  # crashed: nothing holds its lock
+    ):
+        (runs / name).mkdir(parents=True)
+        _append(runs / name, step=last)
+        locks.append(lock_run(runs / name))
+    os.close(locks.pop())
+    assert [p.name for p in runs_in_flight(runs)] == ["F-001-b", "F-002-c"]
+
+    def finish() -> None:
+        time.sleep(0.3)
+        for name in ("F-001-b", "F-002-c"):
+            _append(runs / name, step="RUN", outcome="ok")
+
+    monkeypatch.setenv("ORCH_REPO_ROOT", str(tmp_path))
+    threading.Thread(target=finish).start()
+    result = CliRunner().invoke(app, ["tail", "--poll"])
+    for fd in locks:
+        os.close(fd)
+    assert result.exit_code == 0, result.output
+    assert "F-001-b" in result.output and "F-002-c" in result.output
+    assert "F-001-a" not in result.output and "F-003-d" not in result.output
+    assert result.output.count("RUN") == 2
+
+
+def test_format_record_keeps_it_to_one_line() -> None:
+    line = format_record(
+        {
+            "ts": "2026-01-01T10:00:00+00:00",
+            "seq": 4,
+            "step": "PLAN",
+            "tool": "codex",
+            "prompt": "x" * 500,
+            "stdout_path": "/repo/runs/F-001-a/plan/plan.md",
+            "resources": {"wall_s": 1.0},
+        },
+        run_dir=Path("/repo/runs/F-001-a"),
+    )
+    assert line.startswith("10:00:00 PLAN")
+    assert "tool=codex" in line and "stdout_path=plan/plan.md" in line
+    assert "prompt" not in line and "resources" not in line
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import threading
+from pathlib import Path
+
+from orch.config import OrchSettings
+from orch.runner import run_feature
+from orch.tools import run_tool_async
+from orch.trace import Tracer, span, tracing
+
+
+def _events(path: Path) -> list[dict]:
+    return json.loads(path.read_text(encoding="utf-8"))["traceEvents"]
+
+
+def test_span_is_a_noop_without_tracer() -> None:
+    with span("x") as sp:
+        sp.set(a=1)
+    assert span("y") is span("z")
+
+
+def test_spans_nest_and_split_tracks_per_thread_and_task(tmp_path: Path) -> None:
+    tracer = Tracer("run r1")
+    cmd = f'{sys.executable} -c "print(1)"'
+
+    async def tools() -> None:
+        await asyncio.gather(*(run_tool_async(cmd, prompt="p", cwd=tmp_path) for _ in range(2)))
+
+    def worker() -> None:
+        with tracing(tracer), span("other"):
+            pass
+
+    with tracing(tracer), span("step") as sp:
+        sp.set(n=1)
+        asyncio.run(tools())
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+
+    path = tmp_path / "trace.json"
+    tracer.write(path)
+    events = [e for e in _events(path) if e["ph"] == "X"]
+    by_name = {e["name"]: e for e in events}
+
+    step = by_name["step"]
+    assert step["args"] == {"n": 1}
+    subs = [e for e in events if e["cat"] == "subprocess"]
+    assert len(subs) == 2
+    end = step["ts"] + step["dur"]
+    assert all(step["ts"] <= s["ts"] and s["ts"] + s["dur"] <= end for s in subs)
+    assert subs[0]["args"]["returncode"] == 0 and "max_rss_kb" in subs[0]["args"]
+    # Concurrent subprocesses and the other thread each get their own track.
+    tids = {s["tid"] for s in subs} | {by_name["other"]["tid"], step["tid"]}
+    assert len(tids) == 4
+
+
+def test_write_keeps_earlier_attempts(tmp_path: Path) -> None:
+    path = tmp_path / "trace.json"
+    for name in ("run r1", "resume r1"):
+        tracer = Tracer(name)
+        with tracing(tracer), span("plan"):
+            pass
+        tracer.write(path)
+
+    names = {e["pid"]: e["args"]["name"] for e in _events(path) if e["name"] == "process_name"}
+    assert names == {1: "run r1", 2: "resume r1"}
+
+
+def test_run_writes_a_trace(repo_copy: Path) -> None:
+    settings = OrchSettings()
+    settings.repo_root = repo_copy
+
+    run_dir = run_feature("F-001", settings)
+
+    events = json.loads((run_dir / "trace.json").read_text())["traceEvents"]
+    assert {"run", "step", "tool", "subprocess", "io"} <= {e.get("cat") for e in events}
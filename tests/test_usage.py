@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+from orch.codex_status import CodexStatus
+from orch.config import OrchSettings
+from orch.ledger import read_ledger
+from orch.runner import run_feature
+from orch.usage import UsageSampler, usage_delta
+
+
+def _status(total: int) -> CodexStatus:
+    return CodexStatus(
+        raw="",
+        model="m",
+        input_tokens=total - 10,
+        output_tokens=10,
+        total_tokens=total,
+        cost_usd=total * 0.001,
+        elapsed_s=None,
+    )
+
+
+def test_usage_delta() -> None:
+    delta = usage_delta(_status(100), _status(250))
+    assert delta["total_tokens"] == 150
+    assert delta["input_tokens"] == 150
+    assert delta["output_tokens"] == 0
+    assert delta["cost_usd"] == 0.15
+
+
+def test_sampler_coalesces_probes_between_steps() -> None:
+    totals = iter([100, 250, 400])
+    records: list[dict] = []
+    lock = threading.Lock()
+
+    def emit(rec: dict) -> None:
+        with lock:
+            records.append(rec)
+
+    sampler = UsageSampler(lambda: _status(next(totals)), emit)
+    sampler.sample()
+    with sampler.measure("PLAN"):
+        pass
+    with sampler.measure("REVIEW"):
+        pass
+    sampler.close()
+
+    # Two measured steps cost three probes: the post-PLAN probe is REVIEW's baseline.
+    assert sampler.probes == 3
+    by_label = {r["label"]: r for r in records}
+    assert by_label["PLAN"]["delta"]["total_tokens"] == 150
+    assert by_label["REVIEW"]["delta"]["total_tokens"] == 150
+    assert by_label["REVIEW"]["parsed"]["total_tokens"] == 400
+
+
+def test_failed_baseline_probe_records_an_error() -> None:
+    results: list[int | None] = [None, 250, 400]
+    records: list[dict] = []
+
+    def probe() -> CodexStatus:
+        total = results.pop(0)
+        if total is None:
+            raise RuntimeError("codex is down")
+        return _status(total)
+
+    sampler = UsageSampler(probe, records.append)
+    sampler.sample()
+    ran = False
+    with sampler.measure("PLAN"):
+        ran = True
+    with sampler.measure("REVIEW"):
+        pass
+    sampler.close()
+
+    assert ran
+    by_label = {r["label"]: r for r in records}
+    assert by_label["PLAN"] == {
+        "step": "CODEX_STATUS",
+        "label": "PLAN",
+        "error": "baseline probe failed: codex is down",
+    }
+    # The post-PLAN probe worked, so REVIEW is measured as usual.
+    assert by_label["REVIEW"]["delta"]["total_tokens"] == 150
+
+
+def test_run_records_one_usage_record_per_codex_step(repo_copy: Path) -> None:
+    settings = OrchSettings()
+    settings.repo_root = repo_copy
+    run_dir = run_feature("F-002", settings)
+
+    usage = [r for r in read_ledger(run_dir / "ledger.jsonl") if r.get("step") == "CODEX_STATUS"]
+    assert sorted(r["label"] for r in usage) == ["PLAN", "REVIEW"]
+    assert all(isinstance(r["delta"], dict) for r in usage)
+    assert not (run_dir / "usage").exists()
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import os
+import signal
+import sys
+from pathlib import Path
+
+from orch.config import OrchSettings
+from orch.ledger import read_ledger
+from orch.runner import run_feature
+from orch.workers import ToolWorkerPool
+
+CODEX = f"{sys.executable} tools/fake_codex.py"
+
+
+def test_worker_is_reused_then_recycled() -> None:
+    pool = ToolWorkerPool(size=1, max_requests=2)
+    try:
+        r1, pid1 = pool.run(CODEX, prompt="/status", cwd=Path.cwd())
+        r2, pid2 = pool.run(CODEX, prompt="x (plan) F-002", cwd=Path.cwd())
+        _, pid3 = pool.run(CODEX, prompt="/status", cwd=Path.cwd())
+    finally:
+        pool.close()
+
+    assert r1.returncode == 0 and "Total tokens:" in r1.stdout
+    assert r2.stdout.startswith("# Plan")
+    assert pid1 == pid2  # warm
+    assert pid3 != pid1  # recycled after max_requests
+    assert (pool.started, pool.recycled) == (2, 1)
+
+
+def test_dead_worker_fails_health_check_and_is_replaced() -> None:
+    pool = ToolWorkerPool(size=1)
+    try:
+        _, pid1 = pool.run(CODEX, prompt="/status", cwd=Path.cwd())
+        os.killpg(pid1, signal.SIGKILL)
+        res, pid2 = pool.run(CODEX, prompt="/status", cwd=Path.cwd())
+    finally:
+        pool.close()
+
+    assert pid2 != pid1
+    assert res.returncode == 0
+
+
+def test_one_worker_serves_every_cwd(tmp_path: Path) -> None:
+    pool = ToolWorkerPool(size=1)
+    try:
+        _, pid1 = pool.run(CODEX, prompt="/status", cwd=Path.cwd())
+        res, pid2 = pool.run(CODEX, prompt="/status", cwd=tmp_path)
+    finally:
+        pool.close()
+
+    assert pid1 == pid2 and pool.started == 1
+    assert res.resources is not None
+    assert {"wall_s", "user_s", "sys_s", "max_rss_kb"} <= set(res.resources)
+
+
+def test_run_uses_warm_workers(repo_copy: Path) -> None:
+    settings = OrchSettings()
+    settings.repo_root = repo_copy
+    settings.tool_workers = True
+
+    records = read_ledger(run_feature("F-001", settings) / "ledger.jsonl")
+
+    pids = {r["step"]: r["worker_pid"] for r in records if "worker_pid" in r}
+    assert {"PLAN", "EXECUTE", "REVIEW"} <= set(pids)
+    assert all(r["resources"]["wall_s"] >= 0 for r in records if "worker_pid" in r)
+    assert (repo_copy / "demo_project" / "app.py").read_text().count("/ping") == 1
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from orch.config import OrchSettings, parallel_settings
+from orch.ledger import read_ledger
+from orch.runner import run_feature
+from orch.workspace import close_workspace, open_workspace, snapshot_commit, workspace_patch
+
+
+def _git_repo(root: Path) -> None:
+    root.mkdir(parents=True)
+    (root / "lib.py").write_text("x = 0\n")
+    for cmd in (
+        ["git", "init", "-q"],
+        ["git", "add", "-A"],
+        ["git", "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init"],
+    ):
+        subprocess.run(cmd, cwd=root, check=True)
+
+
+@pytest.mark.parametrize("mode", ["worktree", "copy"])
+def test_workspace_is_private_and_yields_a_patch(tmp_path: Path, mode: str) -> None:
+    root = tmp_path / "repo"
+    _git_repo(root)
+    (root / "lib.py").write_text("x = 1\n")  # uncommitted changes come along
+    (root / "runs").mkdir()
+    (root / "runs" / "big.log").write_text("ignored\n")
+
+    ws = open_workspace(root, tmp_path / "ws", mode=mode, exclude=("runs",))
+    assert ws.mode == mode
+    assert (ws.root / "lib.py").read_text() == "x = 1\n"
+    assert not (ws.root / "runs").exists()
+
+    (ws.root / "lib.py").write_text("x = 2\n")
+    assert (root / "lib.py").read_text() == "x = 1\n"
+
+    patch = workspace_patch(ws, root, exclude=("runs",)).decode()
+    assert "-x = 1" in patch and "+x = 2" in patch
+
+    close_workspace(root, ws)
+    assert not ws.location.exists()
+
+
+def test_isolated_run_leaves_repo_root_untouched(repo_copy: Path) -> None:
+    app = repo_copy / "demo_project" / "app.py"
+    app.write_text(app.read_text().replace('@app.get("/ping")', '@app.get("/pong")'))
+    before = app.read_text()
+
+    settings = OrchSettings()
+    settings.repo_root = repo_copy
+    settings.isolation = "copy"
+    run_dir = run_feature("F-001", settings)
+
+    assert app.read_text() == before
+    records = read_ledger(run_dir / "ledger.jsonl")
+    ws = next(r for r in records if r["step"] == "WORKSPACE")
+    assert not Path(ws["location"]).exists()  # removed once the run succeeded
+    assert "/ping" in (run_dir / "workspace" / "changes.patch").read_text()
+
+
+def test_snapshot_of_a_clean_tree_is_head(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    _git_repo(root)
+    head = subprocess.run(
+        ["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True, check=True
+    ).stdout.strip()
+    (root / "runs").mkdir()
+    (root / "runs" / "x.log").write_text("excluded, so still clean\n")
+    assert snapshot_commit(root, exclude=("runs",)) == head
+
+    (root / "new.py").write_text("y = 1\n")
+    assert snapshot_commit(root, exclude=("runs",)) != head
+
+
+def test_parallel_runs_get_their_own_workspaces() -> None:
+    settings = OrchSettings()
+    assert parallel_settings(settings, 1) == (settings, 1)
+    isolated, n = parallel_settings(settings, 4)
+    assert (isolated.isolation, n) == ("auto", 4)
+    assert settings.isolation == "none"
+
+    # An explicit "none" is honoured by running one at a time.
+    settings = OrchSettings(isolation="none")
+    assert parallel_settings(settings, 4) == (settings, 1)
+    settings = OrchSettings(isolation="copy")
+    assert parallel_settings(settings, 4) == (settings, 4)
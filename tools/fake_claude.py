@@ -5,6 +5,7 @@ This script applies the F-001 change directly so `orch run F-001` works end-to-e
 
 Usage:
   python tools/fake_claude.py "<prompt>"
+  python tools/fake_claude.py --serve   # long-lived worker, see tools/fake_server.py
 """
 
 from __future__ import annotations
@@ -108,10 +109,18 @@ def ensure_tests() -> None:
 
 def main() -> int:
     if len(sys.argv) < 2:
-        print("Usage: fake_claude.py <prompt>", file=sys.stderr)
+        print("Usage: fake_claude.py <prompt> | --serve", file=sys.stderr)
         return 2
 
-    prompt = sys.argv[1]
+    if sys.argv[1] == "--serve":
+        from fake_server import serve
+
+        return serve(handle)
+
+    return handle(sys.argv[1])
+
+
+def handle(prompt: str) -> int:
 
     # Only implement known demo features; otherwise no-op.
     if re.search(r"F-001|/ping|pong", prompt, re.IGNORECASE):
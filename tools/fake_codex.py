@@ -6,6 +6,8 @@ Usage:
 
 Special:
   If prompt is exactly `/status`, prints a status block that orch can parse.
+  `--serve` keeps the process alive and answers prompts over stdin/stdout
+  (see tools/fake_server.py).
 """
 
 from __future__ import annotations
@@ -17,10 +19,18 @@ import time
 
 def main() -> int:
     if len(sys.argv) < 2:
-        print("Usage: fake_codex.py <prompt>", file=sys.stderr)
+        print("Usage: fake_codex.py <prompt> | --serve", file=sys.stderr)
         return 2
 
-    prompt = sys.argv[1]
+    if sys.argv[1] == "--serve":
+        from fake_server import serve
+
+        return serve(handle)
+
+    return handle(sys.argv[1])
+
+
+def handle(prompt: str) -> int:
 
     if prompt.strip() == "/status":
         # Fake-but-parseable status output.
@@ -0,0 +1,82 @@
+"""Line-delimited JSON server loop shared by the fake tools' `--serve` mode.
+
+Protocol (one JSON object per line on stdin, one reply per line on stdout):
+
+  {"id": 1, "op": "run", "prompt": "...", "cwd": "/repo"}
+      -> {"id": 1, "returncode": 0, "stdout": "...", "stderr": "...", "resources": {...}}
+  {"id": 2, "op": "ping"}  -> {"id": 2, "ok": true, "pid": 1234}
+  {"op": "exit"}           -> (server exits)
+
+"resources" is optional: what the request cost the worker and the processes it waited
+for (user_s, sys_s, max_rss_kb, in_blocks, out_blocks; see orch.engine._resources).
+"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+from typing import Callable
+
+
+def _usage() -> tuple[float, float, int, int, int]:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    kids = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (
+        own.ru_utime + kids.ru_utime,
+        own.ru_stime + kids.ru_stime,
+        max(own.ru_maxrss, kids.ru_maxrss),
+        own.ru_inblock + kids.ru_inblock,
+        own.ru_oublock + kids.ru_oublock,
+    )
+
+
+def _resources(before: tuple[float, float, int, int, int]) -> dict[str, object]:
+    after = _usage()
+    rss = after[2] // 1024 if sys.platform == "darwin" else after[2]
+    return {
+        "user_s": round(after[0] - before[0], 3),
+        "sys_s": round(after[1] - before[1], 3),
+        # Peak RSS is not per request: it is the worker's peak so far.
+        "max_rss_kb": rss,
+        "in_blocks": after[3] - before[3],
+        "out_blocks": after[4] - before[4],
+    }
+
+
+def serve(handle: Callable[[str], int]) -> int:
+    out = sys.stdout
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        req = json.loads(line)
+        op = req.get("op")
+        if op == "exit":
+            return 0
+        if op == "ping":
+            reply = {"id": req.get("id"), "ok": True, "pid": os.getpid()}
+        else:
+            if req.get("cwd"):
+                os.chdir(req["cwd"])
+            before = _usage()
+            stdout, stderr = io.StringIO(), io.StringIO()
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    rc = handle(req["prompt"])
+                except Exception as e:  # noqa: BLE001
+                    print(f"{type(e).__name__}: {e}", file=sys.stderr)
+                    rc = 1
+            reply = {
+                "id": req.get("id"),
+                "returncode": rc,
+                "stdout": stdout.getvalue(),
+                "stderr": stderr.getvalue(),
+                "resources": _resources(before),
+            }
+        out.write(json.dumps(reply) + "\n")
+        out.flush()
+    return 0